@@ -0,0 +1,125 @@
+"""Benchmarks of the language model path against the local stand-in of the provider.
+
+Example:
+    python benchmarks/bench_language_model.py --latency lognormal:-0.7,0.4 --requests 40
+    python benchmarks/bench_language_model.py --mode replay --fixtures benchmarks/fixtures/llm.jsonl
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_llm_server import FakeLanguageModelServer, FAKE, RECORD, REPLAY  # noqa: E402
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name, latencies, elapsed, model_requests):
+    print(f'{name:<36} n={len(latencies):<5} throughput={len(latencies) / elapsed:8.2f}/s '
+          f'p50={statistics.median(latencies) * 1000:8.1f}ms p95={percentile(latencies, 0.95) * 1000:8.1f}ms '
+          f'p99={percentile(latencies, 0.99) * 1000:8.1f}ms model requests={model_requests}')
+
+
+class ServedRequests:
+    """Counts the requests that reached the fake server in the block, the ones answered without it are not"""
+
+    def __init__(self, server):
+        self.server = server
+        self.start = 0
+        self.count = 0
+
+    def __enter__(self):
+        self.start = self.server.requests
+        return self
+
+    def __exit__(self, *args):
+        self.count = self.server.requests - self.start
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def bench_execute_prompt(model, server, requests, concurrency):
+    start = time.perf_counter()
+    with ServedRequests(server) as served, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(lambda i: timed(model.execute_prompt, f'Prompt number {i}'), range(requests)))
+    report(f'execute_prompt concurrency={concurrency}', latencies, time.perf_counter() - start, served.count)
+
+
+def bench_evaluate_answers(model, server, answers):
+    pairs = [(f'Question {i}', f'Answer {i}') for i in range(answers)]
+    start = time.perf_counter()
+    with ServedRequests(server) as served:
+        latencies = [timed(model.evaluate_answer, *pair) for pair in pairs]
+    report('evaluate_answer one by one', latencies, time.perf_counter() - start, served.count)
+
+    with ServedRequests(server) as served:
+        elapsed = timed(model.evaluate_answers, pairs)
+    report(f'evaluate_answers batch of {answers}', [elapsed / answers] * answers, elapsed, served.count)
+
+
+def bench_create_question(model, server, requests):
+    from domain.enums import Language
+
+    topics = [f'Topic {i % 5}' for i in range(requests)]
+    start = time.perf_counter()
+    with ServedRequests(server) as served:
+        latencies = [timed(model.create_question, topic, Language.ENGLISH) for topic in topics]
+    report('create_question with 5 topics', latencies, time.perf_counter() - start, served.count)
+
+
+def bench_rate_limiter(model, server, requests_per_second, requests):
+    rate_limiter = model.rate_limiter
+    model.rate_limiter = model.RateLimiter(requests_per_second, 1)
+    try:
+        start = time.perf_counter()
+        with ServedRequests(server) as served, ThreadPoolExecutor(max_workers=8) as executor:
+            latencies = list(executor.map(lambda i: timed(model.execute_prompt, f'Limited {i}'), range(requests)))
+        elapsed = time.perf_counter() - start
+        report(f'rate limited to {requests_per_second}/s', latencies, elapsed, served.count)
+    finally:
+        model.rate_limiter = rate_limiter
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the language model path')
+    parser.add_argument('--mode', choices=[FAKE, RECORD, REPLAY], default=FAKE)
+    parser.add_argument('--fixtures', default='benchmarks/fixtures/llm.jsonl')
+    parser.add_argument('--latency', default='lognormal:-1.2,0.5')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--requests', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    server = FakeLanguageModelServer(mode=args.mode, latency=args.latency, error_rate=args.error_rate,
+                                     rate_limit_rate=args.rate_limit_rate, fixtures=args.fixtures).start()
+    os.environ.setdefault('API_KEY', 'fake')
+    os.environ.setdefault('MODEL_REQUESTS_PER_MINUTE', '100000')
+    os.environ['MODEL_API_BASE'] = server.url
+
+    import infra.language_model_manager as model
+
+    try:
+        bench_execute_prompt(model, server, args.requests, 1)
+        bench_execute_prompt(model, server, args.requests, args.concurrency)
+        bench_evaluate_answers(model, server, min(args.requests, 20))
+        bench_create_question(model, server, args.requests)
+        bench_rate_limiter(model, server, 10, 30)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
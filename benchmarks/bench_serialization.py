@@ -0,0 +1,84 @@
+"""Benchmarks of the encoding of the largest list responses, FastAPI default path against orjson.
+
+The default path is the one of FastAPI 0.92 for routes without response model validation: jsonable_encoder
+and then json.dumps as in JSONResponse.render.
+
+Example:
+    python benchmarks/bench_serialization.py --items 2000 --repeat 20
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+# The users module needs the utils one imported first
+from domain import utils  # noqa: E402,F401
+from domain.enums import Language, UserRole, State  # noqa: E402
+from domain.evaluations import Evaluation, Question  # noqa: E402
+from domain.users import User, UserPassword  # noqa: E402
+from rest_api.serialization import dumps  # noqa: E402
+
+
+def default_encoding(content) -> bytes:
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def create_users(items):
+    return [User(id=str(uuid.uuid4()), email=f'user{i}@test.com', given_names='José Luis', family_names='Gómez',
+                 nickname=f'user{i}', language=Language.SPANISH, role=UserRole.EXPERT, anti_phishing_phrase='phrase',
+                 state=State.ACTIVE, passwords=[UserPassword(password='', encrypted_password=b'')],
+                 creation_date=datetime.datetime.utcnow(), projects=[str(uuid.uuid4()) for _ in range(3)])
+            for i in range(items)]
+
+
+def create_evaluations(items):
+    questions = [Question(id=str(uuid.uuid4()), text=f'Question {i} about the topic of the evaluation',
+                          mandatory=i % 2 == 0, time_to_respond=datetime.time(0, 5)) for i in range(10)]
+    return [Evaluation(id=str(uuid.uuid4()), project_id=str(uuid.uuid4()), name=f'Evaluation {i}',
+                       description='Evaluation of the knowledge of the candidate', language=Language.ENGLISH,
+                       questions=questions) for i in range(items // 10)]
+
+
+def bench(name, encode, content, repeat):
+    durations = []
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(encode(content))
+        durations.append(time.perf_counter() - start)
+    print(f'{name:<52} p50={statistics.median(durations) * 1000:8.2f}ms '
+          f'min={min(durations) * 1000:8.2f}ms size={size / 1024:8.1f}KB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the encoding of the list responses')
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    users = create_users(args.items)
+    evaluations = create_evaluations(args.items)
+    endpoints = {
+        'GET /admin/users_info': [user.to_api_response() for user in users],
+        'GET /users': [user.to_simple_data() for user in users],
+        'GET /evaluations by project': [evaluation.to_api_response() for evaluation in evaluations]
+    }
+    for endpoint, content in endpoints.items():
+        bench(f'{endpoint} jsonable_encoder+json', default_encoding, content, args.repeat)
+        bench(f'{endpoint} orjson', dumps, content, args.repeat)
+
+    # Domain objects returned as they are, encoded with to_api_response by the default of orjson
+    bench('GET /evaluations by project orjson from domain', dumps, evaluations, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
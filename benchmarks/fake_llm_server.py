@@ -0,0 +1,247 @@
+"""Local stand-in of the chat completions API used to benchmark the language model path offline.
+
+Modes:
+    fake    answers every prompt with a generated response
+    record  forwards the prompts to the real provider and stores the prompt/response pairs as fixtures
+    replay  answers with the stored fixtures, failing with 404 the prompts that were not recorded
+
+Example:
+    python benchmarks/fake_llm_server.py --port 8765 --latency lognormal:-0.5,0.6 --error-rate 0.01 \
+        --rate-limit-rate 0.05
+    MODEL_API_BASE=http://localhost:8765/v1 python src/main.py
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, Optional
+
+FAKE = 'fake'
+RECORD = 'record'
+REPLAY = 'replay'
+
+BATCH_ITEM_PATTERN = re.compile(r'^\s*(\d+)\.\s*Question:', re.MULTILINE)
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Returns a function that gives the seconds to wait for a response, the spec is
+    constant:s, uniform:min,max, normal:mean,sd, lognormal:mu,sigma or exponential:mean"""
+    name, _, params = spec.partition(':')
+    values = [float(value) for value in params.split(',') if value]
+    distributions = {
+        'constant': lambda: values[0],
+        'uniform': lambda: random.uniform(values[0], values[1]),
+        'normal': lambda: random.gauss(values[0], values[1]),
+        'lognormal': lambda: random.lognormvariate(values[0], values[1]),
+        'exponential': lambda: random.expovariate(1 / values[0])
+    }
+    if name not in distributions:
+        raise ValueError(f'Unknown latency distribution {name}')
+
+    distribution = distributions[name]
+    return lambda: max(0.0, distribution())
+
+
+def fixture_key(request: Dict) -> str:
+    key = {'model': request.get('model'), 'messages': request.get('messages'), 'max_tokens': request.get('max_tokens')}
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def fake_content(prompt: str, stop=None) -> str:
+    items = BATCH_ITEM_PATTERN.findall(prompt)
+    if items:
+        content = '\n'.join(f'{item}|{int(item) % 5 + 1}|Fake explanation of the grade' for item in items)
+    elif 'evaluate' in prompt.lower():
+        content = '4|Fake explanation of the grade'
+    else:
+        content = f'Fake question about {prompt[-40:]}?'
+
+    for sequence in [stop] if isinstance(stop, str) else stop or []:
+        content = content.split(sequence)[0]
+
+    return content
+
+
+def count_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+class FakeLanguageModelServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, mode: str = FAKE, latency: str = 'constant:0',
+                 first_token_latency: str = 'constant:0', error_rate: float = 0.0, rate_limit_rate: float = 0.0,
+                 fixtures: Optional[str] = None, upstream: str = 'https://api.openai.com/v1', api_key: str = ''):
+        self.mode = mode
+        self.latency = parse_latency(latency)
+        self.first_token_latency = parse_latency(first_token_latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.fixtures_path = fixtures
+        self.upstream = upstream
+        self.api_key = api_key
+        self.fixtures = self.load_fixtures()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.server = ThreadingHTTPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def load_fixtures(self) -> Dict[str, Dict]:
+        fixtures = {}
+        if self.fixtures_path and self.mode == REPLAY:
+            with open(self.fixtures_path) as f:
+                for line in f:
+                    if line.strip():
+                        fixture = json.loads(line)
+                        fixtures[fixture.get('key')] = fixture.get('response')
+
+        return fixtures
+
+    def store_fixture(self, request: Dict, response: Dict):
+        with self.lock:
+            with open(self.fixtures_path, 'a') as f:
+                f.write(json.dumps({'key': fixture_key(request), 'request': request, 'response': response}) + '\n')
+
+    def complete(self, request: Dict) -> (int, Dict):
+        if self.mode == REPLAY:
+            response = self.fixtures.get(fixture_key(request))
+            if not response:
+                return 404, {'error': {'message': 'Prompt not recorded', 'type': 'invalid_request_error'}}
+            return 200, response
+
+        if self.mode == RECORD:
+            upstream_request = urllib.request.Request(
+                f'{self.upstream}/chat/completions',
+                data=json.dumps({**request, 'stream': False}).encode(),
+                headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {self.api_key}'}
+            )
+            try:
+                with urllib.request.urlopen(upstream_request) as upstream_response:
+                    response = json.loads(upstream_response.read())
+            except urllib.error.HTTPError as e:
+                return e.code, json.loads(e.read() or b'{}')
+
+            self.store_fixture(request, response)
+            return 200, response
+
+        prompt = '\n'.join(message.get('content', '') for message in request.get('messages', []))
+        content = fake_content(prompt, request.get('stop'))
+        return 200, {
+            'id': f'chatcmpl-{uuid.uuid4().hex}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': count_tokens(prompt), 'completion_tokens': count_tokens(content),
+                      'total_tokens': count_tokens(prompt) + count_tokens(content)}
+        }
+
+    def handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def send_json(self, code: int, body: Dict, headers: Dict = None):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def send_stream(self, response: Dict):
+                content = response['choices'][0]['message']['content']
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                time.sleep(server.first_token_latency())
+                words = re.findall(r'\s*\S+', content) or ['']
+                for word in words:
+                    chunk = {'id': response.get('id'), 'object': 'chat.completion.chunk',
+                             'model': response.get('model'),
+                             'choices': [{'index': 0, 'delta': {'content': word}, 'finish_reason': None}]}
+                    self.wfile.write(f'data: {json.dumps(chunk)}\n\n'.encode())
+                    self.wfile.flush()
+                self.wfile.write(b'data: [DONE]\n\n')
+
+            def do_POST(self):
+                with server.lock:
+                    server.requests += 1
+
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                if not self.path.endswith('/chat/completions'):
+                    self.send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+                    return
+
+                draw = random.random()
+                if draw < server.rate_limit_rate:
+                    self.send_json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests'}},
+                                   {'Retry-After': '1'})
+                    return
+
+                if draw < server.rate_limit_rate + server.error_rate:
+                    self.send_json(500, {'error': {'message': 'Fake server error', 'type': 'server_error'}})
+                    return
+
+                code, response = server.complete(request)
+                if code != 200:
+                    self.send_json(code, response)
+                    return
+
+                if request.get('stream'):
+                    self.send_stream(response)
+                    return
+
+                time.sleep(server.latency())
+                self.send_json(200, response)
+
+        return Handler
+
+    def start(self) -> 'FakeLanguageModelServer':
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-llm-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in of the chat completions API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--mode', choices=[FAKE, RECORD, REPLAY], default=FAKE)
+    parser.add_argument('--latency', default='constant:0', help='Latency of a complete response')
+    parser.add_argument('--first-token-latency', default='constant:0', help='Latency of the first streamed token')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--fixtures', default='benchmarks/fixtures/llm.jsonl')
+    parser.add_argument('--upstream', default='https://api.openai.com/v1')
+    parser.add_argument('--api-key', default='')
+    args = parser.parse_args()
+
+    server = FakeLanguageModelServer(args.host, args.port, args.mode, args.latency, args.first_token_latency,
+                                     args.error_rate, args.rate_limit_rate, args.fixtures, args.upstream,
+                                     args.api_key)
+    print(f'Fake language model listening on {server.url} in {args.mode} mode')
+    server.server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
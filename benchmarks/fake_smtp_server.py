@@ -0,0 +1,129 @@
+"""Local stand-in of an SMTP server that accepts every message, used to test the email path offline.
+
+It supports EHLO/HELO, AUTH PLAIN, NOOP, MAIL, RCPT, DATA, RSET and QUIT without TLS, and counts the
+connections, logins and messages received. The rejected recipients are refused with 550.
+
+Example:
+    python benchmarks/fake_smtp_server.py --port 8025
+    APP_ENVIRONMENT=PROD SMTP_SERVER=localhost SMTP_PORT=8025 SMTP_USE_TLS=False python src/main_tasks.py
+"""
+import argparse
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+
+class FakeSmtpServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 rejected_recipients: Optional[Set[str]] = None):
+        self.latency = latency
+        self.rejected_recipients = rejected_recipients or set()
+        self.connections = 0
+        self.logins = 0
+        self.noops = 0
+        self.messages: List[Dict] = []
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer((host, port), self.handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def handler(self):
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                time.sleep(fake.latency)
+                self.wfile.write(f'{line}\r\n'.encode())
+
+            def read_data(self) -> str:
+                lines = []
+                while True:
+                    line = self.rfile.readline().decode()
+                    if not line or line.rstrip('\r\n') == '.':
+                        return ''.join(lines)
+                    lines.append(line[1:] if line.startswith('..') else line)
+
+            def handle(self):
+                with fake.lock:
+                    fake.connections += 1
+
+                self.reply('220 fake-smtp ready')
+                sender, recipients = None, []
+                while True:
+                    line = self.rfile.readline().decode().rstrip('\r\n')
+                    if not line:
+                        return
+
+                    command = line.split(' ', 1)[0].upper()
+                    if command == 'EHLO':
+                        self.wfile.write(b'250-fake-smtp\r\n')
+                        self.reply('250 AUTH PLAIN')
+                    elif command == 'HELO':
+                        self.reply('250 fake-smtp')
+                    elif command == 'AUTH':
+                        with fake.lock:
+                            fake.logins += 1
+                        self.reply('235 Authentication successful')
+                    elif command == 'NOOP':
+                        with fake.lock:
+                            fake.noops += 1
+                        self.reply('250 OK')
+                    elif command == 'MAIL':
+                        sender, recipients = line.split(':', 1)[1].strip(), []
+                        self.reply('250 OK')
+                    elif command == 'RCPT':
+                        recipient = line.split(':', 1)[1].strip()
+                        if recipient.strip('<>') in fake.rejected_recipients:
+                            self.reply('550 No such user')
+                            continue
+                        recipients.append(recipient)
+                        self.reply('250 OK')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>')
+                        data = self.read_data()
+                        with fake.lock:
+                            fake.messages.append({'sender': sender, 'recipients': recipients, 'data': data})
+                        self.reply('250 OK')
+                    elif command == 'RSET':
+                        sender, recipients = None, []
+                        self.reply('250 OK')
+                    elif command == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+
+        return Handler
+
+    def start(self) -> 'FakeSmtpServer':
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-smtp-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each reply')
+    args = parser.parse_args()
+
+    server = FakeSmtpServer(args.host, args.port, args.latency)
+    print(f'Fake SMTP server listening on {args.host}:{server.port}')
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+from constants import DATETIME_FORMAT
+from domain.enums import BroadcastStatus, Language, UserRole
+
+
+@dataclass
+class Broadcast:
+    id: str
+    user: str
+    subject: str
+    message: str
+    language: Language
+    creation_date: datetime.datetime
+    status: BroadcastStatus = BroadcastStatus.PENDING
+    last_user_id: Optional[str] = None
+    processed: int = 0
+    sent: int = 0
+    failed: int = 0
+    worker: Optional[str] = None
+    lease_expiration_date: Optional[datetime.datetime] = None
+    start_date: Optional[datetime.datetime] = None
+    finish_date: Optional[datetime.datetime] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            '_id': self.id,
+            'user': self.user,
+            'subject': self.subject,
+            'message': self.message,
+            'language': self.language.name,
+            'creation_date': self.creation_date,
+            'status': self.status.name,
+            'last_user_id': self.last_user_id,
+            'processed': self.processed,
+            'sent': self.sent,
+            'failed': self.failed,
+            'worker': self.worker,
+            'lease_expiration_date': self.lease_expiration_date,
+            'start_date': self.start_date,
+            'finish_date': self.finish_date,
+            'error': self.error
+        }
+
+    def to_api_response(self):
+        return {
+            'id': self.id,
+            'subject': self.subject,
+            'language': self.language.name,
+            'status': self.status.name,
+            'processed': self.processed,
+            'sent': self.sent,
+            'failed': self.failed,
+            'creation_date': self.creation_date.strftime(DATETIME_FORMAT),
+            'start_date': self.start_date.strftime(DATETIME_FORMAT) if self.start_date else None,
+            'finish_date': self.finish_date.strftime(DATETIME_FORMAT) if self.finish_date else None,
+            'error': self.error
+        }
+
+
+@dataclass
+class Recipient:
+    """Fields of a user needed to send a message"""
+    id: str
+    email: str
+    nickname: str
+    language: Language
+    anti_phishing_phrase: str
+    role: UserRole
@@ -0,0 +1,39 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+from domain import utils
+from domain.enums import EmailStatus
+
+
+@dataclass
+class OutboxEmail:
+    id: str
+    to: str
+    subject: str
+    content: str
+    creation_date: datetime.datetime
+    available_date: datetime.datetime
+    status: EmailStatus = EmailStatus.PENDING
+    attempts: int = 0
+    dispatcher: Optional[str] = None
+    lease_expiration_date: Optional[datetime.datetime] = None
+    sent_date: Optional[datetime.datetime] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        # The emails have personal data and tokens, the dates are kept as dates to query the outbox
+        return {
+            '_id': self.id,
+            'to': utils.encrypt_message(self.to),
+            'subject': utils.encrypt_message(self.subject),
+            'content': utils.encrypt_message(self.content),
+            'creation_date': self.creation_date,
+            'available_date': self.available_date,
+            'status': self.status.name,
+            'attempts': self.attempts,
+            'dispatcher': self.dispatcher,
+            'lease_expiration_date': self.lease_expiration_date,
+            'sent_date': self.sent_date,
+            'error': self.error
+        }
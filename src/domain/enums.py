@@ -21,3 +21,48 @@ class UserRole(Enum):
     STAFFER = 'staffer'
     EXPERT = 'expert'
     ADMIN = 'admin'
+
+
+class JobType(Enum):
+    EVALUATE_ANSWER = 'evaluate_answer'
+    EVALUATE_ANSWERS = 'evaluate_answers'
+    GENERATE_QUESTION = 'generate_question'
+
+
+class JobStatus(Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class JobPriority(Enum):
+    INTERACTIVE = 10
+    BULK = 0
+
+
+class EmailStatus(Enum):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+
+
+class BroadcastStatus(Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+class TaskRunStatus(Enum):
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+
+
+class CircuitState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, List
 
-from constants import TIME_FORMAT
+from constants import TIME_FORMAT, DATETIME_FORMAT
 from domain.enums import Language
 
 
@@ -99,3 +99,27 @@ class EvaluationResult:
     answer: str
     grade: int
     explanation: str
+    question_id: Optional[str] = None
+    evaluation_id: Optional[str] = None
+    candidate: Optional[str] = None
+    date: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return {
+            'evaluation_id': self.evaluation_id,
+            'question_id': self.question_id,
+            'candidate': self.candidate,
+            'question': self.question,
+            'answer': self.answer,
+            'grade': self.grade,
+            'explanation': self.explanation,
+            'date': self.date.strftime(DATETIME_FORMAT) if self.date else None
+        }
+
+
+@dataclass
+class QuestionTopic:
+    topic: str
+    language: Language
+    requests: float
+    last_request_date: datetime
@@ -15,3 +15,14 @@ class BusinessException(Exception):
 @dataclass
 class AIModelException(Exception):
     message: str
+
+
+@dataclass
+class DeadlineExceededException(Exception):
+    message: str
+
+
+@dataclass
+class CircuitOpenException(Exception):
+    message: str
+    retry_after: int
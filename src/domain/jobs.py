@@ -0,0 +1,56 @@
+import datetime
+from dataclasses import dataclass
+from typing import Dict, Optional, Any
+
+from constants import DATETIME_FORMAT
+from domain.enums import JobType, JobStatus, JobPriority
+
+
+@dataclass
+class Job:
+    id: str
+    type: JobType
+    user: str
+    payload: Dict
+    priority: JobPriority
+    creation_date: datetime.datetime
+    available_date: datetime.datetime
+    status: JobStatus = JobStatus.PENDING
+    attempts: int = 0
+    worker: Optional[str] = None
+    lease_expiration_date: Optional[datetime.datetime] = None
+    finish_date: Optional[datetime.datetime] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        # Dates are stored as dates because the queue is queried and sorted by them
+        return {
+            '_id': self.id,
+            'type': self.type.name,
+            'user': self.user,
+            'payload': self.payload,
+            'priority': self.priority.value,
+            'creation_date': self.creation_date,
+            'available_date': self.available_date,
+            'status': self.status.name,
+            'attempts': self.attempts,
+            'worker': self.worker,
+            'lease_expiration_date': self.lease_expiration_date,
+            'finish_date': self.finish_date,
+            'result': self.result,
+            'error': self.error
+        }
+
+    def to_api_response(self):
+        return {
+            'id': self.id,
+            'type': self.type.name,
+            'priority': self.priority.name,
+            'status': self.status.name,
+            'attempts': self.attempts,
+            'creation_date': self.creation_date.strftime(DATETIME_FORMAT),
+            'finish_date': self.finish_date.strftime(DATETIME_FORMAT) if self.finish_date else None,
+            'result': self.result,
+            'error': self.error
+        }
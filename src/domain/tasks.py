@@ -0,0 +1,51 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+from constants import DATETIME_FORMAT
+from domain.enums import TaskRunStatus
+
+
+@dataclass
+class TaskRun:
+    id: str
+    name: str
+    scheduled_date: datetime.datetime
+    owner: str
+    start_date: datetime.datetime
+    status: TaskRunStatus = TaskRunStatus.RUNNING
+    finish_date: Optional[datetime.datetime] = None
+    duration: Optional[float] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            '_id': self.id,
+            'name': self.name,
+            'scheduled_date': self.scheduled_date,
+            'owner': self.owner,
+            'start_date': self.start_date,
+            'status': self.status.name,
+            'finish_date': self.finish_date,
+            'duration': self.duration,
+            'error': self.error
+        }
+
+    def to_api_response(self):
+        return {
+            'name': self.name,
+            'scheduled_date': self.scheduled_date.strftime(DATETIME_FORMAT),
+            'owner': self.owner,
+            'status': self.status.name,
+            'start_date': self.start_date.strftime(DATETIME_FORMAT),
+            'finish_date': self.finish_date.strftime(DATETIME_FORMAT) if self.finish_date else None,
+            'duration': self.duration,
+            'error': self.error
+        }
+
+
+@dataclass
+class Partition:
+    index: int
+    start_id: Optional[str]
+    end_id: Optional[str]
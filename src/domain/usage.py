@@ -0,0 +1,38 @@
+import datetime
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class ModelUsage:
+    id: str
+    date: datetime.datetime
+    operation: str
+    cache_hit: bool
+    model: Optional[str] = None
+    backend: Optional[str] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0
+    error: bool = False
+    user: Optional[str] = None
+    project: Optional[str] = None
+    endpoint: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        # The date is stored as a date to be grouped by day in the aggregations
+        return {
+            '_id': self.id,
+            'date': self.date,
+            'operation': self.operation,
+            'cache_hit': self.cache_hit,
+            'model': self.model,
+            'backend': self.backend,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'latency': self.latency,
+            'error': self.error,
+            'user': self.user,
+            'project': self.project,
+            'endpoint': self.endpoint
+        }
@@ -92,6 +92,19 @@ class User:
         if active_passwords and active_passwords[0]:
             return active_passwords[0]
 
+    def get_search_tokens(self) -> List[str]:
+        return utils.get_search_tokens(self.nickname, self.given_names, self.family_names)
+
+    def matches_search(self, words: List[str]) -> bool:
+        """Every word is the prefix of a word of the nickname or the names"""
+        user_words = utils.get_search_words(f'{self.nickname} {self.given_names} {self.family_names}')
+        return all(any(user_word.startswith(word) for user_word in user_words) for word in words)
+
+    def get_password_expiration_date(self) -> Optional[datetime.datetime]:
+        password = self.get_current_active_password()
+        if password:
+            return password.expiration_date
+
     def verify_password(self, password_to_validate: str):
         password = self.get_current_active_password()
         if password:
@@ -136,9 +149,13 @@ class User:
             'language': utils.encrypt_message(self.language.name),
             'anti_phishing_phrase': utils.encrypt_message(self.anti_phishing_phrase),
             'role': utils.encrypt_message(self.role.name),
+            'role_index': utils.get_blind_index(self.role.name),
+            'search_tokens': self.get_search_tokens(),
             'state': utils.encrypt_message(self.state.name),
             'creation_date': utils.encrypt_message(self.creation_date.strftime(DATETIME_FORMAT)),
             'passwords': [password.to_dict() for password in self.passwords],
+            # Not encrypted so the passwords near to expire can be found with an index
+            'password_expiration_date': self.get_password_expiration_date(),
             'refresh_tokens': [refresh_token.to_dict() for refresh_token in
                                self.refresh_tokens] if self.refresh_tokens else None,
             'invitations': [invitation.to_dict() for invitation in self.invitations] if self.invitations else None,
@@ -1,12 +1,18 @@
 import datetime
+import functools
+import hashlib
+import hmac
 import logging
 import random
 import string
+import unicodedata
 import uuid
+from typing import List, Optional
 
 from cryptography.fernet import Fernet
 
-from constants import DATE_FORMAT, DATETIME_FORMAT, ENCRYPT_KEY, APP_ENVIRONMENT, TIME_FORMAT
+from constants import DATE_FORMAT, DATETIME_FORMAT, ENCRYPT_KEY, APP_ENVIRONMENT, TIME_FORMAT, LOG_EXCERPT_CHARS, \
+    BLIND_INDEX_KEY, SEARCH_TOKEN_MIN_CHARS, SEARCH_TOKEN_MAX_CHARS
 from domain.enums import Environment, Language, UserRole, State
 from domain.users import User, UserPassword
 
@@ -30,14 +36,63 @@ def get_now_str():
     return datetime.datetime.utcnow().strftime(DATETIME_FORMAT)
 
 
+def get_excerpt(text: str, max_chars: int = LOG_EXCERPT_CHARS) -> str:
+    """Bounded version of a text to be logged or audited"""
+    if text is None or len(text) <= max_chars:
+        return text
+
+    return f'{text[:max_chars]}... ({len(text)} chars)'
+
+
+@functools.lru_cache(maxsize=None)
+def get_fernet() -> Fernet:
+    return Fernet(ENCRYPT_KEY.encode())
+
+
 def encrypt_message(message: str):
-    key = ENCRYPT_KEY.encode()
-    return Fernet(key).encrypt(message.encode())
+    return get_fernet().encrypt(message.encode())
 
 
 def decrypt_message(encrypted_message: bytes):
-    key = ENCRYPT_KEY.encode()
-    return Fernet(key).decrypt(encrypted_message).decode()
+    return get_fernet().decrypt(encrypted_message).decode()
+
+
+def check_blind_index_key():
+    """Called at the start of the apps, the blind indexes can not be written with a missing or shared key"""
+    if not BLIND_INDEX_KEY:
+        raise ValueError('BLIND_INDEX_KEY is not set')
+    if BLIND_INDEX_KEY == ENCRYPT_KEY:
+        raise ValueError('BLIND_INDEX_KEY must be different from ENCRYPT_KEY')
+
+
+def get_blind_index(value: str) -> str:
+    """Keyed hash of a value stored encrypted, equal values have equal hashes so they can be queried"""
+    return hmac.new(BLIND_INDEX_KEY.encode(), value.encode(), hashlib.sha256).hexdigest()
+
+
+def get_search_words(text: str) -> List[str]:
+    """Lowercase words of a text without accents"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).split()
+
+
+def get_search_token(prefix: str) -> str:
+    # 64 bits are enough to tell the prefixes apart, the matches are checked after decrypting them
+    return get_blind_index(prefix)[:16]
+
+
+def get_search_tokens(*values: Optional[str]) -> List[str]:
+    """Keyed hashes of the prefixes of every word of the values, so they can be searched while encrypted"""
+    prefixes = {word[:length]
+                for value in values if value
+                for word in get_search_words(value)
+                for length in range(SEARCH_TOKEN_MIN_CHARS, min(len(word), SEARCH_TOKEN_MAX_CHARS) + 1)}
+    return sorted(get_search_token(prefix) for prefix in prefixes)
+
+
+def get_query_tokens(words: List[str]) -> List[str]:
+    return sorted({get_search_token(word[:SEARCH_TOKEN_MAX_CHARS])
+                   for word in words if len(word) >= SEARCH_TOKEN_MIN_CHARS})
 
 
 def is_valid_password(password: str) -> bool:
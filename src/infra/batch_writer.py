@@ -0,0 +1,72 @@
+import atexit
+import logging
+import queue
+import threading
+from typing import List
+
+from pymongo.collection import Collection
+
+from constants import WRITER_BATCH_SIZE, WRITER_FLUSH_SECONDS
+
+WRITERS: List['BatchWriter'] = []
+
+
+class BatchWriter:
+    """Sends the write operations of a collection to MongoDB from a background thread,
+    grouping them in unordered bulk writes so the caller never waits for the database"""
+
+    def __init__(self, collection: Collection, name: str, batch_size: int = WRITER_BATCH_SIZE,
+                 flush_seconds: float = WRITER_FLUSH_SECONDS):
+        self.collection = collection
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.operations = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+        WRITERS.append(self)
+
+    def write(self, operation):
+        self.operations.put(operation)
+        if not self.thread:
+            self.start()
+
+    def start(self):
+        with self.lock:
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, name=f'{self.name}-writer', daemon=True)
+                self.thread.start()
+
+    def run(self):
+        while True:
+            operations = [self.operations.get()]
+            try:
+                while len(operations) < self.batch_size:
+                    operations.append(self.operations.get(timeout=self.flush_seconds))
+            except queue.Empty:
+                pass
+
+            self.bulk_write(operations)
+
+    def flush(self):
+        operations = []
+        while True:
+            try:
+                operations.append(self.operations.get_nowait())
+            except queue.Empty:
+                break
+
+        for i in range(0, len(operations), self.batch_size):
+            self.bulk_write(operations[i:i + self.batch_size])
+
+    def bulk_write(self, operations: List):
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logging.error(f'Error writing {len(operations)} operations in {self.name}\n{e}', exc_info=True)
+
+
+@atexit.register
+def flush_all():
+    for writer in WRITERS:
+        writer.flush()
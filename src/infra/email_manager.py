@@ -1,14 +1,25 @@
+import atexit
+import datetime
 import logging
+import os
 import smtplib
-import ssl
+import uuid
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from os.path import join, exists, getmtime
+from typing import List, Optional
 
-from jinja2 import Environment, select_autoescape, BaseLoader, TemplateNotFound
+from jinja2 import Environment, select_autoescape, BaseLoader, TemplateNotFound, FileSystemBytecodeCache
+from markupsafe import escape
 
 import domain.enums as enums
-from constants import SMTP_PORT, SMTP_SERVER, SENDER_EMAIL, SENDER_PASSWORD, APP_ENVIRONMENT, WEB_UI_PATH
+import infra.repositories.email_outbox_repository as outbox_repo
+from constants import SMTP_PORT, SMTP_SERVER, SENDER_EMAIL, SENDER_PASSWORD, APP_ENVIRONMENT, WEB_UI_PATH, \
+    SMTP_TIMEOUT_SECONDS, SMTP_USE_TLS, SMTP_POOL_SIZE, SMTP_MAX_MESSAGES_PER_CONNECTION, SMTP_KEEPALIVE_SECONDS, \
+    EMAIL_TEMPLATES_PATH, EMAIL_TEMPLATES_PRELOAD, EMAIL_TEMPLATES_CACHE_PATH
+from domain.emails import OutboxEmail
+from infra import resilience, email_subjects as subjects
+from infra.smtp_pool import SmtpPool, MESSAGE_REJECTIONS
 
 
 class EmailTemplatesLoader(BaseLoader):
@@ -24,21 +35,105 @@ class EmailTemplatesLoader(BaseLoader):
             source = f.read()
         return source, path, lambda: mtime == getmtime(path)
 
+    def list_templates(self):
+        templates = []
+        for directory, _, files in os.walk(self.path):
+            for file in files:
+                if file.endswith('.html'):
+                    templates.append(os.path.relpath(join(directory, file), self.path).replace(os.sep, '/'))
 
-env = Environment(
-    loader=EmailTemplatesLoader('data/email_templates'),
-    autoescape=select_autoescape()
-)
+        return sorted(templates)
+
+
+smtp_breaker = resilience.get_breaker('smtp')
+smtp_pool = SmtpPool(SMTP_SERVER, SMTP_PORT, SENDER_EMAIL, SENDER_PASSWORD, SMTP_POOL_SIZE,
+                     SMTP_MAX_MESSAGES_PER_CONNECTION, SMTP_KEEPALIVE_SECONDS, SMTP_TIMEOUT_SECONDS, SMTP_USE_TLS)
+atexit.register(smtp_pool.close)
+
+
+def create_environment(preload: bool) -> Environment:
+    if not preload:
+        return Environment(
+            loader=EmailTemplatesLoader(EMAIL_TEMPLATES_PATH),
+            autoescape=select_autoescape()
+        )
+
+    # Templates are never checked again once compiled, the bytecode cache speeds up the compilation at startup
+    os.makedirs(EMAIL_TEMPLATES_CACHE_PATH, exist_ok=True)
+    return Environment(
+        loader=EmailTemplatesLoader(EMAIL_TEMPLATES_PATH),
+        autoescape=select_autoescape(),
+        auto_reload=False,
+        cache_size=-1,
+        bytecode_cache=FileSystemBytecodeCache(EMAIL_TEMPLATES_CACHE_PATH)
+    )
+
+
+env: Optional[Environment] = None
+
+
+def get_environment() -> Environment:
+    """Environment created on first use, so importing the module does not touch the file system"""
+    global env
+    if env is None:
+        env = create_environment(EMAIL_TEMPLATES_PRELOAD)
+
+    return env
+
+
+def preload_templates():
+    """Compiles every locale template so sending emails does not read the file system"""
+    if not EMAIL_TEMPLATES_PRELOAD:
+        return
+
+    environment = get_environment()
+    templates = environment.list_templates()
+    for template in templates:
+        environment.get_template(template)
+    subjects.preload_subjects()
+    logging.info(f'Preloaded {len(templates)} email templates')
 
 
 def send_message(locale: enums.Language, template: str, to: str, subject: str, **kwargs):
+    """Renders the email and leaves it in the outbox, the dispatchers of the tasks process send it"""
     try:
-        template = env.get_template(f'{locale.value}/{template}.html')
-        send_email(to, subject, template.render(WEB_UI_PATH=WEB_UI_PATH, **kwargs))
+        template = get_environment().get_template(f'{locale.value}/{template}.html')
+        queue_email(to, subject, template.render(WEB_UI_PATH=WEB_UI_PATH, **kwargs))
     except Exception as e:
         logging.error(f'Error sending email to={to}, subject={subject}, template={template.name}\n{e}', exc_info=True)
 
 
+def render_shared(locale: enums.Language, template: str, personal_fields: List[str], **kwargs) -> str:
+    """Renders once the part of an email shared by all the recipients, the personal fields are left as
+    markers to be filled for each one with fill_personal"""
+    markers = {field: get_marker(field) for field in personal_fields}
+    template = get_environment().get_template(f'{locale.value}/{template}.html')
+    return template.render(WEB_UI_PATH=WEB_UI_PATH, **kwargs, **markers)
+
+
+def fill_personal(content: str, **kwargs) -> str:
+    for field, value in kwargs.items():
+        content = content.replace(get_marker(field), str(escape(value)))
+    return content
+
+
+def get_marker(field: str) -> str:
+    return f'[[personal:{field}]]'
+
+
+def queue_email(to: str, subject: str, content: str):
+    now = datetime.datetime.utcnow()
+    outbox_repo.insert_email(OutboxEmail(
+        id=str(uuid.uuid4()),
+        to=to,
+        subject=subject,
+        content=content,
+        creation_date=now,
+        available_date=now
+    ))
+    logging.info(f'Queued email to: {to}, subject: {subject}')
+
+
 def send_email(to: str, subject: str, content: str):
     logging.info(f'Sent email to: {to}, subject: {subject}')
     if APP_ENVIRONMENT != enums.Environment.PROD.name:
@@ -52,12 +147,18 @@ def send_email(to: str, subject: str, content: str):
     message['From'] = SENDER_EMAIL
     message['To'] = to
 
-    context = ssl.create_default_context()
-    with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-        server.starttls(context=context)
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.sendmail(SENDER_EMAIL, to, message.as_string())
-        server.close()
+    # Only the connection and transport errors count as failures of the server, the rejections of a message
+    # are raised outside the breaker so a few bad addresses do not stop every email
+    rejection = smtp_breaker.call(send_smtp_message, to, message)
+    if rejection:
+        raise rejection
+
+
+def send_smtp_message(to: str, message: MIMEMultipart) -> Optional[smtplib.SMTPException]:
+    try:
+        smtp_pool.send(SENDER_EMAIL, to, message.as_string())
+    except MESSAGE_REJECTIONS as e:
+        return e
 
 
 def send_fake_email(content: str):
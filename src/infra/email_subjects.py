@@ -1,3 +1,7 @@
+import functools
+
+from jinja2 import Environment, Template
+
 from domain.enums import Language
 
 SUBJECT = {
@@ -24,10 +28,20 @@ SUBJECT = {
 }
 
 
-def get_subject(language: Language, notification: str, **kwargs) -> str:
-    subject = SUBJECT.get(language.value).get(notification)
+# Subjects are plain text, so their values are not escaped as in the html templates
+env = Environment(autoescape=False)
+
 
-    for key, value in kwargs.items():
-        subject = subject.replace('{{' + key + '}}', value)
+@functools.lru_cache(maxsize=None)
+def get_subject_template(language: Language, notification: str) -> Template:
+    return env.from_string(SUBJECT.get(language.value).get(notification))
 
-    return subject
+
+def preload_subjects():
+    for language in Language:
+        for notification in SUBJECT.get(language.value):
+            get_subject_template(language, notification)
+
+
+def get_subject(language: Language, notification: str, **kwargs) -> str:
+    return get_subject_template(language, notification).render(**kwargs)
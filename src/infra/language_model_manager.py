@@ -1,56 +1,392 @@
+import concurrent.futures
+import contextvars
+import functools
+import itertools
 import logging
 import re
+import threading
+import time
+from collections import deque
+from typing import Iterator, List, Optional, Tuple, Union
 
-import openai
-
-from constants import MODEL, ANSWERS, API_KEY, QUESTION_EN, QUESTION_ES, MAX_TOKENS, MODEL_TEMPERATURE
+from constants import ANSWERS, QUESTION_EN, QUESTION_ES, MAX_TOKENS, MODEL_TEMPERATURE, \
+    MODEL_REQUESTS_PER_MINUTE, MODEL_BACKGROUND_REQUESTS_PER_MINUTE, MODEL_MAX_CONCURRENCY, MODEL_CONTEXT_TOKENS, \
+    MAX_ANSWERS_PER_PROMPT, ANSWERS_BATCH, ANSWERS_BATCH_ITEM, ANSWERS_GRADE_ONLY, ANSWERS_BATCH_GRADE_ONLY, \
+    GRADE_ONLY_MAX_TOKENS, ANSWER_MAX_PROMPT_TOKENS, ANSWER_OVERFLOW_STRATEGY, ANSWERS_SUMMARY
+from domain import utils
 from domain.enums import Language
 from domain.evaluations import EvaluationResult
-from domain.exeptions import AIModelException
+from domain.exeptions import AIModelException, CircuitOpenException, DeadlineExceededException
+from infra import resilience, usage_tracker
+from infra.model_router import ModelRouter, ModelBackend, load_backends
+
+TRUNCATION_MARK = ' [...] '
+GRADE_DELIMITER = '|'
+GRADE_PATTERN = re.compile(r'^\s*\(?([1-5])\)?\s*(?:[|,.:\-]\s*(.*))?$')
+BATCH_LINE_PATTERN = re.compile(r'^\s*\(?(\d+)\)?\s*[|.,:)\-]\s*\(?([1-5])\)?\s*(?:[|,.:\-]\s*(.*))?$')
+
+
+class RateLimiter:
+    """Sliding window limiter shared by all the calls done to the model"""
+
+    def __init__(self, max_calls: int, period: float):
+        self.max_calls = max_calls
+        self.period = period
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None, cancelled: Optional[threading.Event] = None) -> bool:
+        """Waits for a free call in the window, returns False when it is not free before the timeout
+        or the wait is cancelled"""
+        give_up = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.calls and now - self.calls[0] >= self.period:
+                    self.calls.popleft()
+
+                if len(self.calls) < self.max_calls:
+                    self.calls.append(now)
+                    return True
+
+                wait = self.period - (now - self.calls[0])
+
+            if give_up is not None:
+                if now + wait > give_up:
+                    return False
+            if cancelled is None:
+                time.sleep(wait)
+            elif cancelled.wait(wait):
+                return False
+
+
+rate_limiter = RateLimiter(MODEL_REQUESTS_PER_MINUTE, 60)
+background_rate_limiter = RateLimiter(MODEL_BACKGROUND_REQUESTS_PER_MINUTE, 60)
+executor = concurrent.futures.ThreadPoolExecutor(max_workers=MODEL_MAX_CONCURRENCY,
+                                                 thread_name_prefix='language-model')
+router = ModelRouter(load_backends())
+
+
+def admit_call(abandoned: Optional[threading.Event] = None, background: bool = False):
+    """Waits for the rate limit before a call to the model, never beyond the deadline of the request.
+    The background calls wait first for their own limit so they never take the whole one"""
+    if background and not background_rate_limiter.acquire(resilience.remaining_seconds(), abandoned):
+        raise DeadlineExceededException('Request deadline exceeded waiting for the model rate limit')
+    if not rate_limiter.acquire(resilience.remaining_seconds(), abandoned):
+        raise DeadlineExceededException('Request deadline exceeded waiting for the model rate limit')
+
+
+@functools.lru_cache(maxsize=None)
+def get_openai():
+    """Imports the openai client on first use, it takes a large part of the startup time"""
+    import openai
+    return openai
+
+
+def execute_prompt(prompt: str, max_tokens: int = MAX_TOKENS, stop: Optional[List[str]] = None,
+                   operation: str = 'prompt', background: bool = False) -> str:
+    def complete(backend: ModelBackend) -> str:
+        start = time.monotonic()
+        try:
+            completion = get_openai().ChatCompletion.create(
+                api_key=backend.api_key,
+                api_base=backend.api_base,
+                model=backend.model,
+                messages=[
+                    {'role': 'user',
+                     'content': prompt},
+                ],
+                max_tokens=max_tokens,
+                temperature=MODEL_TEMPERATURE,
+                stop=stop,
+                request_timeout=resilience.timeout_for(backend.timeout)
+            )
+        except Exception:
+            usage_tracker.record_usage(operation, model=backend.model, backend=backend.name,
+                                       latency=time.monotonic() - start, error=True)
+            raise
+
+        # Every attempt is recorded, the hedged ones that lose are also paid
+        usage = completion.get('usage') or {}
+        usage_tracker.record_usage(operation, model=backend.model, backend=backend.name,
+                                   prompt_tokens=usage.get('prompt_tokens', 0),
+                                   completion_tokens=usage.get('completion_tokens', 0),
+                                   latency=time.monotonic() - start)
+        return completion.choices[0].message.content
 
+    return router.call(complete, functools.partial(admit_call, background=background))
 
-def execute_prompt(prompt: str) -> str:
-    # TODO: Check how to send maximum 20 requests per minute
-    openai.api_key = API_KEY
-    completion = openai.ChatCompletion.create(
-        model=MODEL,
-        messages=[
-            {'role': 'user',
-             'content': prompt},
-        ],
-        max_tokens=MAX_TOKENS,
-        temperature=MODEL_TEMPERATURE
-    )
-    return completion.choices[0].message.content
+
+def stream_prompt(prompt: str, max_tokens: int = MAX_TOKENS, operation: str = 'prompt') -> Iterator[str]:
+    error = None
+    for backend in router.ordered_backends():
+        # Streams fail over only until the first token arrives, once sent to the client it can not be hedged
+        breaker = router.breakers[backend.name]
+        if not breaker.allow():
+            continue
+
+        try:
+            admit_call()
+        except DeadlineExceededException:
+            breaker.release_trial()
+            raise
+
+        start = time.monotonic()
+        try:
+            chunks = iter(get_openai().ChatCompletion.create(
+                api_key=backend.api_key,
+                api_base=backend.api_base,
+                model=backend.model,
+                messages=[
+                    {'role': 'user',
+                     'content': prompt},
+                ],
+                max_tokens=max_tokens,
+                temperature=MODEL_TEMPERATURE,
+                request_timeout=resilience.timeout_for(backend.timeout),
+                stream=True
+            ))
+            first_chunk = next(chunks, None)
+        except Exception as e:
+            logging.warning(f'Model stream failed in backend {backend.name}, error {e}')
+            usage_tracker.record_usage(operation, model=backend.model, backend=backend.name,
+                                       latency=time.monotonic() - start, error=True)
+            breaker.record_failure()
+            router.stats[backend.name].record_failure()
+            error = e
+            continue
+
+        breaker.record_success()
+        router.stats[backend.name].record_success(time.monotonic() - start)
+        # Streamed responses do not report the usage, it is estimated from the text
+        completion_tokens = 0
+        for chunk in itertools.chain([first_chunk] if first_chunk else [], chunks):
+            content = chunk.choices[0].delta.get('content')
+            if content:
+                completion_tokens += 1
+                yield content
+
+        usage_tracker.record_usage(operation, model=backend.model, backend=backend.name,
+                                   prompt_tokens=estimate_tokens(prompt), completion_tokens=completion_tokens,
+                                   latency=time.monotonic() - start)
+        return
+
+    raise error or CircuitOpenException('All the model backends are unavailable', 1)
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for the languages supported
+    return len(text) // 4 + 1
+
+
+def truncate_answer(answer: str, max_tokens: int = ANSWER_MAX_PROMPT_TOKENS) -> str:
+    """Keeps the beginning and the end of an answer longer than the budget, where the candidate
+    usually introduces and concludes the idea"""
+    if estimate_tokens(answer) <= max_tokens:
+        return answer
+
+    max_chars = (max_tokens - 1) * 4 - len(TRUNCATION_MARK)
+    head = max_chars // 2
+    return f'{answer[:head]}{TRUNCATION_MARK}{answer[len(answer) - (max_chars - head):]}'
+
+
+def summarize_answer(answer: str) -> str:
+    # The answer to summarize is bounded by the context of the model
+    message = replace_key_in_message(ANSWERS_SUMMARY, '<answer>',
+                                     truncate_answer(answer, MODEL_CONTEXT_TOKENS - ANSWER_MAX_PROMPT_TOKENS -
+                                                     estimate_tokens(ANSWERS_SUMMARY)))
+    return execute_prompt(message, max_tokens=ANSWER_MAX_PROMPT_TOKENS, operation='summarize_answer')
+
+
+def fit_answer(answer: str) -> str:
+    """Reduces the answers over the token budget before sending them to be evaluated"""
+    if estimate_tokens(answer) <= ANSWER_MAX_PROMPT_TOKENS:
+        return answer
+
+    logging.info(f'Answer of {len(answer)} chars over the budget of {ANSWER_MAX_PROMPT_TOKENS} tokens')
+    if ANSWER_OVERFLOW_STRATEGY == 'SUMMARIZE':
+        try:
+            return truncate_answer(summarize_answer(answer))
+        except Exception as e:
+            logging.error(f'Error summarizing answer, error {e}')
+
+    return truncate_answer(answer)
 
 
 def replace_key_in_message(message: str, key: str, value: str):
     return message.replace(key, value)
 
 
-def create_question(topic: str, language: Language) -> str:
+def create_question_message(topic: str, language: Language) -> str:
     question = QUESTION_EN if language == Language.ENGLISH else QUESTION_ES
-    message = replace_key_in_message(question, '<topic>', topic)
-    response = execute_prompt(message)
+    return replace_key_in_message(question, '<topic>', topic)
+
+
+def create_question(topic: str, language: Language, background: bool = False) -> str:
+    response = execute_prompt(create_question_message(topic, language), operation='generate_question',
+                              background=background)
     return response.replace('\n', '')
 
 
-def evaluate_answer(question: str, answer: str) -> EvaluationResult:
-    message = replace_key_in_message(ANSWERS, '<question>', question)
-    message = replace_key_in_message(message, '<answer>', answer)
-    logging.info(f'Message sent to the model: {message}')
+def create_questions(topics: List[Tuple[str, Language]]) -> List[Union[str, AIModelException]]:
+    """Generates a question for each (topic, language) concurrently returning them in the same order,
+    the topics that could not be generated get an AIModelException instead of a question"""
+
+    def create(topic: str, language: Language) -> Union[str, AIModelException]:
+        try:
+            return create_question(topic, language)
+        except Exception as e:
+            logging.error(f'Error generating question for topic={topic}, error {e}')
+            return AIModelException(str(e))
+
+    futures = [executor.submit(contextvars.copy_context().run, create, topic, language) for topic, language in topics]
+    return [future.result() for future in futures]
+
+
+def stream_question(topic: str, language: Language) -> Iterator[str]:
+    """Yields the question while the model generates it"""
+    for token in stream_prompt(create_question_message(topic, language), operation='generate_question'):
+        token = token.replace('\n', '')
+        if token:
+            yield token
+
+
+def parse_grade_response(response: str) -> Tuple[int, str]:
+    """Reads a response in the format "(grade)|(explanation)", the explanation is optional"""
+    match = GRADE_PATTERN.match(response)
+    if not match:
+        raise AIModelException(f'Response not valid: {utils.get_excerpt(response)}')
+
+    return int(match.group(1)), (match.group(2) or '').strip()
+
+
+def evaluate_answer(question: str, answer: str, fast: bool = False) -> EvaluationResult:
+    """Evaluates an answer, the fast mode asks only for the grade"""
+    message = replace_key_in_message(ANSWERS_GRADE_ONLY if fast else ANSWERS, '<question>', question)
+    message = replace_key_in_message(message, '<answer>', fit_answer(answer))
+    logging.info(f'Message sent to the model: {utils.get_excerpt(message)}')
+
+    if fast:
+        response = execute_prompt(message, max_tokens=GRADE_ONLY_MAX_TOKENS, stop=[GRADE_DELIMITER, '\n'],
+                                  operation='evaluate_answer')
+    else:
+        response = execute_prompt(message, stop=['\n'], operation='evaluate_answer')
 
-    response = execute_prompt(message)
     try:
         response = response.replace('\n', '')
-        logging.info(f'Response received from the model: {response}')
+        logging.info(f'Response received from the model: {utils.get_excerpt(response)}')
+        grade, explanation = parse_grade_response(response)
 
         return EvaluationResult(
             question=question,
             answer=answer,
-            grade=int(re.sub(r'[^0-9]', '', response)),
-            explanation=response.lstrip()
+            grade=grade,
+            explanation=explanation
         )
     except Exception as e:
-        logging.error(f"Response {response}, error {e.__traceback__}")
+        logging.error(f"Response {utils.get_excerpt(response)}, error {e}")
         raise AIModelException("Error processing model")
+
+
+def create_batch_item(number: int, question: str, answer: str) -> str:
+    item = replace_key_in_message(ANSWERS_BATCH_ITEM, '<number>', str(number))
+    item = replace_key_in_message(item, '<question>', question)
+    return replace_key_in_message(item, '<answer>', answer)
+
+
+def get_answer_max_tokens(fast: bool) -> int:
+    # The number of the answer and the delimiters take a few tokens more than a single evaluation
+    return GRADE_ONLY_MAX_TOKENS + 2 if fast else MAX_TOKENS + 2
+
+
+def pack_answers(pairs: List[Tuple[str, str]], fast: bool = False) -> List[List[int]]:
+    """Groups the indexes of the pairs in prompts that fit in the context of the model"""
+    prompt_tokens = estimate_tokens(ANSWERS_BATCH_GRADE_ONLY if fast else ANSWERS_BATCH)
+    packs = []
+    current = []
+    current_tokens = prompt_tokens
+    for index, (question, answer) in enumerate(pairs):
+        item_tokens = estimate_tokens(create_batch_item(index + 1, question, answer)) + get_answer_max_tokens(fast)
+        if current and (len(current) >= MAX_ANSWERS_PER_PROMPT or
+                        current_tokens + item_tokens > MODEL_CONTEXT_TOKENS):
+            packs.append(current)
+            current = []
+            current_tokens = prompt_tokens
+
+        current.append(index)
+        current_tokens += item_tokens
+
+    if current:
+        packs.append(current)
+
+    return packs
+
+
+def parse_batch_response(response: str, pairs: List[Tuple[str, str]]) -> List[EvaluationResult]:
+    results = [None] * len(pairs)
+    for line in response.splitlines():
+        match = BATCH_LINE_PATTERN.match(line)
+        if not match:
+            continue
+
+        number = int(match.group(1))
+        if 1 <= number <= len(pairs) and not results[number - 1]:
+            question, answer = pairs[number - 1]
+            results[number - 1] = EvaluationResult(
+                question=question,
+                answer=answer,
+                grade=int(match.group(2)),
+                explanation=(match.group(3) or '').strip()
+            )
+
+    return results
+
+
+def evaluate_pack(pairs: List[Tuple[str, str]], fast: bool = False) \
+        -> List[Union[EvaluationResult, AIModelException]]:
+    if len(pairs) == 1:
+        try:
+            return [evaluate_answer(*pairs[0], fast=fast)]
+        except Exception as e:
+            return [e if isinstance(e, AIModelException) else AIModelException(str(e))]
+
+    items = [create_batch_item(number + 1, question, answer) for number, (question, answer) in enumerate(pairs)]
+    message = replace_key_in_message(ANSWERS_BATCH_GRADE_ONLY if fast else ANSWERS_BATCH, '<answers>',
+                                     '\n'.join(items))
+    logging.info(f'Message sent to the model: {utils.get_excerpt(message)}')
+
+    try:
+        response = execute_prompt(message, max_tokens=get_answer_max_tokens(fast) * len(pairs),
+                                  operation='evaluate_answers')
+        logging.info(f'Response received from the model: {utils.get_excerpt(response)}')
+        results = parse_batch_response(response, pairs)
+    except Exception as e:
+        logging.error(f'Error evaluating {len(pairs)} answers in a single prompt, error {e}')
+        results = [None] * len(pairs)
+
+    # The answers that the model did not grade are sent again one by one
+    for index, result in enumerate(results):
+        if not result:
+            results[index] = evaluate_pack([pairs[index]], fast)[0]
+
+    return results
+
+
+def evaluate_answers(pairs: List[Tuple[str, str]], fast: bool = False) \
+        -> List[Union[EvaluationResult, AIModelException]]:
+    """Evaluates a list of (question, answer) pairs returning the results in the same order,
+    the pairs that could not be evaluated get an AIModelException instead of a result"""
+    fitted = [(question, fit_answer(answer)) for question, answer in pairs]
+    packs = pack_answers(fitted, fast)
+    futures = [executor.submit(contextvars.copy_context().run, evaluate_pack, [fitted[i] for i in pack], fast)
+               for pack in packs]
+
+    results = [None] * len(pairs)
+    for pack, future in zip(packs, futures):
+        for index, result in zip(pack, future.result()):
+            if isinstance(result, EvaluationResult):
+                # The result keeps the answer given, not the one sent to the model
+                result.answer = pairs[index][1]
+            results[index] = result
+
+    return results
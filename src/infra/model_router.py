@@ -0,0 +1,185 @@
+import concurrent.futures
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from constants import MODEL, MODEL_API_BASE, API_KEY, MODEL_BACKENDS, MODEL_ATTEMPT_TIMEOUT_SECONDS, \
+    MODEL_HEDGE_ENABLED, MODEL_HEDGE_MIN_SECONDS, MODEL_LATENCY_WINDOW, MODEL_ROUTER_WORKERS
+from domain.exeptions import CircuitOpenException, DeadlineExceededException
+from infra import resilience
+
+T = TypeVar('T')
+
+MINIMUM_SAMPLES_FOR_PERCENTILE = 20
+
+
+@dataclass
+class ModelBackend:
+    name: str
+    model: str
+    api_base: str
+    api_key: str
+    timeout: float = MODEL_ATTEMPT_TIMEOUT_SECONDS
+
+
+class BackendStats:
+    """Latencies of the last successful calls of a backend"""
+
+    def __init__(self):
+        self.latencies = deque(maxlen=MODEL_LATENCY_WINDOW)
+        self.calls = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        with self.lock:
+            self.calls += 1
+            self.latencies.append(latency)
+
+    def record_failure(self):
+        with self.lock:
+            self.calls += 1
+            self.failures += 1
+
+    def percentile(self, fraction: float) -> float:
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        if not latencies:
+            return 0.0
+
+        return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+    def hedge_delay(self) -> float:
+        if len(self.latencies) < MINIMUM_SAMPLES_FOR_PERCENTILE:
+            return max(MODEL_HEDGE_MIN_SECONDS, self.percentile(0.95))
+
+        return max(MODEL_HEDGE_MIN_SECONDS / 4, self.percentile(0.95))
+
+    def to_dict(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'failures': self.failures,
+            'p50_ms': round(self.percentile(0.5) * 1000, 1),
+            'p95_ms': round(self.percentile(0.95) * 1000, 1),
+            'p99_ms': round(self.percentile(0.99) * 1000, 1)
+        }
+
+
+class ModelRouter:
+    """Sends each call to the first backend with its circuit closed, when the backend takes more than its p95
+    a hedged request is sent to the next one and the first response wins, failed attempts fail over in order"""
+
+    def __init__(self, backends: List[ModelBackend]):
+        self.backends = backends
+        self.stats = {backend.name: BackendStats() for backend in backends}
+        self.breakers = {backend.name: resilience.get_breaker(f'model:{backend.name}') for backend in backends}
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=MODEL_ROUTER_WORKERS,
+                                                              thread_name_prefix='model-router')
+
+    def ordered_backends(self) -> List[ModelBackend]:
+        backends = [backend for backend in self.backends if self.breakers[backend.name].is_available()]
+        if not backends:
+            breaker = self.breakers[self.backends[0].name]
+            raise CircuitOpenException('All the model backends are unavailable', breaker.retry_after())
+
+        return backends
+
+    def attempt(self, backend: ModelBackend, function: Callable[[ModelBackend], T],
+                admit: Optional[Callable[[threading.Event], None]], admitted: threading.Event,
+                abandoned: threading.Event) -> T:
+        # Waiting to be admitted, for the rate limit, is not latency of the backend and is left out of its stats
+        if admit is not None:
+            admit(abandoned)
+        if abandoned.is_set():
+            raise DeadlineExceededException(f'Model call to {backend.name} abandoned before being sent')
+        admitted.set()
+
+        start = time.monotonic()
+        try:
+            result = self.breakers[backend.name].call(function, backend)
+        except Exception:
+            self.stats[backend.name].record_failure()
+            raise
+
+        self.stats[backend.name].record_success(time.monotonic() - start)
+        return result
+
+    def call(self, function: Callable[[ModelBackend], T],
+             admit: Optional[Callable[[threading.Event], None]] = None) -> T:
+        """Calls the function with the backends in order, admit is called by each attempt before sending it,
+        with the event set once the attempt is abandoned, and raises when the attempt can not be sent"""
+        backends = self.ordered_backends()
+        pending = {}
+        admissions = {}
+        abandoned = threading.Event()
+        hedged = False
+        error = None
+
+        def launch(backend: ModelBackend):
+            admitted = threading.Event()
+            future = self.executor.submit(contextvars.copy_context().run, self.attempt, backend, function, admit,
+                                          admitted, abandoned)
+            pending[future] = backend
+            admissions[future] = admitted
+
+        try:
+            launch(backends.pop(0))
+            while pending:
+                primary_future, primary = next(iter(pending.items()))
+                can_hedge = MODEL_HEDGE_ENABLED and not hedged and backends
+                timeout = self.stats[primary.name].hedge_delay() if can_hedge else None
+                remaining = resilience.remaining_seconds()
+                if remaining is not None:
+                    timeout = min(timeout, remaining) if timeout is not None else remaining
+                done, _ = concurrent.futures.wait(pending, timeout=max(timeout, 0) if timeout is not None else None,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                if not done and remaining is not None and resilience.remaining_seconds() <= 0:
+                    raise DeadlineExceededException('Request deadline exceeded waiting for the model')
+
+                if not done:
+                    if not admissions[primary_future].is_set():
+                        # The primary is still waiting to be sent, a hedge would only wait behind it
+                        continue
+                    hedged = True
+                    logging.info(f'Hedging model call of {primary.name} with {backends[0].name}')
+                    launch(backends.pop(0))
+                    continue
+
+                for future in done:
+                    backend = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.warning(f'Model call failed in backend {backend.name}, error {e}')
+                        error = e
+                        if not pending and backends:
+                            launch(backends.pop(0))
+                        continue
+
+                    return result
+
+            raise error
+        finally:
+            # The attempts still running are abandoned, the ones not sent yet are never sent and the results
+            # of the others are discarded
+            abandoned.set()
+            for other in pending:
+                other.cancel()
+
+    def get_stats(self) -> Dict:
+        return {backend.name: {'model': backend.model, 'circuit': self.breakers[backend.name].state.name,
+                               **self.stats[backend.name].to_dict()}
+                for backend in self.backends}
+
+
+def load_backends() -> List[ModelBackend]:
+    if not MODEL_BACKENDS:
+        return [ModelBackend(name='default', model=MODEL, api_base=MODEL_API_BASE, api_key=API_KEY)]
+
+    return [ModelBackend(**backend) for backend in json.loads(MODEL_BACKENDS)]
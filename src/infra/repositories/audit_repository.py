@@ -1,7 +1,7 @@
 from domain.audit import Event
-from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+from infra.repositories.general_repository import AINTERVIEWER_AUDIT_CLIENT
 
-AUDIT_COLLECTION = AINTERVIEWER_CLIENT.audit
+AUDIT_COLLECTION = AINTERVIEWER_AUDIT_CLIENT.audit
 
 
 def insert_audit_event(event: Event):
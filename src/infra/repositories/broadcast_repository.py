@@ -0,0 +1,95 @@
+import datetime
+from typing import Dict, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from domain.broadcasts import Broadcast
+from domain.enums import BroadcastStatus, Language
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+
+BROADCASTS_COLLECTION = AINTERVIEWER_CLIENT.broadcasts
+
+
+def create_indexes():
+    BROADCASTS_COLLECTION.create_index([('status', ASCENDING), ('creation_date', ASCENDING)])
+
+
+def insert_broadcast(broadcast: Broadcast):
+    BROADCASTS_COLLECTION.insert_one(broadcast.to_dict())
+
+
+def find_broadcast_by_id(broadcast_id: str) -> Optional[Broadcast]:
+    broadcast_data = BROADCASTS_COLLECTION.find_one({'_id': broadcast_id})
+    if broadcast_data:
+        return deserialize_broadcast(broadcast_data)
+
+
+def claim_broadcast(worker: str, lease_seconds: int) -> Optional[Broadcast]:
+    """Atomically takes the oldest pending broadcast, or a running one whose worker lost the lease,
+    the last user processed is kept so it resumes where it was left"""
+    now = datetime.datetime.utcnow()
+    broadcast_data = BROADCASTS_COLLECTION.find_one_and_update(
+        {'$or': [
+            {'status': BroadcastStatus.PENDING.name},
+            {'status': BroadcastStatus.RUNNING.name, 'lease_expiration_date': {'$lte': now}}
+        ]},
+        [{'$set': {
+            'status': BroadcastStatus.RUNNING.name,
+            'worker': worker,
+            'lease_expiration_date': now + datetime.timedelta(seconds=lease_seconds),
+            'start_date': {'$ifNull': ['$start_date', now]}
+        }}],
+        sort=[('creation_date', ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+    if broadcast_data:
+        return deserialize_broadcast(broadcast_data)
+
+
+def save_progress(broadcast: Broadcast, lease_seconds: int) -> bool:
+    """Checkpoints the progress extending the lease, returns False when the worker lost it"""
+    update = BROADCASTS_COLLECTION.update_one(
+        {'_id': broadcast.id, 'worker': broadcast.worker, 'status': BroadcastStatus.RUNNING.name},
+        {'$set': {
+            'last_user_id': broadcast.last_user_id,
+            'processed': broadcast.processed,
+            'sent': broadcast.sent,
+            'failed': broadcast.failed,
+            'lease_expiration_date': datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_seconds)
+        }}
+    )
+    return update.modified_count == 1
+
+
+def finish_broadcast(broadcast: Broadcast, status: BroadcastStatus, error: str = None) -> bool:
+    update = BROADCASTS_COLLECTION.update_one(
+        {'_id': broadcast.id, 'worker': broadcast.worker, 'status': BroadcastStatus.RUNNING.name},
+        {'$set': {
+            'status': status.name,
+            'error': error,
+            'lease_expiration_date': None,
+            'finish_date': datetime.datetime.utcnow()
+        }}
+    )
+    return update.modified_count == 1
+
+
+def deserialize_broadcast(broadcast_data: Dict) -> Broadcast:
+    return Broadcast(
+        id=broadcast_data.get('_id'),
+        user=broadcast_data.get('user'),
+        subject=broadcast_data.get('subject'),
+        message=broadcast_data.get('message'),
+        language=Language[broadcast_data.get('language')],
+        creation_date=broadcast_data.get('creation_date'),
+        status=BroadcastStatus[broadcast_data.get('status')],
+        last_user_id=broadcast_data.get('last_user_id'),
+        processed=broadcast_data.get('processed'),
+        sent=broadcast_data.get('sent'),
+        failed=broadcast_data.get('failed'),
+        worker=broadcast_data.get('worker'),
+        lease_expiration_date=broadcast_data.get('lease_expiration_date'),
+        start_date=broadcast_data.get('start_date'),
+        finish_date=broadcast_data.get('finish_date'),
+        error=broadcast_data.get('error')
+    )
@@ -0,0 +1,13 @@
+from typing import Dict, Optional
+
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+
+TASK_CHECKPOINTS_COLLECTION = AINTERVIEWER_CLIENT.task_checkpoints
+
+
+def find_checkpoint(name: str) -> Optional[Dict]:
+    return TASK_CHECKPOINTS_COLLECTION.find_one({'_id': name})
+
+
+def save_checkpoint(name: str, values: Dict):
+    TASK_CHECKPOINTS_COLLECTION.update_one({'_id': name}, {'$set': values}, upsert=True)
@@ -0,0 +1,106 @@
+import datetime
+from typing import Dict, Optional
+
+from pymongo import ASCENDING, ReturnDocument
+
+from constants import OUTBOX_RETENTION_DAYS
+from domain import utils
+from domain.emails import OutboxEmail
+from domain.enums import EmailStatus
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+
+EMAIL_OUTBOX_COLLECTION = AINTERVIEWER_CLIENT.email_outbox
+
+
+def create_indexes():
+    EMAIL_OUTBOX_COLLECTION.create_index([('status', ASCENDING), ('available_date', ASCENDING)])
+    EMAIL_OUTBOX_COLLECTION.create_index([('status', ASCENDING), ('lease_expiration_date', ASCENDING)])
+    # Only the sent emails expire, the dead ones are kept to be reviewed
+    EMAIL_OUTBOX_COLLECTION.create_index('sent_date', expireAfterSeconds=OUTBOX_RETENTION_DAYS * 24 * 60 * 60)
+
+
+def insert_email(email: OutboxEmail):
+    EMAIL_OUTBOX_COLLECTION.insert_one(email.to_dict())
+
+
+def claim_email(dispatcher: str, lease_seconds: int, max_attempts: int) -> Optional[OutboxEmail]:
+    """Atomically takes the oldest email ready to be sent, or one whose dispatcher lost the lease
+    before its last attempt"""
+    now = datetime.datetime.utcnow()
+    email_data = EMAIL_OUTBOX_COLLECTION.find_one_and_update(
+        {'$or': [
+            {'status': EmailStatus.PENDING.name, 'available_date': {'$lte': now}},
+            {'status': EmailStatus.SENDING.name, 'lease_expiration_date': {'$lte': now},
+             'attempts': {'$lt': max_attempts}}
+        ]},
+        {'$set': {
+            'status': EmailStatus.SENDING.name,
+            'dispatcher': dispatcher,
+            'lease_expiration_date': now + datetime.timedelta(seconds=lease_seconds)
+        }, '$inc': {'attempts': 1}},
+        sort=[('available_date', ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+    if email_data:
+        return deserialize_email(email_data)
+
+
+def dead_letter_expired_emails(max_attempts: int) -> int:
+    """Moves to the dead letters the emails whose dispatcher lost the lease in the last attempt,
+    the ones making their dispatcher die are never claimed again"""
+    now = datetime.datetime.utcnow()
+    update = EMAIL_OUTBOX_COLLECTION.update_many(
+        {'status': EmailStatus.SENDING.name, 'lease_expiration_date': {'$lte': now},
+         'attempts': {'$gte': max_attempts}},
+        {'$set': {
+            'status': EmailStatus.DEAD.name,
+            'error': 'Lease lost in the last attempt',
+            'lease_expiration_date': None
+        }}
+    )
+    return update.modified_count
+
+
+def finish_email(email: OutboxEmail, status: EmailStatus, error: str = None) -> bool:
+    update = EMAIL_OUTBOX_COLLECTION.update_one(
+        {'_id': email.id, 'dispatcher': email.dispatcher, 'status': EmailStatus.SENDING.name},
+        {'$set': {
+            'status': status.name,
+            'error': error,
+            'lease_expiration_date': None,
+            'sent_date': datetime.datetime.utcnow() if status == EmailStatus.SENT else None
+        }}
+    )
+    return update.modified_count == 1
+
+
+def retry_email(email: OutboxEmail, available_date: datetime.datetime, error: str, attempts: int) -> bool:
+    update = EMAIL_OUTBOX_COLLECTION.update_one(
+        {'_id': email.id, 'dispatcher': email.dispatcher, 'status': EmailStatus.SENDING.name},
+        {'$set': {
+            'status': EmailStatus.PENDING.name,
+            'available_date': available_date,
+            'attempts': attempts,
+            'error': error,
+            'dispatcher': None,
+            'lease_expiration_date': None
+        }}
+    )
+    return update.modified_count == 1
+
+
+def deserialize_email(email_data: Dict) -> OutboxEmail:
+    return OutboxEmail(
+        id=email_data.get('_id'),
+        to=utils.decrypt_message(email_data.get('to')),
+        subject=utils.decrypt_message(email_data.get('subject')),
+        content=utils.decrypt_message(email_data.get('content')),
+        creation_date=email_data.get('creation_date'),
+        available_date=email_data.get('available_date'),
+        status=EmailStatus[email_data.get('status')],
+        attempts=email_data.get('attempts'),
+        dispatcher=email_data.get('dispatcher'),
+        lease_expiration_date=email_data.get('lease_expiration_date'),
+        sent_date=email_data.get('sent_date'),
+        error=email_data.get('error')
+    )
@@ -40,6 +40,17 @@ def update_evaluation(evaluation: Evaluation):
     )
 
 
+def add_questions(evaluation_id: str, questions: List[Question]):
+    # A single update appends all the questions, even when the evaluation still has no questions
+    EVALUATIONS_COLLECTION.update_one(
+        {'_id': evaluation_id},
+        [{'$set': {'questions': {'$concatArrays': [
+            {'$ifNull': ['$questions', []]},
+            [{'$literal': question.to_dict()} for question in questions]
+        ]}}}]
+    )
+
+
 def deserialize_evaluation(evaluation_data: Dict) -> Evaluation:
     return Evaluation(
         id=evaluation_data.get('_id'),
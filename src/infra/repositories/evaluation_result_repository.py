@@ -0,0 +1,57 @@
+import uuid
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from domain import utils
+from domain.evaluations import EvaluationResult
+from infra.batch_writer import BatchWriter
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+
+EVALUATION_RESULTS_COLLECTION = AINTERVIEWER_CLIENT.evaluation_results
+
+results_writer = BatchWriter(EVALUATION_RESULTS_COLLECTION, 'evaluation-results')
+
+
+def create_indexes():
+    EVALUATION_RESULTS_COLLECTION.create_index(
+        [('evaluation_id', ASCENDING), ('candidate', ASCENDING), ('question_id', ASCENDING)], unique=True)
+    EVALUATION_RESULTS_COLLECTION.create_index([('question_id', ASCENDING), ('date', DESCENDING)])
+
+
+def save_evaluation_result(evaluation_result: EvaluationResult):
+    """Stores the result asynchronously, a new evaluation of the same answer replaces the previous one"""
+    data = evaluation_result.to_dict()
+    results_writer.write(UpdateOne(
+        {'evaluation_id': data.pop('evaluation_id'),
+         'candidate': data.pop('candidate'),
+         'question_id': data.pop('question_id')},
+        {'$set': data, '$setOnInsert': {'_id': str(uuid.uuid4())}},
+        upsert=True
+    ))
+
+
+def find_results_by_evaluation_id(evaluation_id: str, candidate: str = None) -> List[EvaluationResult]:
+    query = {'evaluation_id': evaluation_id}
+    if candidate:
+        query['candidate'] = candidate
+
+    return [deserialize_evaluation_result(result_data) for result_data in EVALUATION_RESULTS_COLLECTION.find(query)]
+
+
+def find_results_by_question_id(question_id: str) -> List[EvaluationResult]:
+    results = EVALUATION_RESULTS_COLLECTION.find({'question_id': question_id}).sort('date', DESCENDING)
+    return [deserialize_evaluation_result(result_data) for result_data in results]
+
+
+def deserialize_evaluation_result(result_data: Dict) -> EvaluationResult:
+    return EvaluationResult(
+        question=result_data.get('question'),
+        answer=result_data.get('answer'),
+        grade=result_data.get('grade'),
+        explanation=result_data.get('explanation'),
+        question_id=result_data.get('question_id'),
+        evaluation_id=result_data.get('evaluation_id'),
+        candidate=result_data.get('candidate'),
+        date=utils.get_datetime_from_str(result_data.get('date')) if result_data.get('date') else None
+    )
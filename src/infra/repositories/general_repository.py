@@ -1,8 +1,69 @@
-from pymongo import MongoClient
+import time
 
-from constants import MONGO_CONNECTION
+from pymongo import MongoClient, WriteConcern, monitoring
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 
-AINTERVIEWER_CLIENT = MongoClient(MONGO_CONNECTION).ainterviewer
+from constants import MONGO_CONNECTION, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, \
+    MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_CONNECT_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS, MONGO_COMPRESSORS, \
+    MONGO_LISTINGS_READ_PREFERENCE, MONGO_LISTINGS_MAX_STALENESS_SECONDS, MONGO_AUDIT_WRITE_CONCERN, \
+    MONGO_AUDIT_WRITE_TIMEOUT_MS
+from infra import resilience
+
+# Errors that show the database is unreachable or overloaded, not a problem of the command itself
+UNHEALTHY_ERRORS = ['AutoReconnect', 'ConnectionFailure', 'NetworkTimeout', 'NotPrimaryError',
+                    'ServerSelectionTimeoutError', 'ExecutionTimeout']
+MAX_TIME_MS_EXPIRED = 50
+
+mongo_breaker = resilience.get_breaker('mongo')
+
+
+class MongoHealthListener(monitoring.CommandListener):
+    """Feeds the mongo circuit breaker with the result of every command"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_breaker.record_success()
+
+    def failed(self, event):
+        failure = event.failure or {}
+        if failure.get('errtype') in UNHEALTHY_ERRORS or failure.get('code') == MAX_TIME_MS_EXPIRED:
+            mongo_breaker.record_failure()
+
+
+# Not connected until the first operation, the startup warm up opens the connection before receiving traffic
+MONGO_CLIENT = MongoClient(
+    MONGO_CONNECTION,
+    connect=False,
+    event_listeners=[MongoHealthListener()],
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    compressors=[compressor.strip() for compressor in MONGO_COMPRESSORS.split(',') if compressor.strip()]
+)
+AINTERVIEWER_CLIENT = MONGO_CLIENT.ainterviewer
+# Reads that tolerate some lag, so they do not compete with the writes in the primary
+AINTERVIEWER_LISTINGS_CLIENT = AINTERVIEWER_CLIENT.with_options(read_preference=make_read_preference(
+    read_pref_mode_from_name(MONGO_LISTINGS_READ_PREFERENCE),
+    None,
+    MONGO_LISTINGS_MAX_STALENESS_SECONDS if MONGO_LISTINGS_READ_PREFERENCE != 'primary' else -1
+))
+# Writes that must survive a failover of the primary
+AINTERVIEWER_AUDIT_CLIENT = AINTERVIEWER_CLIENT.with_options(write_concern=WriteConcern(
+    int(MONGO_AUDIT_WRITE_CONCERN) if MONGO_AUDIT_WRITE_CONCERN.isdigit() else MONGO_AUDIT_WRITE_CONCERN,
+    wtimeout=MONGO_AUDIT_WRITE_TIMEOUT_MS
+))
+
+
+def ping() -> float:
+    """Returns the milliseconds the database took to answer"""
+    start = time.monotonic()
+    AINTERVIEWER_CLIENT.command('ping')
+    return (time.monotonic() - start) * 1000
 
 
 def ainterview_database_exists() -> bool:
@@ -0,0 +1,95 @@
+import datetime
+from typing import Dict, Optional
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from constants import JOB_RETENTION_DAYS
+from domain.enums import JobStatus, JobType, JobPriority
+from domain.jobs import Job
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+
+JOBS_COLLECTION = AINTERVIEWER_CLIENT.jobs
+
+
+def create_indexes():
+    JOBS_COLLECTION.create_index([('status', ASCENDING), ('priority', DESCENDING), ('available_date', ASCENDING)])
+    JOBS_COLLECTION.create_index([('status', ASCENDING), ('lease_expiration_date', ASCENDING)])
+    JOBS_COLLECTION.create_index('finish_date', expireAfterSeconds=JOB_RETENTION_DAYS * 24 * 60 * 60)
+
+
+def insert_job(job: Job):
+    JOBS_COLLECTION.insert_one(job.to_dict())
+
+
+def find_job_by_id(job_id: str) -> Optional[Job]:
+    job_data = JOBS_COLLECTION.find_one({'_id': job_id})
+    if job_data:
+        return deserialize_job(job_data)
+
+
+def claim_job(worker: str, lease_seconds: int) -> Optional[Job]:
+    """Atomically takes the pending job with the highest priority, or a running job whose worker lost the lease"""
+    now = datetime.datetime.utcnow()
+    job_data = JOBS_COLLECTION.find_one_and_update(
+        {'$or': [
+            {'status': JobStatus.PENDING.name, 'available_date': {'$lte': now}},
+            {'status': JobStatus.RUNNING.name, 'lease_expiration_date': {'$lte': now}}
+        ]},
+        {'$set': {
+            'status': JobStatus.RUNNING.name,
+            'worker': worker,
+            'lease_expiration_date': now + datetime.timedelta(seconds=lease_seconds)
+        }, '$inc': {'attempts': 1}},
+        sort=[('priority', DESCENDING), ('available_date', ASCENDING)],
+        return_document=ReturnDocument.AFTER
+    )
+    if job_data:
+        return deserialize_job(job_data)
+
+
+def finish_job(job: Job, status: JobStatus, result=None, error: str = None) -> bool:
+    """Only the worker holding the job can finish it, returns False when the lease was lost"""
+    update = JOBS_COLLECTION.update_one(
+        {'_id': job.id, 'worker': job.worker, 'status': JobStatus.RUNNING.name},
+        {'$set': {
+            'status': status.name,
+            'result': result,
+            'error': error,
+            'lease_expiration_date': None,
+            'finish_date': datetime.datetime.utcnow()
+        }}
+    )
+    return update.modified_count == 1
+
+
+def retry_job(job: Job, available_date: datetime.datetime, error: str) -> bool:
+    update = JOBS_COLLECTION.update_one(
+        {'_id': job.id, 'worker': job.worker, 'status': JobStatus.RUNNING.name},
+        {'$set': {
+            'status': JobStatus.PENDING.name,
+            'available_date': available_date,
+            'error': error,
+            'worker': None,
+            'lease_expiration_date': None
+        }}
+    )
+    return update.modified_count == 1
+
+
+def deserialize_job(job_data: Dict) -> Job:
+    return Job(
+        id=job_data.get('_id'),
+        type=JobType[job_data.get('type')],
+        user=job_data.get('user'),
+        payload=job_data.get('payload'),
+        priority=JobPriority(job_data.get('priority')),
+        creation_date=job_data.get('creation_date'),
+        available_date=job_data.get('available_date'),
+        status=JobStatus[job_data.get('status')],
+        attempts=job_data.get('attempts'),
+        worker=job_data.get('worker'),
+        lease_expiration_date=job_data.get('lease_expiration_date'),
+        finish_date=job_data.get('finish_date'),
+        result=job_data.get('result'),
+        error=job_data.get('error')
+    )
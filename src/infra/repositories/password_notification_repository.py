@@ -0,0 +1,35 @@
+import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from constants import DATETIME_FORMAT, PASSWORD_DAYS_TO_EXPIRATION
+from infra.repositories.general_repository import AINTERVIEWER_AUDIT_CLIENT
+
+PASSWORD_NOTIFICATIONS_COLLECTION = AINTERVIEWER_AUDIT_CLIENT.password_notifications
+
+
+def create_indexes():
+    PASSWORD_NOTIFICATIONS_COLLECTION.create_index('creation_date',
+                                                   expireAfterSeconds=PASSWORD_DAYS_TO_EXPIRATION * 24 * 60 * 60)
+
+
+def get_notification_id(user_id: str, expiration_date: datetime.datetime, days: int) -> str:
+    return f'{user_id}:{expiration_date.strftime(DATETIME_FORMAT)}:{days}'
+
+
+def register_notification(user_id: str, expiration_date: datetime.datetime, days: int) -> bool:
+    """Returns False when the notification was already registered for the password and threshold"""
+    try:
+        PASSWORD_NOTIFICATIONS_COLLECTION.insert_one({
+            '_id': get_notification_id(user_id, expiration_date, days),
+            'user': user_id,
+            'days': days,
+            'creation_date': datetime.datetime.utcnow()
+        })
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def unregister_notification(user_id: str, expiration_date: datetime.datetime, days: int):
+    PASSWORD_NOTIFICATIONS_COLLECTION.delete_one({'_id': get_notification_id(user_id, expiration_date, days)})
@@ -0,0 +1,73 @@
+import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+from constants import QUESTION_POOL_TTL_DAYS, QUESTION_POOL_POPULAR_DAYS
+from domain.enums import Language
+from domain.evaluations import QuestionTopic
+from infra.batch_writer import BatchWriter
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+
+QUESTION_POOL_COLLECTION = AINTERVIEWER_CLIENT.question_pool
+QUESTION_TOPICS_COLLECTION = AINTERVIEWER_CLIENT.question_topics
+
+topics_writer = BatchWriter(QUESTION_TOPICS_COLLECTION, 'question-topics')
+
+
+def create_indexes():
+    QUESTION_POOL_COLLECTION.create_index([('language', ASCENDING), ('topic', ASCENDING),
+                                           ('creation_date', ASCENDING)])
+    QUESTION_POOL_COLLECTION.create_index('creation_date', expireAfterSeconds=QUESTION_POOL_TTL_DAYS * 24 * 60 * 60)
+    QUESTION_TOPICS_COLLECTION.create_index([('requests', DESCENDING)])
+    # Topics not requested in the last days stop being popular
+    QUESTION_TOPICS_COLLECTION.create_index('last_request_date',
+                                            expireAfterSeconds=QUESTION_POOL_POPULAR_DAYS * 24 * 60 * 60)
+
+
+def register_topic_request(topic: str, language: Language):
+    topics_writer.write(UpdateOne(
+        {'_id': f'{language.name}:{topic}'},
+        {'$inc': {'requests': 1},
+         '$set': {'topic': topic, 'language': language.name, 'last_request_date': datetime.datetime.utcnow()}},
+        upsert=True
+    ))
+
+
+def decay_topic_requests(factor: float):
+    QUESTION_TOPICS_COLLECTION.update_many({}, {'$mul': {'requests': factor}})
+
+
+def find_popular_topics(limit: int) -> List[QuestionTopic]:
+    topics = QUESTION_TOPICS_COLLECTION.find().sort('requests', DESCENDING).limit(limit)
+    return [deserialize_question_topic(topic_data) for topic_data in topics]
+
+
+def pop_question(topic: str, language: Language) -> Optional[str]:
+    question_data = QUESTION_POOL_COLLECTION.find_one_and_delete(
+        {'language': language.name, 'topic': topic},
+        sort=[('creation_date', ASCENDING)]
+    )
+    if question_data:
+        return question_data.get('text')
+
+
+def count_questions(topic: str, language: Language) -> int:
+    return QUESTION_POOL_COLLECTION.count_documents({'language': language.name, 'topic': topic})
+
+
+def insert_questions(topic: str, language: Language, questions: List[str]):
+    now = datetime.datetime.utcnow()
+    QUESTION_POOL_COLLECTION.insert_many([
+        {'topic': topic, 'language': language.name, 'text': question, 'creation_date': now}
+        for question in questions
+    ])
+
+
+def deserialize_question_topic(topic_data: Dict) -> QuestionTopic:
+    return QuestionTopic(
+        topic=topic_data.get('topic'),
+        language=Language[topic_data.get('language')],
+        requests=topic_data.get('requests'),
+        last_request_date=topic_data.get('last_request_date')
+    )
@@ -0,0 +1,23 @@
+import datetime
+
+from pymongo import ReturnDocument
+
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+
+LLM_QUOTAS_COLLECTION = AINTERVIEWER_CLIENT.llm_quotas
+
+
+def create_indexes():
+    LLM_QUOTAS_COLLECTION.create_index('expiration_date', expireAfterSeconds=0)
+
+
+def reserve_tokens(key: str, window: int, expiration_date: datetime.datetime, tokens: int) -> int:
+    """Atomically adds the tokens to the ones used by the key in the window, returns the total used"""
+    quota_data = LLM_QUOTAS_COLLECTION.find_one_and_update(
+        {'_id': f'{key}:{window}'},
+        {'$inc': {'used': tokens},
+         '$setOnInsert': {'key': key, 'window': window, 'expiration_date': expiration_date}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return quota_data.get('used')
@@ -0,0 +1,97 @@
+import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from constants import TASK_RUNS_RETENTION_DAYS
+from domain.enums import TaskRunStatus
+from domain.tasks import TaskRun
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT, AINTERVIEWER_LISTINGS_CLIENT
+
+TASK_RUNS_COLLECTION = AINTERVIEWER_CLIENT.task_runs
+TASK_RUNS_REPORTS_COLLECTION = AINTERVIEWER_LISTINGS_CLIENT.task_runs
+TASK_LOCKS_COLLECTION = AINTERVIEWER_CLIENT.task_locks
+
+
+def create_indexes():
+    TASK_RUNS_COLLECTION.create_index([('name', ASCENDING), ('start_date', DESCENDING)])
+    TASK_RUNS_COLLECTION.create_index('start_date', expireAfterSeconds=TASK_RUNS_RETENTION_DAYS * 24 * 60 * 60)
+
+
+def insert_run(task_run: TaskRun) -> bool:
+    """Returns False when another replica already started the run of the task scheduled at the same date"""
+    try:
+        TASK_RUNS_COLLECTION.insert_one(task_run.to_dict())
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def finish_run(task_run: TaskRun):
+    TASK_RUNS_COLLECTION.update_one(
+        {'_id': task_run.id},
+        {'$set': {
+            'status': task_run.status.name,
+            'finish_date': task_run.finish_date,
+            'duration': task_run.duration,
+            'error': task_run.error
+        }}
+    )
+
+
+def find_runs(name: Optional[str], limit: int) -> List[TaskRun]:
+    runs = TASK_RUNS_REPORTS_COLLECTION.find({'name': name} if name else {}).sort('start_date', DESCENDING).limit(limit)
+    return [deserialize_task_run(run_data) for run_data in runs]
+
+
+def aggregate_run_metrics(start_date: datetime.datetime) -> List[Dict]:
+    metrics = TASK_RUNS_REPORTS_COLLECTION.aggregate([
+        {'$match': {'start_date': {'$gte': start_date}}},
+        {'$group': {
+            '_id': '$name',
+            'runs': {'$sum': 1},
+            'failed': {'$sum': {'$cond': [{'$eq': ['$status', TaskRunStatus.FAILED.name]}, 1, 0]}},
+            'skipped': {'$sum': {'$cond': [{'$eq': ['$status', TaskRunStatus.SKIPPED.name]}, 1, 0]}},
+            'average_duration': {'$avg': '$duration'},
+            'max_duration': {'$max': '$duration'},
+            'last_start_date': {'$max': '$start_date'}
+        }},
+        {'$sort': {'_id': ASCENDING}}
+    ])
+    return [{'name': metric.pop('_id'), **metric} for metric in metrics]
+
+
+def acquire_lock(name: str, owner: str, lease_seconds: int) -> bool:
+    """Takes the lock of a task when it is free or its lease expired, so runs of a task never overlap"""
+    now = datetime.datetime.utcnow()
+    try:
+        TASK_LOCKS_COLLECTION.update_one(
+            {'_id': name, '$or': [{'lease_expiration_date': {'$lte': now}}, {'owner': owner}]},
+            {'$set': {'owner': owner, 'lease_expiration_date': now + datetime.timedelta(seconds=lease_seconds)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+def release_lock(name: str, owner: str):
+    TASK_LOCKS_COLLECTION.update_one(
+        {'_id': name, 'owner': owner},
+        {'$set': {'owner': None, 'lease_expiration_date': datetime.datetime.utcnow()}}
+    )
+
+
+def deserialize_task_run(run_data: Dict) -> TaskRun:
+    return TaskRun(
+        id=run_data.get('_id'),
+        name=run_data.get('name'),
+        scheduled_date=run_data.get('scheduled_date'),
+        owner=run_data.get('owner'),
+        start_date=run_data.get('start_date'),
+        status=TaskRunStatus[run_data.get('status')],
+        finish_date=run_data.get('finish_date'),
+        duration=run_data.get('duration'),
+        error=run_data.get('error')
+    )
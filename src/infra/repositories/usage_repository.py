@@ -0,0 +1,57 @@
+import datetime
+from typing import Dict, List
+
+from pymongo import ASCENDING, InsertOne
+
+from constants import USAGE_RETENTION_DAYS
+from domain.usage import ModelUsage
+from infra.batch_writer import BatchWriter
+from infra.repositories.general_repository import AINTERVIEWER_AUDIT_CLIENT, AINTERVIEWER_LISTINGS_CLIENT
+
+# The usage is the ledger the calls are billed from, it is written in batches so the write concern
+# of the audit does not slow down the requests
+MODEL_USAGE_COLLECTION = AINTERVIEWER_AUDIT_CLIENT.model_usage
+MODEL_USAGE_REPORTS_COLLECTION = AINTERVIEWER_LISTINGS_CLIENT.model_usage
+
+usage_writer = BatchWriter(MODEL_USAGE_COLLECTION, 'model-usage')
+
+USAGE_TOTALS = {
+    'calls': {'$sum': {'$cond': ['$cache_hit', 0, 1]}},
+    'cache_hits': {'$sum': {'$cond': ['$cache_hit', 1, 0]}},
+    'errors': {'$sum': {'$cond': ['$error', 1, 0]}},
+    'prompt_tokens': {'$sum': '$prompt_tokens'},
+    'completion_tokens': {'$sum': '$completion_tokens'},
+    'average_latency': {'$avg': {'$cond': ['$cache_hit', '$$REMOVE', '$latency']}},
+    'max_latency': {'$max': '$latency'}
+}
+
+
+def create_indexes():
+    MODEL_USAGE_COLLECTION.create_index('date', expireAfterSeconds=USAGE_RETENTION_DAYS * 24 * 60 * 60)
+    MODEL_USAGE_COLLECTION.create_index([('project', ASCENDING), ('date', ASCENDING)])
+
+
+def insert_usage(usage: ModelUsage):
+    usage_writer.write(InsertOne(usage.to_dict()))
+
+
+def aggregate_usage(group_id: Dict, start_date: datetime.datetime, end_date: datetime.datetime) -> List[Dict]:
+    usage = MODEL_USAGE_REPORTS_COLLECTION.aggregate([
+        {'$match': {'date': {'$gte': start_date, '$lt': end_date}}},
+        {'$group': {'_id': group_id, **USAGE_TOTALS}},
+        {'$sort': {'_id': ASCENDING}}
+    ])
+    return [deserialize_usage_totals(totals) for totals in usage]
+
+
+def aggregate_daily_usage(start_date: datetime.datetime, end_date: datetime.datetime) -> List[Dict]:
+    return aggregate_usage({'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$date'}},
+                            'operation': '$operation'}, start_date, end_date)
+
+
+def aggregate_project_usage(start_date: datetime.datetime, end_date: datetime.datetime) -> List[Dict]:
+    return aggregate_usage({'project': '$project', 'endpoint': '$endpoint'}, start_date, end_date)
+
+
+def deserialize_usage_totals(totals: Dict) -> Dict:
+    return {**totals.pop('_id'), **totals}
@@ -1,12 +1,23 @@
-from typing import Dict, List
+import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING
 
 from domain import utils
+from domain.broadcasts import Recipient
 from domain.enums import State, UserRole, Language
 from domain.users import User, \
     UserInvitation, ResetPasswordToken, UserPassword, RefreshToken
-from infra.repositories.general_repository import AINTERVIEWER_CLIENT
+from infra.repositories.general_repository import AINTERVIEWER_CLIENT, AINTERVIEWER_LISTINGS_CLIENT
 
 USERS_COLLECTION = AINTERVIEWER_CLIENT.users
+USERS_LISTINGS_COLLECTION = AINTERVIEWER_LISTINGS_CLIENT.users
+
+
+def create_indexes():
+    USERS_COLLECTION.create_index([('password_expiration_date', ASCENDING), ('_id', ASCENDING)])
+    USERS_COLLECTION.create_index('role_index')
+    USERS_COLLECTION.create_index([('search_tokens', ASCENDING), ('_id', ASCENDING)])
 
 
 def find_number_of_users() -> int:
@@ -15,13 +26,112 @@ def find_number_of_users() -> int:
 
 def find_users() -> List[User]:
     users: List[User] = []
-    for user_data in USERS_COLLECTION.find():
+    for user_data in USERS_LISTINGS_COLLECTION.find():
         user = deserialize_user(user_data)
         users.append(user)
 
     return users
 
 
+def find_users_by_role(role: UserRole) -> List[User]:
+    users = USERS_COLLECTION.find({'role_index': utils.get_blind_index(role.name)})
+    return [deserialize_user(user_data) for user_data in users]
+
+
+def search_users(tokens: List[str], excluded_role: UserRole, after_user_id: Optional[str],
+                 limit: int) -> List[User]:
+    """Page of users ordered by id having all the search tokens"""
+    query = {'search_tokens': {'$all': tokens}, 'role_index': {'$ne': utils.get_blind_index(excluded_role.name)}}
+    if after_user_id:
+        query['_id'] = {'$gt': after_user_id}
+
+    users = USERS_LISTINGS_COLLECTION.find(query).sort('_id', ASCENDING).limit(limit)
+    return [deserialize_user(user_data) for user_data in users]
+
+
+def find_recipients(after_user_id: Optional[str], limit: int) -> List[Recipient]:
+    """Page of users ordered by id reading only the fields needed to send them a message"""
+    query = {'_id': {'$gt': after_user_id}} if after_user_id else {}
+    users = USERS_COLLECTION.find(
+        query,
+        {'email': 1, 'nickname': 1, 'language': 1, 'anti_phishing_phrase': 1, 'role': 1}
+    ).sort('_id', ASCENDING).limit(limit)
+    return [deserialize_recipient(user_data) for user_data in users]
+
+
+def find_users_by_password_expiration(start_date: Optional[datetime.datetime],
+                                       end_date: datetime.datetime) -> List[User]:
+    """Users whose active password expires after start_date, when given, and until end_date"""
+    expiration_date = {'$lte': end_date}
+    if start_date:
+        expiration_date['$gt'] = start_date
+
+    users = USERS_COLLECTION.find({'password_expiration_date': expiration_date}) \
+        .sort([('password_expiration_date', ASCENDING), ('_id', ASCENDING)])
+    return [deserialize_user(user_data) for user_data in users]
+
+
+def find_users_in_range(start_id: Optional[str], end_id: Optional[str], after_user_id: Optional[str],
+                        limit: int) -> List[User]:
+    """Page of users ordered by id with start_id <= id < end_id, each bound only when given"""
+    id_range = {}
+    if start_id:
+        id_range['$gte'] = start_id
+    if after_user_id:
+        id_range['$gt'] = after_user_id
+    if end_id:
+        id_range['$lt'] = end_id
+
+    users = USERS_COLLECTION.find({'_id': id_range} if id_range else {}).sort('_id', ASCENDING).limit(limit)
+    return [deserialize_user(user_data) for user_data in users]
+
+
+def fix_password_expiration_date(user: User) -> bool:
+    """Returns True when the stored expiration date of the active password was out of date"""
+    expiration_date = user.get_password_expiration_date()
+    result = USERS_COLLECTION.update_one({'_id': user.id, 'password_expiration_date': {'$ne': expiration_date}},
+                                         {'$set': {'password_expiration_date': expiration_date}})
+    return result.modified_count > 0
+
+
+def backfill_password_expiration_dates() -> int:
+    """Stores the expiration date of the active password in the users created before it was indexed"""
+    updated = 0
+    for user_data in USERS_COLLECTION.find({'password_expiration_date': {'$exists': False}}):
+        user = deserialize_user(user_data)
+        USERS_COLLECTION.update_one({'_id': user.id},
+                                    {'$set': {'password_expiration_date': user.get_password_expiration_date()}})
+        updated += 1
+
+    return updated
+
+
+def backfill_role_indexes() -> int:
+    """Stores the blind index of the role in the users created before it was indexed"""
+    updated = 0
+    for user_data in USERS_COLLECTION.find({'role_index': {'$exists': False}}, {'role': 1}):
+        role = utils.decrypt_message(user_data.get('role'))
+        USERS_COLLECTION.update_one({'_id': user_data.get('_id')},
+                                    {'$set': {'role_index': utils.get_blind_index(role)}})
+        updated += 1
+
+    return updated
+
+
+def backfill_search_tokens() -> int:
+    """Stores the search tokens of the names in the users created before they were indexed"""
+    updated = 0
+    for user_data in USERS_COLLECTION.find({'search_tokens': {'$exists': False}},
+                                           {'nickname': 1, 'given_names': 1, 'family_names': 1}):
+        search_tokens = utils.get_search_tokens(utils.decrypt_message(user_data.get('nickname')),
+                                                utils.decrypt_message(user_data.get('given_names')),
+                                                utils.decrypt_message(user_data.get('family_names')))
+        USERS_COLLECTION.update_one({'_id': user_data.get('_id')}, {'$set': {'search_tokens': search_tokens}})
+        updated += 1
+
+    return updated
+
+
 def insert_user(user: User):
     USERS_COLLECTION.insert_one(user.to_dict())
 
@@ -37,8 +147,11 @@ def update_user(user: User):
             'language': utils.encrypt_message(user.language.name),
             'anti_phishing_phrase': utils.encrypt_message(user.anti_phishing_phrase),
             'role': utils.encrypt_message(user.role.name),
+            'role_index': utils.get_blind_index(user.role.name),
+            'search_tokens': user.get_search_tokens(),
             'state': utils.encrypt_message(user.state.name),
             'passwords': [password.to_dict() for password in user.passwords],
+            'password_expiration_date': user.get_password_expiration_date(),
             'refresh_tokens': [refresh_token.to_dict() for refresh_token in
                                user.refresh_tokens] if user.refresh_tokens else None,
             'invitations': [invitation.to_dict() for invitation in user.invitations] if user.invitations else None,
@@ -86,6 +199,17 @@ def deserialize_user(user_data: Dict) -> User:
     )
 
 
+def deserialize_recipient(user_data: Dict) -> Recipient:
+    return Recipient(
+        id=user_data.get('_id'),
+        email=utils.decrypt_message(user_data.get('email')),
+        nickname=utils.decrypt_message(user_data.get('nickname')),
+        language=Language[utils.decrypt_message(user_data.get('language'))],
+        anti_phishing_phrase=utils.decrypt_message(user_data.get('anti_phishing_phrase')),
+        role=UserRole[utils.decrypt_message(user_data.get('role'))]
+    )
+
+
 def deserialize_user_invitations(user_invitations_data: Dict) -> List[UserInvitation]:
     invitations = []
     if user_invitations_data:
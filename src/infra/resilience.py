@@ -0,0 +1,157 @@
+import contextlib
+import contextvars
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from constants import CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET_SECONDS
+from domain.enums import CircuitState
+from domain.exeptions import DeadlineExceededException, CircuitOpenException
+
+T = TypeVar('T')
+
+request_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('request_deadline', default=None)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float):
+    """Sets the time the current request has to finish, it is inherited by the calls done inside the block"""
+    current = request_deadline.get()
+    new_deadline = time.monotonic() + seconds
+    token = request_deadline.set(min(current, new_deadline) if current else new_deadline)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
+
+
+def remaining_seconds() -> Optional[float]:
+    current = request_deadline.get()
+    if current is None:
+        return None
+
+    return current - time.monotonic()
+
+
+def timeout_for(default: float) -> float:
+    """Timeout for an outbound call, the default one bounded by the remaining time of the request"""
+    remaining = remaining_seconds()
+    if remaining is None:
+        return default
+
+    if remaining <= 0:
+        raise DeadlineExceededException('Request deadline exceeded')
+
+    return min(default, remaining)
+
+
+class CircuitBreaker:
+    """Stops calling a dependency after consecutive failures, after reset_seconds a single trial call
+    is allowed and its result closes or opens the circuit again"""
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_BREAKER_FAILURES,
+                 reset_seconds: float = CIRCUIT_BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened_at = 0.0
+        self.trial_in_progress = False
+        self.lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        with self.lock:
+            if self.state == CircuitState.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_seconds
+
+            return self.state == CircuitState.CLOSED or not self.trial_in_progress
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == CircuitState.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                logging.info(f'Circuit {self.name} half open, trying a call')
+                self.state = CircuitState.HALF_OPEN
+
+            if self.state == CircuitState.CLOSED:
+                return True
+
+            if self.state == CircuitState.HALF_OPEN and not self.trial_in_progress:
+                self.trial_in_progress = True
+                return True
+
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CircuitState.CLOSED:
+                logging.info(f'Circuit {self.name} closed')
+
+            self.state = CircuitState.CLOSED
+            self.consecutive_failures = 0
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.trial_in_progress = False
+            if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != CircuitState.OPEN:
+                    logging.warning(f'Circuit {self.name} opened after {self.consecutive_failures} failures')
+                self.state = CircuitState.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Frees the trial of a half open circuit taken by a call that was not done"""
+        with self.lock:
+            self.trial_in_progress = False
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.reset_seconds - (time.monotonic() - self.opened_at)))
+
+    def call(self, function: Callable[..., T], *args, **kwargs) -> T:
+        if not self.allow():
+            raise CircuitOpenException(f'Circuit {self.name} is open', self.retry_after())
+
+        try:
+            result = function(*args, **kwargs)
+        except DeadlineExceededException:
+            # The dependency is not at fault when the request has no time left
+            self.release_trial()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+
+        self.record_success()
+        return result
+
+    def to_dict(self) -> Dict:
+        return {
+            'state': self.state.name,
+            'consecutive_failures': self.consecutive_failures,
+            'failures': self.failures,
+            'rejected': self.rejected
+        }
+
+
+BREAKERS: Dict[str, CircuitBreaker] = {}
+breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with breakers_lock:
+        if name not in BREAKERS:
+            BREAKERS[name] = CircuitBreaker(name)
+
+        return BREAKERS[name]
+
+
+def get_breakers_state() -> Dict:
+    return {name: breaker.to_dict() for name, breaker in BREAKERS.items()}
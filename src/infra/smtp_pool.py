@@ -0,0 +1,147 @@
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterator
+
+from infra import resilience
+
+# SMTP errors after which the connection can not be used again, the other ones are replies of the server to a
+# message. SMTPException is an OSError, so it must be caught before the OSError raised by the socket
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)
+# Rejections of a single message, they say nothing about the health of the server
+MESSAGE_REJECTIONS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)
+
+
+class SmtpConnection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.messages = 0
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.smtp.quit()
+        except Exception:
+            self.smtp.close()
+
+
+class SmtpPool:
+    """Thread safe pool of authenticated SMTP connections, so sending a message costs only the mail exchange.
+    Connections idle for a while are checked with NOOP before being reused, the broken ones are replaced
+    and each one is closed after sending max_messages"""
+
+    def __init__(self, host: str, port: int, user: str, password: str, size: int, max_messages: int,
+                 keepalive_seconds: float, timeout: float, use_tls: bool = True):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.size = size
+        self.max_messages = max_messages
+        self.keepalive_seconds = keepalive_seconds
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self.idle = deque()
+        self.lock = threading.Lock()
+        self.available = threading.BoundedSemaphore(size)
+
+    def connect(self) -> SmtpConnection:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=resilience.timeout_for(self.timeout))
+        try:
+            if self.use_tls:
+                smtp.starttls(context=ssl.create_default_context())
+            if self.user:
+                smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+
+        return SmtpConnection(smtp)
+
+    def is_alive(self, connection: SmtpConnection) -> bool:
+        if time.monotonic() - connection.last_used < self.keepalive_seconds:
+            return True
+
+        try:
+            return connection.smtp.noop()[0] == 250
+        except OSError:
+            return False
+
+    def checkout(self) -> SmtpConnection:
+        if not self.available.acquire(timeout=resilience.timeout_for(self.timeout)):
+            raise TimeoutError('No SMTP connection available')
+
+        try:
+            while True:
+                with self.lock:
+                    connection = self.idle.pop() if self.idle else None
+
+                if not connection:
+                    return self.connect()
+
+                if self.is_alive(connection):
+                    connection.smtp.sock.settimeout(resilience.timeout_for(self.timeout))
+                    return connection
+
+                logging.info(f'Replacing SMTP connection to {self.host} not alive')
+                connection.close()
+        except Exception:
+            self.available.release()
+            raise
+
+    def checkin(self, connection: SmtpConnection, reusable: bool = True):
+        connection.last_used = time.monotonic()
+        if reusable and connection.messages < self.max_messages:
+            with self.lock:
+                self.idle.append(connection)
+        else:
+            connection.close()
+
+        self.available.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[SmtpConnection]:
+        connection = self.checkout()
+        try:
+            yield connection
+        except CONNECTION_ERRORS:
+            self.checkin(connection, reusable=False)
+            raise
+        except smtplib.SMTPException:
+            # A rejected message leaves the transaction open, the connection is reused after a reset
+            try:
+                connection.smtp.rset()
+                self.checkin(connection)
+            except Exception:
+                self.checkin(connection, reusable=False)
+            raise
+        except BaseException:
+            self.checkin(connection, reusable=False)
+            raise
+        else:
+            self.checkin(connection)
+
+    def send(self, sender: str, to: str, message: str):
+        # A connection closed by the server while idle is replaced once
+        for attempt in range(2):
+            try:
+                with self.connection() as connection:
+                    connection.smtp.sendmail(sender, to, message)
+                    connection.messages += 1
+                    return
+            except smtplib.SMTPServerDisconnected as e:
+                if attempt:
+                    raise
+                logging.warning(f'SMTP connection to {self.host} lost, reconnecting, error {e}')
+
+    def close(self):
+        with self.lock:
+            connections = list(self.idle)
+            self.idle.clear()
+
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,43 @@
+import datetime
+import logging
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+import infra.repositories.usage_repository as usage_repo
+from domain.usage import ModelUsage
+
+# User, project and endpoint the calls to the model are done for, set while handling a request or a job
+usage_context: ContextVar[Dict] = ContextVar('usage_context', default={})
+
+
+def reset_usage_context(**values):
+    usage_context.set(values)
+
+
+def set_usage_context(**values):
+    # A new dictionary so the contexts copied before keep their values
+    usage_context.set({**usage_context.get(), **values})
+
+
+def record_usage(operation: str, cache_hit: bool = False, model: Optional[str] = None, backend: Optional[str] = None,
+                 prompt_tokens: int = 0, completion_tokens: int = 0, latency: float = 0, error: bool = False):
+    context = usage_context.get()
+    try:
+        usage_repo.insert_usage(ModelUsage(
+            id=str(uuid.uuid4()),
+            date=datetime.datetime.utcnow(),
+            operation=operation,
+            cache_hit=cache_hit,
+            model=model,
+            backend=backend,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            latency=latency,
+            error=error,
+            user=context.get('user'),
+            project=context.get('project'),
+            endpoint=context.get('endpoint')
+        ))
+    except Exception as e:
+        logging.error(f'Error recording model usage, error {e}')
@@ -2,16 +2,32 @@ import logging
 import time
 from logging import handlers
 
+import pymongo
 import uvicorn
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from pymongo.errors import PyMongoError, ConnectionFailure
+from starlette import status
 from starlette.requests import Request
 
-from constants import API_PORT, API_RELOAD, LOG_LEVEL, WEB_UI_PATH
+import infra.batch_writer as batch_writer
+import services.admin_services as adm_serv
+import services.health_services as health_serv
+from constants import API_PORT, API_RELOAD, LOG_LEVEL, WEB_UI_PATH, REQUEST_DEADLINE_SECONDS, \
+    REQUEST_DEADLINE_EXCEEDED, DEPENDENCY_UNAVAILABLE, MAX_REQUEST_BODY_BYTES, REQUEST_TOO_LARGE
+from domain import utils
+from domain.enums import CircuitState
+from domain.exeptions import DeadlineExceededException, CircuitOpenException
+from infra import resilience, usage_tracker
+from infra.repositories.general_repository import mongo_breaker
 from rest_api.admin_api import admin_api
 from rest_api.evaluation_api import evaluation_api
+from rest_api.health_api import health_api
+from rest_api.job_api import job_api
 from rest_api.project_api import project_api
 from rest_api.security_api import security_api
+from rest_api.serialization import FastJSONResponse
 from rest_api.user_api import users_api
 
 LOG_FILENAME = f'data/logs/API.log'
@@ -21,6 +37,8 @@ ADMIN_PREFIX = '/admin'
 USERS_PREFIX = '/users'
 PROJECTS_PREFIX = '/projects'
 EVALUATIONS_PREFIX = '/evaluations'
+JOBS_PREFIX = '/jobs'
+HEALTH_PREFIX = '/health'
 
 handler = handlers.TimedRotatingFileHandler(filename=LOG_FILENAME, when='midnight', backupCount=60)
 logging.basicConfig(format='[%(asctime)s] - %(levelname)s %(message)s', level=LOG_LEVEL, handlers=[handler])
@@ -45,13 +63,22 @@ tags_metadata = [
     {
         "name": "Evaluations",
         "description": "Operations with evaluations"
+    },
+    {
+        "name": "Jobs",
+        "description": "Operations queued to be processed in background by the tasks workers"
+    },
+    {
+        "name": "Health",
+        "description": "Liveness and readiness probes"
     }
 ]
 
 app = FastAPI(title="AInterviewer",
               description="API documentation for backend services in AInterviewer",
               version="1.0.0",
-              openapi_tags=tags_metadata)
+              openapi_tags=tags_metadata,
+              default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -76,18 +103,25 @@ def not_log_methods(request: Request):
 
 
 async def log_json(request: Request):
-    if not not_log_methods(request) and await request.body():
+    body = await request.body()
+    if len(body) > MAX_REQUEST_BODY_BYTES:
+        # Bodies sent without Content-Length are only measured once read
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=REQUEST_TOO_LARGE)
+
+    query_params = utils.get_excerpt(str(request.query_params))
+    if not not_log_methods(request) and body:
         logging.info(
-            f'method={request.method}, url={request.url.path}, query_params={request.query_params}, '
-            f'path_params={request.path_params}, request.json={await request.json()}')
+            f'method={request.method}, url={request.url.path}, query_params={query_params}, '
+            f'path_params={request.path_params}, request.json={utils.get_excerpt(str(await request.json()))}')
     else:
         logging.info(
-            f'method={request.method}, url={request.url.path}, query_params={request.query_params}, '
+            f'method={request.method}, url={request.url.path}, query_params={query_params}, '
             f'path_params={request.path_params}')
 
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
+    usage_tracker.reset_usage_context(endpoint=request.url.path)
     start_time = time.time()
     response = await call_next(request)
     process_time = (time.time() - start_time) * 1000
@@ -100,11 +134,85 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+@app.middleware("http")
+async def limit_body_size(request: Request, call_next):
+    content_length = request.headers.get('content-length')
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BODY_BYTES:
+        return JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            content={'detail': REQUEST_TOO_LARGE})
+
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def apply_deadline(request: Request, call_next):
+    trial = False
+    if not request.url.path.startswith(HEALTH_PREFIX):
+        # Once the reset time of an open circuit passes a single request is let through as the trial
+        if not mongo_breaker.allow():
+            return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                content={'detail': DEPENDENCY_UNAVAILABLE},
+                                headers={'Retry-After': str(mongo_breaker.retry_after())})
+        trial = mongo_breaker.state == CircuitState.HALF_OPEN
+
+    try:
+        with resilience.deadline(REQUEST_DEADLINE_SECONDS), pymongo.timeout(REQUEST_DEADLINE_SECONDS):
+            return await call_next(request)
+    finally:
+        if trial:
+            # The queries of the trial close or open the circuit, when it did not query the next request is the trial
+            mongo_breaker.release_trial()
+
+
+@app.exception_handler(DeadlineExceededException)
+async def deadline_exceeded_handler(request: Request, e: DeadlineExceededException):
+    logging.warning(f'method={request.method}, path={request.url.path}, {e.message}')
+    return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                        content={'detail': REQUEST_DEADLINE_EXCEEDED})
+
+
+@app.exception_handler(CircuitOpenException)
+async def circuit_open_handler(request: Request, e: CircuitOpenException):
+    logging.warning(f'method={request.method}, path={request.url.path}, {e.message}')
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content={'detail': DEPENDENCY_UNAVAILABLE},
+                        headers={'Retry-After': str(e.retry_after)})
+
+
+@app.exception_handler(PyMongoError)
+async def database_error_handler(request: Request, e: PyMongoError):
+    logging.error(f'method={request.method}, path={request.url.path}, database error {e}', exc_info=e)
+    if isinstance(e, ConnectionFailure):
+        # Server selection errors are not seen by the command listener
+        mongo_breaker.record_failure()
+
+    if e.timeout:
+        return JSONResponse(status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                            content={'detail': REQUEST_DEADLINE_EXCEEDED})
+
+    return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        content={'detail': 'Internal Server Error'})
+
+
+@app.on_event('startup')
+def startup():
+    utils.check_blind_index_key()
+    adm_serv.create_indexes()
+    health_serv.warm_up()
+
+
+@app.on_event('shutdown')
+def shutdown():
+    batch_writer.flush_all()
+
+
 app.include_router(security_api, prefix=SECURITY_PREFIX, dependencies=[Depends(log_json)])
 app.include_router(admin_api, prefix=ADMIN_PREFIX, dependencies=[Depends(log_json)])
 app.include_router(users_api, prefix=USERS_PREFIX, dependencies=[Depends(log_json)])
 app.include_router(project_api, prefix=PROJECTS_PREFIX, dependencies=[Depends(log_json)])
 app.include_router(evaluation_api, prefix=EVALUATIONS_PREFIX, dependencies=[Depends(log_json)])
+app.include_router(job_api, prefix=JOBS_PREFIX, dependencies=[Depends(log_json)])
+app.include_router(health_api, prefix=HEALTH_PREFIX)
 
 if __name__ == '__main__':
     uvicorn.run('main:app', host='0.0.0.0', port=API_PORT, reload=API_RELOAD)
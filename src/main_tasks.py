@@ -1,25 +1,51 @@
 import logging
+import threading
 
 from apscheduler.schedulers.blocking import BlockingScheduler
-from apscheduler.triggers.cron import CronTrigger
 
 import services.admin_services as adm_serv
+import services.broadcast_services as broadcast_serv
+import services.job_services as job_serv
+import services.outbox_services as outbox_serv
+import services.task_services as task_serv
 import services.user_services as user_serv
-from constants import PROCESS_USERS_CRON
+from constants import JOB_WORKERS, OUTBOX_DISPATCHERS, BROADCASTERS, TASK_MISFIRE_GRACE_SECONDS
+from domain import utils
 from infra.logs import logging_config
 
-scheduler = BlockingScheduler()
+# Every replica keeps its own jobs in memory and fires them, a run is executed only by the first replica
+# registering it in the task runs and while no other one holds the lock of the task
+scheduler = BlockingScheduler(
+    job_defaults={'coalesce': True, 'misfire_grace_time': TASK_MISFIRE_GRACE_SECONDS, 'max_instances': 1},
+    timezone='UTC'
+)
+stop_workers = threading.Event()
 
 
 def configure_app():
     logging_config()
+    # Fails the start before the backfills write any blind index with a missing or shared key
+    utils.check_blind_index_key()
     adm_serv.start_app()
+    adm_serv.create_indexes()
+    adm_serv.preload_templates()
+    user_serv.backfill_password_expiration_dates()
+    user_serv.backfill_role_indexes()
+    user_serv.backfill_search_tokens()
 
 
 if __name__ == "__main__":
     configure_app()
     logging.info('Ready to manage cron tasks...')
-    scheduler.add_job(user_serv.check_expired_passwords, CronTrigger.from_crontab(PROCESS_USERS_CRON))
+    for task_name in task_serv.TASKS:
+        scheduler.add_job(task_serv.run_scheduled_task, task_serv.get_trigger(task_name), args=[task_name],
+                          id=task_name)
+    job_serv.start_workers(JOB_WORKERS, stop_workers)
+    logging.info(f'Started {JOB_WORKERS} job workers...')
+    outbox_serv.start_dispatchers(OUTBOX_DISPATCHERS, stop_workers)
+    logging.info(f'Started {OUTBOX_DISPATCHERS} email dispatchers...')
+    broadcast_serv.start_broadcasters(BROADCASTERS, stop_workers)
+    logging.info(f'Started {BROADCASTERS} broadcasters...')
 
 # Starting cron tasks
 scheduler.start()
@@ -1,17 +1,21 @@
-from typing import Dict, List
+import datetime
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from starlette import status
 
 import services.admin_services as admin_serv
 import services.audit_services as audit
 import services.security_services as sec_serv
+import services.task_services as task_serv
 import services.user_services as user_serv
+from constants import TASK_RUNS_RETENTION_DAYS
 from domain.enums import UserRole
 from domain.users import User
 from rest_api.dtos import SendMessageToUserRequest, SendMessageToAllUsersRequest
+from rest_api.serialization import FastJSONRoute
 
-admin_api = APIRouter()
+admin_api = APIRouter(route_class=FastJSONRoute)
 
 
 def check_allowed_admin_action(user: User):
@@ -57,13 +61,65 @@ async def send_message_to_user(send_message_request: SendMessageToUserRequest,
         audit.audit_entity(user.id, 'sent_message_to_user', send_message_request.to_audit())
 
 
-@admin_api.post('/send_message_to_all_users', tags=['Admin'], status_code=status.HTTP_200_OK)
-async def send_message_to_user(send_message_request: SendMessageToAllUsersRequest,
-                               user: User = Depends(sec_serv.get_current_user)) -> bool:
-    """Send a message to all users that has the language selected"""
+@admin_api.post('/send_message_to_all_users', tags=['Admin'], status_code=status.HTTP_202_ACCEPTED)
+async def send_message_to_all_users(send_message_request: SendMessageToAllUsersRequest,
+                                    user: User = Depends(sec_serv.get_current_user)) -> str:
+    """Queues a message to all users that has the language selected, returns the broadcast id"""
     try:
         check_allowed_admin_action(user)
-        admin_serv.send_message_to_all_users(send_message_request)
-        return True
+        return admin_serv.send_message_to_all_users(send_message_request, user)
     finally:
         audit.audit_entity(user.id, 'sent_message_to_all_users', send_message_request.to_audit())
+
+
+@admin_api.get('/broadcasts/{broadcast_id}', tags=['Admin'], status_code=status.HTTP_200_OK)
+async def get_broadcast(broadcast_id: str, user: User = Depends(sec_serv.get_current_user)) -> Dict:
+    """Returns the status and progress of a message sent to all users"""
+    check_allowed_admin_action(user)
+    return admin_serv.get_broadcast(broadcast_id)
+
+
+@admin_api.get('/model_backends', tags=['Admin'], status_code=status.HTTP_200_OK)
+async def get_model_backends(user: User = Depends(sec_serv.get_current_user)) -> Dict:
+    """Returns the health and latency of each language model backend"""
+    check_allowed_admin_action(user)
+    return admin_serv.get_model_backends()
+
+
+@admin_api.get('/circuit_breakers', tags=['Admin'], status_code=status.HTTP_200_OK)
+async def get_circuit_breakers(user: User = Depends(sec_serv.get_current_user)) -> Dict:
+    """Returns the state of the circuit breakers of the dependencies"""
+    check_allowed_admin_action(user)
+    return admin_serv.get_circuit_breakers()
+
+
+@admin_api.get('/model_usage/daily', tags=['Admin'], status_code=status.HTTP_200_OK)
+async def get_daily_model_usage(start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None,
+                                user: User = Depends(sec_serv.get_current_user)) -> List[Dict]:
+    """Returns the calls, cache hits, tokens and latency of the language model per day and operation"""
+    check_allowed_admin_action(user)
+    return admin_serv.get_daily_model_usage(start_date, end_date)
+
+
+@admin_api.get('/model_usage/projects', tags=['Admin'], status_code=status.HTTP_200_OK)
+async def get_project_model_usage(start_date: Optional[datetime.date] = None, end_date: Optional[datetime.date] = None,
+                                  user: User = Depends(sec_serv.get_current_user)) -> List[Dict]:
+    """Returns the calls, cache hits, tokens and latency of the language model per project and endpoint"""
+    check_allowed_admin_action(user)
+    return admin_serv.get_project_model_usage(start_date, end_date)
+
+
+@admin_api.get('/task_runs', tags=['Admin'], status_code=status.HTTP_200_OK)
+async def get_task_runs(name: Optional[str] = None, limit: int = Query(50, ge=1, le=500),
+                        user: User = Depends(sec_serv.get_current_user)) -> List[Dict]:
+    """Returns the last runs of the scheduled tasks, with the replica that executed them"""
+    check_allowed_admin_action(user)
+    return task_serv.get_task_runs(name, limit)
+
+
+@admin_api.get('/task_metrics', tags=['Admin'], status_code=status.HTTP_200_OK)
+async def get_task_metrics(days: int = Query(7, ge=1, le=TASK_RUNS_RETENTION_DAYS),
+                           user: User = Depends(sec_serv.get_current_user)) -> List[Dict]:
+    """Returns the runs, failures, skips and durations of each scheduled task"""
+    check_allowed_admin_action(user)
+    return task_serv.get_task_metrics(days)
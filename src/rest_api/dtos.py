@@ -1,11 +1,21 @@
 import datetime
+from typing import List, Optional
 
 from pydantic import BaseModel, EmailStr, validator
 
+from constants import MAX_ANSWER_CHARS
 from domain import utils
 from domain.enums import Language, UserRole
 
 INVALID_PASSWORD = 'Invalid password'
+ANSWER_TOO_LONG = f'The answer can not be longer than {MAX_ANSWER_CHARS} characters'
+MAXIMUM_TOPICS_TO_GENERATE = 50
+
+
+def valid_answer_length(cls, value):
+    if len(value) > MAX_ANSWER_CHARS:
+        raise ValueError(ANSWER_TOO_LONG)
+    return value
 
 
 class InviteUserRequest(BaseModel):
@@ -219,3 +229,76 @@ class DeleteQuestionRequest(BaseModel):
             'evaluation_id': self.evaluation_id,
             'question_id': self.question_id,
         }
+
+
+class AnswerRequest(BaseModel):
+    question_id: str
+    answer: str
+
+    valid_answer = validator('answer', allow_reuse=True)(valid_answer_length)
+
+
+class EvaluateAnswersRequest(BaseModel):
+    project_id: str
+    evaluation_id: str
+    answers: List[AnswerRequest]
+    candidate: Optional[str] = None
+    fast: bool = False
+
+    @validator('answers')
+    def not_empty_answers(cls, value):
+        if not value:
+            raise ValueError('At least one answer is required')
+        return value
+
+    def to_audit(self):
+        return {
+            'project_id': self.project_id,
+            'evaluation_id': self.evaluation_id,
+            'question_ids': [answer.question_id for answer in self.answers],
+            'candidate': self.candidate
+        }
+
+
+class EvaluateAnswerRequest(BaseModel):
+    question: str
+    answer: str
+    project_id: Optional[str] = None
+    evaluation_id: Optional[str] = None
+    question_id: Optional[str] = None
+    candidate: Optional[str] = None
+    fast: bool = False
+
+    valid_answer = validator('answer', allow_reuse=True)(valid_answer_length)
+
+    def to_audit(self):
+        return {
+            'question': utils.get_excerpt(self.question),
+            'answer': utils.get_excerpt(self.answer),
+            'evaluation_id': self.evaluation_id,
+            'question_id': self.question_id,
+            'candidate': self.candidate
+        }
+
+
+class GenerateQuestionsRequest(BaseModel):
+    project_id: str
+    evaluation_id: str
+    topics: List[str]
+    mandatory: bool = True
+    time_to_respond: datetime.time
+
+    @validator('topics')
+    def valid_topics(cls, value):
+        if not value or len(value) > MAXIMUM_TOPICS_TO_GENERATE:
+            raise ValueError(f'Between 1 and {MAXIMUM_TOPICS_TO_GENERATE} topics are required')
+        return value
+
+    def to_audit(self):
+        return {
+            'project_id': self.project_id,
+            'evaluation_id': self.evaluation_id,
+            'topics': self.topics,
+            'mandatory': self.mandatory,
+            'time_to_respond': self.time_to_respond
+        }
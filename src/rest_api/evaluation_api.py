@@ -1,18 +1,51 @@
-from typing import List, Dict
+import logging
+from typing import Callable, List, Dict, Iterator, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from starlette import status
 
 import services.audit_services as audit
 import services.evaluation_services as eval_serv
+import services.quota_services as quota_serv
 import services.security_services as sec_serv
+from constants import MAX_ANSWER_CHARS, REQUEST_DEADLINE_EXCEEDED, DEPENDENCY_UNAVAILABLE, MODEL_RESPONSE_NOT_VALID
+from domain import utils
 from domain.enums import Language
 from domain.evaluations import EvaluationResult
+from domain.exeptions import AIModelException, CircuitOpenException, DeadlineExceededException
 from domain.users import User
 from rest_api.dtos import CreateEvaluationRequest, UpdateEvaluationInfoRequest, CreateQuestionRequest, \
-    UpdateQuestionRequest, DeleteQuestionRequest
+    UpdateQuestionRequest, DeleteQuestionRequest, EvaluateAnswersRequest, GenerateQuestionsRequest, \
+    EvaluateAnswerRequest
+from rest_api.serialization import FastJSONRoute
 
-evaluation_api = APIRouter()
+evaluation_api = APIRouter(route_class=FastJSONRoute)
+
+
+STREAM_ERRORS = {
+    AIModelException: MODEL_RESPONSE_NOT_VALID,
+    CircuitOpenException: DEPENDENCY_UNAVAILABLE,
+    DeadlineExceededException: REQUEST_DEADLINE_EXCEEDED
+}
+
+
+def to_server_sent_events(tokens: Iterator[str], on_finish: Optional[Callable[[], None]] = None) -> Iterator[str]:
+    """The errors raised once the headers are sent are sent as an error event, on_finish is called
+    when the stream ends, fails or the client leaves"""
+    try:
+        try:
+            for token in tokens:
+                yield f'data: {token}\n\n'
+        except Exception as e:
+            logging.error(f'Error streaming the response\n{e}', exc_info=not isinstance(e, tuple(STREAM_ERRORS)))
+            yield f'event: error\ndata: {STREAM_ERRORS.get(type(e), "Internal Server Error")}\n\n'
+            return
+
+        yield 'event: end\ndata: \n\n'
+    finally:
+        if on_finish:
+            on_finish()
 
 
 @evaluation_api.post('/create_evaluation', tags=['Evaluations'], status_code=status.HTTP_201_CREATED)
@@ -83,20 +116,97 @@ async def delete_question(delete_question_request: DeleteQuestionRequest,
 
 
 @evaluation_api.get('/generate_question', tags=['Evaluations'], status_code=status.HTTP_200_OK)
-async def generate_question(topic: str, language: Language,
-                            user: User = Depends(sec_serv.get_current_user)) -> str:
+def generate_question(topic: str, language: Language,
+                      user: User = Depends(sec_serv.get_current_user)) -> str:
     """Generates a question given a topic to ask"""
     try:
+        quota_serv.consume_llm_quota(user)
         return eval_serv.generate_question(topic, language)
     finally:
         audit.audit_entity(user.id, 'generated_question', {'topic': topic})
 
 
+@evaluation_api.post('/generate_questions', tags=['Evaluations'], status_code=status.HTTP_201_CREATED)
+def generate_questions(generate_questions_request: GenerateQuestionsRequest,
+                       user: User = Depends(sec_serv.get_current_user)) -> Dict:
+    """Generates a question for each topic and adds them to the evaluation,
+    the topics whose question could not be generated are reported in the errors"""
+    try:
+        return eval_serv.generate_questions(generate_questions_request, user)
+    finally:
+        audit.audit_entity(user.id, 'generated_questions', generate_questions_request.to_audit())
+
+
+@evaluation_api.get('/generate_question_stream', tags=['Evaluations'], status_code=status.HTTP_200_OK)
+async def generate_question_stream(topic: str, language: Language,
+                                   user: User = Depends(sec_serv.get_current_user)) -> StreamingResponse:
+    """Generates a question given a topic to ask, sending the text as Server-Sent Events while it is generated"""
+
+    def audit_generated():
+        audit.audit_entity(user.id, 'generated_question', {'topic': topic})
+
+    try:
+        quota_serv.consume_llm_quota(user)
+        tokens = eval_serv.stream_question(topic, language)
+    except Exception:
+        audit_generated()
+        raise
+
+    # The question is audited once it is streamed
+    return StreamingResponse(to_server_sent_events(tokens, audit_generated),
+                             media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 @evaluation_api.get('/evaluate_answer', tags=['Evaluations'], status_code=status.HTTP_200_OK)
-async def evaluate_answer(question: str, answer: str,
-                          user: User = Depends(sec_serv.get_current_user)) -> EvaluationResult:
-    """Evaluates from 1 to 5 the response given by a candidate to a question"""
+def evaluate_answer(question: str, answer: str = Query(max_length=MAX_ANSWER_CHARS),
+                    project_id: Optional[str] = None, evaluation_id: Optional[str] = None,
+                    question_id: Optional[str] = None, candidate: Optional[str] = None, fast: bool = False,
+                    user: User = Depends(sec_serv.get_current_user)) -> EvaluationResult:
+    """Evaluates from 1 to 5 the response given by a candidate to a question, the fast mode returns only the grade,
+    the result is stored when the project, evaluation, question and candidate are given"""
+    try:
+        return eval_serv.evaluate_answer(question, answer, user, project_id, evaluation_id, question_id, candidate,
+                                         fast)
+    finally:
+        audit.audit_entity(user.id, 'evaluated_answer',
+                           {'question': utils.get_excerpt(question), 'answer': utils.get_excerpt(answer),
+                            'evaluation_id': evaluation_id, 'question_id': question_id, 'candidate': candidate})
+
+
+@evaluation_api.post('/evaluate_answer', tags=['Evaluations'], status_code=status.HTTP_200_OK)
+def evaluate_answer_body(evaluate_answer_request: EvaluateAnswerRequest,
+                         user: User = Depends(sec_serv.get_current_user)) -> EvaluationResult:
+    """Same as the GET version but receiving the question and the answer in the body, for long answers"""
     try:
-        return eval_serv.evaluate_answer(question, answer)
+        return eval_serv.evaluate_answer(evaluate_answer_request.question, evaluate_answer_request.answer, user,
+                                         evaluate_answer_request.project_id, evaluate_answer_request.evaluation_id,
+                                         evaluate_answer_request.question_id, evaluate_answer_request.candidate,
+                                         evaluate_answer_request.fast)
     finally:
-        audit.audit_entity(user.id, 'evaluated_answer', {'question': question, 'answer': answer})
+        audit.audit_entity(user.id, 'evaluated_answer', evaluate_answer_request.to_audit())
+
+
+@evaluation_api.post('/evaluate_answers', tags=['Evaluations'], status_code=status.HTTP_200_OK)
+def evaluate_answers(evaluate_answers_request: EvaluateAnswersRequest,
+                     user: User = Depends(sec_serv.get_current_user)) -> Dict:
+    """Evaluates from 1 to 5 all the responses given by a candidate to the questions of an evaluation,
+    the answers that could not be evaluated are reported in the errors"""
+    try:
+        return eval_serv.evaluate_answers(evaluate_answers_request, user)
+    finally:
+        audit.audit_entity(user.id, 'evaluated_answers', evaluate_answers_request.to_audit())
+
+
+@evaluation_api.get('/results', tags=['Evaluations'], status_code=status.HTTP_200_OK)
+async def get_evaluation_results(project_id: str, evaluation_id: str, candidate: Optional[str] = None,
+                                 user: User = Depends(sec_serv.get_current_user)) -> List[EvaluationResult]:
+    """Returns the stored results of an evaluation, optionally only the ones of a candidate"""
+    return eval_serv.get_evaluation_results(project_id, evaluation_id, user, candidate)
+
+
+@evaluation_api.get('/question_results', tags=['Evaluations'], status_code=status.HTTP_200_OK)
+async def get_question_results(project_id: str, evaluation_id: str, question_id: str,
+                               user: User = Depends(sec_serv.get_current_user)) -> List[EvaluationResult]:
+    """Returns the stored results of a question, the most recent first"""
+    return eval_serv.get_question_results(project_id, evaluation_id, question_id, user)
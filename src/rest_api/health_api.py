@@ -0,0 +1,25 @@
+from typing import Dict
+
+from fastapi import APIRouter, Response
+from starlette import status
+
+import services.health_services as health_serv
+from rest_api.serialization import FastJSONRoute
+
+health_api = APIRouter(route_class=FastJSONRoute)
+
+
+@health_api.get('/live', tags=['Health'], status_code=status.HTTP_200_OK)
+async def live() -> Dict:
+    """The process is up and serving requests"""
+    return {'status': 'alive'}
+
+
+@health_api.get('/ready', tags=['Health'], status_code=status.HTTP_200_OK)
+def ready(response: Response) -> Dict:
+    """The application warmed up and its database answers, run in the threadpool since it pings the database"""
+    is_ready, readiness = health_serv.get_readiness()
+    if not is_ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+
+    return readiness
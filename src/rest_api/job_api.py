@@ -0,0 +1,52 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+from starlette import status
+
+import services.audit_services as audit
+import services.job_services as job_serv
+import services.quota_services as quota_serv
+import services.security_services as sec_serv
+from domain.enums import Language
+from domain.users import User
+from rest_api.dtos import EvaluateAnswersRequest, EvaluateAnswerRequest
+from rest_api.serialization import FastJSONRoute
+
+job_api = APIRouter(route_class=FastJSONRoute)
+
+
+@job_api.post('/evaluate_answer', tags=['Jobs'], status_code=status.HTTP_202_ACCEPTED)
+async def evaluate_answer(evaluate_answer_request: EvaluateAnswerRequest,
+                          user: User = Depends(sec_serv.get_current_user)) -> str:
+    """Queues the evaluation of the response given by a candidate to a question, returns the job id"""
+    try:
+        return job_serv.submit_evaluate_answer(evaluate_answer_request, user)
+    finally:
+        audit.audit_entity(user.id, 'queued_evaluate_answer', evaluate_answer_request.to_audit())
+
+
+@job_api.post('/evaluate_answers', tags=['Jobs'], status_code=status.HTTP_202_ACCEPTED)
+async def evaluate_answers(evaluate_answers_request: EvaluateAnswersRequest,
+                           user: User = Depends(sec_serv.get_current_user)) -> str:
+    """Queues the evaluation of all the responses given by a candidate in an evaluation, returns the job id"""
+    try:
+        return job_serv.submit_evaluate_answers(evaluate_answers_request, user)
+    finally:
+        audit.audit_entity(user.id, 'queued_evaluate_answers', evaluate_answers_request.to_audit())
+
+
+@job_api.post('/generate_question', tags=['Jobs'], status_code=status.HTTP_202_ACCEPTED)
+async def generate_question(topic: str, language: Language,
+                            user: User = Depends(sec_serv.get_current_user)) -> str:
+    """Queues the generation of a question given a topic to ask, returns the job id"""
+    try:
+        quota_serv.consume_llm_quota(user)
+        return job_serv.submit_generate_question(topic, language, user)
+    finally:
+        audit.audit_entity(user.id, 'queued_generate_question', {'topic': topic})
+
+
+@job_api.get('/{job_id}', tags=['Jobs'], status_code=status.HTTP_200_OK)
+async def get_job(job_id: str, user: User = Depends(sec_serv.get_current_user)) -> Dict:
+    """Returns the status of a job and its result when it is done"""
+    return job_serv.get_job(job_id, user)
@@ -7,8 +7,9 @@ import services.audit_services as audit
 import services.project_services as pr_serv
 import services.security_services as sec_serv
 from domain.users import User
+from rest_api.serialization import FastJSONRoute
 
-project_api = APIRouter()
+project_api = APIRouter(route_class=FastJSONRoute)
 
 
 @project_api.post('/create_project', tags=['Projects'], status_code=status.HTTP_201_CREATED)
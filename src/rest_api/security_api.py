@@ -10,8 +10,9 @@ import services.audit_services as audit
 from domain.users import User
 from rest_api.dtos import ChangePasswordRequest, ReassignExpiredPasswordRequest, \
     ForgotPasswordRequest, ResetPasswordRequest
+from rest_api.serialization import FastJSONRoute
 
-security_api = APIRouter()
+security_api = APIRouter(route_class=FastJSONRoute)
 
 
 class Token(BaseModel):
@@ -0,0 +1,75 @@
+import asyncio
+import dataclasses
+import functools
+import inspect
+from typing import Any, Callable, Optional
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.responses import Response
+
+# Dataclasses are passed to default so the domain ones are encoded with to_api_response, never with all their fields
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+
+def default(value: Any) -> Any:
+    """Encodes the types orjson does not, datetimes, dates, enums and uuids are encoded natively"""
+    if hasattr(value, 'to_api_response'):
+        return value.to_api_response()
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, bytes):
+        return value.decode()
+
+    raise TypeError(f'Type is not JSON serializable: {type(value).__name__}')
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def takes_response(endpoint: Callable) -> bool:
+    return any(parameter.annotation is Response for parameter in inspect.signature(endpoint).parameters.values())
+
+
+def encode_returned(endpoint: Callable, status_code: Optional[int]) -> Callable:
+    """Wraps the endpoint so the content it returns is encoded straight to a response"""
+
+    def to_response(content: Any) -> Response:
+        if isinstance(content, Response):
+            return content
+        return FastJSONResponse(content, status_code=status_code or 200)
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def encoded_endpoint(*args, **kwargs):
+            return to_response(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def encoded_endpoint(*args, **kwargs):
+            return to_response(endpoint(*args, **kwargs))
+
+    encoded_endpoint.encodes_response = True
+    return encoded_endpoint
+
+
+class FastJSONRoute(APIRoute):
+    """Route that skips the response validation and jsonable_encoder of FastAPI, the returned content is encoded
+    by orjson in one pass. The endpoints taking the Response to set cookies, headers or the status keep the
+    regular path, with FastJSONResponse as the default response class"""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not getattr(endpoint, 'encodes_response', False) and not takes_response(endpoint):
+            endpoint = encode_returned(endpoint, kwargs.get('status_code'))
+        super().__init__(path, endpoint, **kwargs)
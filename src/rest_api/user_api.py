@@ -1,15 +1,17 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from starlette import status
 
 import services.audit_services as audit
 import services.security_services as sec_serv
 import services.user_services as user_serv
+from constants import USER_SEARCH_MAX_RESULTS
 from domain.users import User
 from rest_api.dtos import InviteUserRequest, CreateUserRequest, UpdateUserContactInfoRequest
+from rest_api.serialization import FastJSONRoute
 
-users_api = APIRouter()
+users_api = APIRouter(route_class=FastJSONRoute)
 
 
 @users_api.post('/invite_user', tags=['Users'], status_code=status.HTTP_201_CREATED)
@@ -60,3 +62,11 @@ async def update_user_contact_info(update_user_contact_info_request: UpdateUserC
 async def get_users_info(user: User = Depends(sec_serv.get_current_user)) -> List:
     """Gets the basic info of the users"""
     return user_serv.get_users(user)
+
+
+@users_api.get('/search', tags=['Users'], status_code=status.HTTP_200_OK)
+async def search_users(query: str = Query(min_length=2, max_length=100),
+                       limit: int = Query(20, ge=1, le=USER_SEARCH_MAX_RESULTS), after: Optional[str] = None,
+                       user: User = Depends(sec_serv.get_current_user)) -> Dict:
+    """Searches the users by the beginning of the words of their nickname or names"""
+    return user_serv.search_users(user, query, limit, after)
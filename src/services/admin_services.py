@@ -1,13 +1,28 @@
+import datetime
+from typing import Dict, List, Optional, Tuple
+
 from fastapi import HTTPException
 from starlette import status
 
+import infra.email_manager as email
+import infra.language_model_manager as model
+import infra.repositories.broadcast_repository as broadcast_repo
+import infra.repositories.email_outbox_repository as outbox_repo
+import infra.repositories.evaluation_result_repository as result_repo
 import infra.repositories.general_repository as general_repo
+import infra.repositories.job_repository as job_repo
+import infra.repositories.password_notification_repository as notification_repo
+import infra.repositories.question_pool_repository as pool_repo
+import infra.repositories.quota_repository as quota_repo
+import infra.repositories.task_repository as task_repo
+import infra.repositories.usage_repository as usage_repo
 import infra.repositories.user_repository as user_repo
-from constants import USER_NOT_FOUND
+from constants import USER_NOT_FOUND, USAGE_REPORT_DEFAULT_DAYS
 from domain import utils
-from domain.enums import UserRole
+from infra import resilience
+from domain.users import User
 from rest_api.dtos import SendMessageToUserRequest, SendMessageToAllUsersRequest
-from services import notification_services
+from services import notification_services, broadcast_services as broadcast_serv
 
 
 def start_app():
@@ -16,6 +31,48 @@ def start_app():
         user_repo.insert_user(admin_user)
 
 
+def create_indexes():
+    result_repo.create_indexes()
+    job_repo.create_indexes()
+    pool_repo.create_indexes()
+    quota_repo.create_indexes()
+    usage_repo.create_indexes()
+    outbox_repo.create_indexes()
+    broadcast_repo.create_indexes()
+    user_repo.create_indexes()
+    notification_repo.create_indexes()
+    task_repo.create_indexes()
+
+
+def preload_templates():
+    email.preload_templates()
+
+
+def get_model_backends() -> Dict:
+    return model.router.get_stats()
+
+
+def get_circuit_breakers() -> Dict:
+    return resilience.get_breakers_state()
+
+
+def get_usage_period(start_date: Optional[datetime.date], end_date: Optional[datetime.date]) \
+        -> Tuple[datetime.datetime, datetime.datetime]:
+    # Both days are included, by default the last days until today
+    end_date = end_date or datetime.datetime.utcnow().date()
+    start_date = start_date or end_date - datetime.timedelta(days=USAGE_REPORT_DEFAULT_DAYS - 1)
+    return (datetime.datetime.combine(start_date, datetime.time.min),
+            datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min))
+
+
+def get_daily_model_usage(start_date: Optional[datetime.date], end_date: Optional[datetime.date]) -> List[Dict]:
+    return usage_repo.aggregate_daily_usage(*get_usage_period(start_date, end_date))
+
+
+def get_project_model_usage(start_date: Optional[datetime.date], end_date: Optional[datetime.date]) -> List[Dict]:
+    return usage_repo.aggregate_project_usage(*get_usage_period(start_date, end_date))
+
+
 def send_message_to_user(send_message_request: SendMessageToUserRequest):
     user = user_repo.find_user_by_id(send_message_request.user_id)
     if not user:
@@ -26,9 +83,10 @@ def send_message_to_user(send_message_request: SendMessageToUserRequest):
                                                send_message_request.subject)
 
 
-def send_message_to_all_users(send_message_request: SendMessageToAllUsersRequest):
-    for user in user_repo.find_users():
-        if user.role == UserRole.ADMIN or user.language != send_message_request.language:
-            continue
+def send_message_to_all_users(send_message_request: SendMessageToAllUsersRequest, user: User) -> str:
+    """Queues the message to be sent by the broadcasters of the tasks process, returns the broadcast id"""
+    return broadcast_serv.submit_broadcast(send_message_request, user)
+
 
-        notification_services.send_message_to_user(user, send_message_request.message, send_message_request.subject)
+def get_broadcast(broadcast_id: str) -> Dict:
+    return broadcast_serv.get_broadcast(broadcast_id)
@@ -0,0 +1,118 @@
+import concurrent.futures
+import datetime
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Dict, List
+
+from fastapi import HTTPException
+from starlette import status
+
+import infra.email_manager as email
+import infra.repositories.broadcast_repository as broadcast_repo
+import infra.repositories.user_repository as user_repo
+from constants import BROADCAST_DO_NOT_EXIST, BROADCAST_BATCH_SIZE, BROADCAST_SMTP_WORKERS, BROADCAST_LEASE_SECONDS, \
+    BROADCAST_POLL_SECONDS
+from domain.broadcasts import Broadcast, Recipient
+from domain.enums import BroadcastStatus, UserRole
+from domain.users import User
+from rest_api.dtos import SendMessageToAllUsersRequest
+
+PERSONAL_FIELDS = ['user_nickname', 'anti_phishing_phrase']
+
+smtp_executor = concurrent.futures.ThreadPoolExecutor(max_workers=BROADCAST_SMTP_WORKERS,
+                                                      thread_name_prefix='broadcast-smtp')
+
+
+def submit_broadcast(send_message_request: SendMessageToAllUsersRequest, user: User) -> str:
+    broadcast = Broadcast(
+        id=str(uuid.uuid4()),
+        user=user.id,
+        subject=send_message_request.subject,
+        message=send_message_request.message,
+        language=send_message_request.language,
+        creation_date=datetime.datetime.utcnow()
+    )
+    broadcast_repo.insert_broadcast(broadcast)
+
+    return broadcast.id
+
+
+def get_broadcast(broadcast_id: str) -> Dict:
+    broadcast = broadcast_repo.find_broadcast_by_id(broadcast_id)
+    if not broadcast:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=BROADCAST_DO_NOT_EXIST)
+
+    return broadcast.to_api_response()
+
+
+def send_to_recipient(broadcast: Broadcast, shared_content: str, recipient: Recipient) -> bool:
+    try:
+        email.send_email(recipient.email, broadcast.subject,
+                         email.fill_personal(shared_content, user_nickname=recipient.nickname,
+                                             anti_phishing_phrase=recipient.anti_phishing_phrase))
+        return True
+    except Exception as e:
+        logging.error(f'Error sending broadcast={broadcast.id} to user={recipient.id}\n{e}')
+        return False
+
+
+def run_broadcast(broadcast: Broadcast):
+    """Sends the message by pages of users, checkpointing after each page so another worker
+    can resume it, the users of the page being sent when a worker dies receive it again"""
+    shared_content = email.render_shared(broadcast.language, 'message_to_user', PERSONAL_FIELDS,
+                                         message=broadcast.message)
+    while True:
+        recipients = user_repo.find_recipients(broadcast.last_user_id, BROADCAST_BATCH_SIZE)
+        if not recipients:
+            broadcast_repo.finish_broadcast(broadcast, BroadcastStatus.DONE)
+            logging.info(f'Broadcast={broadcast.id} finished, sent={broadcast.sent}, failed={broadcast.failed}')
+            return
+
+        selected = [recipient for recipient in recipients
+                    if recipient.role != UserRole.ADMIN and recipient.language == broadcast.language]
+        results = smtp_executor.map(lambda recipient: send_to_recipient(broadcast, shared_content, recipient),
+                                    selected)
+        sent = sum(results)
+
+        broadcast.last_user_id = recipients[-1].id
+        broadcast.processed += len(recipients)
+        broadcast.sent += sent
+        broadcast.failed += len(selected) - sent
+        if not broadcast_repo.save_progress(broadcast, BROADCAST_LEASE_SECONDS):
+            logging.warning(f'Broadcast={broadcast.id} stopped, the worker lost its lease')
+            return
+
+
+def run_broadcaster(worker: str, stop: threading.Event):
+    logging.info(f'Broadcaster {worker} started')
+    while not stop.is_set():
+        try:
+            broadcast = broadcast_repo.claim_broadcast(worker, BROADCAST_LEASE_SECONDS)
+        except Exception as e:
+            logging.error(f'Error claiming broadcasts in {worker}\n{e}')
+            broadcast = None
+
+        if not broadcast:
+            stop.wait(BROADCAST_POLL_SECONDS)
+            continue
+
+        try:
+            run_broadcast(broadcast)
+        except Exception as e:
+            # The broadcast is resumed from the last checkpoint once the lease expires
+            logging.error(f'Error running broadcast={broadcast.id}\n{e}', exc_info=True)
+
+
+def start_broadcasters(number_of_broadcasters: int, stop: threading.Event) -> List[threading.Thread]:
+    broadcasters = []
+    for i in range(number_of_broadcasters):
+        worker = f'{socket.gethostname()}-{os.getpid()}-{i}'
+        thread = threading.Thread(target=run_broadcaster, args=(worker, stop), name=f'broadcaster-{i}', daemon=True)
+        thread.start()
+        broadcasters.append(thread)
+
+    return broadcasters
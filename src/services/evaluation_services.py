@@ -1,18 +1,27 @@
+import datetime
+import logging
 import uuid
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional
 
 from fastapi import HTTPException
 from starlette import status
 
 import infra.language_model_manager as model
+import infra.repositories.checkpoint_repository as checkpoint_repo
 import infra.repositories.evaluation_repository as eval_repo
+import infra.repositories.evaluation_result_repository as result_repo
 import infra.repositories.project_repository as proj_repo
-from constants import PROJECT_DO_NOT_EXIST, EVALUATION_DO_NOT_EXIST, USER_NOT_IN_PROJECT, QUESTION_DO_NOT_EXIST
+import infra.repositories.question_pool_repository as pool_repo
+import services.quota_services as quota_serv
+from constants import PROJECT_DO_NOT_EXIST, EVALUATION_DO_NOT_EXIST, USER_NOT_IN_PROJECT, QUESTION_DO_NOT_EXIST, \
+    MODEL_RESPONSE_NOT_VALID, QUESTION_POOL_TOPICS, QUESTION_POOL_MIN_SIZE, QUESTION_POOL_SIZE, \
+    QUESTION_POOL_GENERATIONS_PER_RUN, QUESTION_POOL_POPULARITY_HALF_LIFE_HOURS, QUESTION_POOL_DECAY_CHECKPOINT
 from domain.enums import Language
 from domain.evaluations import EvaluationResult, Evaluation, Project, Question
 from domain.users import User
+from infra import usage_tracker
 from rest_api.dtos import CreateEvaluationRequest, UpdateEvaluationInfoRequest, CreateQuestionRequest, \
-    UpdateQuestionRequest, DeleteQuestionRequest
+    UpdateQuestionRequest, DeleteQuestionRequest, EvaluateAnswersRequest, GenerateQuestionsRequest
 
 
 def get_project(project_id: str) -> Project:
@@ -176,11 +185,203 @@ def delete_question(delete_question_request: DeleteQuestionRequest, user):
     eval_repo.update_evaluation(evaluation)
 
 
-def evaluate_answer(question: str, answer: str) -> EvaluationResult:
-    result = model.evaluate_answer(question, answer)
-    # TODO: Store the result in database
+def get_member_project(project_id: str, user: User) -> Project:
+    project = get_project(project_id)
+
+    if user.id not in project.users:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail=USER_NOT_IN_PROJECT)
+
+    usage_tracker.set_usage_context(project=project.id)
+    return project
+
+
+def get_project_evaluation(project_id: str, evaluation_id: str, user: User) -> Evaluation:
+    project = get_member_project(project_id, user)
+
+    evaluation = eval_repo.find_evaluation_by_id(evaluation_id)
+    if not evaluation or evaluation.project_id != project.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=EVALUATION_DO_NOT_EXIST)
+
+    return evaluation
+
+
+def store_evaluation_result(result: EvaluationResult, evaluation_id: str, candidate: str):
+    result.evaluation_id = evaluation_id
+    result.candidate = candidate
+    result.date = datetime.datetime.utcnow()
+    result_repo.save_evaluation_result(result)
+
+
+def evaluate_answer(question: str, answer: str, user: User, project_id: str = None, evaluation_id: str = None,
+                    question_id: str = None, candidate: str = None, fast: bool = False,
+                    charge_quota: bool = True) -> EvaluationResult:
+    """The quota is not charged for the jobs, it was when they were submitted"""
+    store = project_id and evaluation_id and question_id and candidate
+    if store:
+        evaluation = get_project_evaluation(project_id, evaluation_id, user)
+        if not any(q.id == question_id for q in evaluation.questions or []):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=QUESTION_DO_NOT_EXIST)
+    elif project_id:
+        get_member_project(project_id, user)
+
+    if charge_quota:
+        quota_serv.consume_llm_quota(user, project_id)
+
+    result = model.evaluate_answer(question, answer, fast)
+    if store:
+        result.question_id = question_id
+        store_evaluation_result(result, evaluation_id, candidate)
+
     return result
 
 
+def get_evaluation_results(project_id: str, evaluation_id: str, user: User, candidate: str = None) \
+        -> List[EvaluationResult]:
+    evaluation = get_project_evaluation(project_id, evaluation_id, user)
+    return result_repo.find_results_by_evaluation_id(evaluation.id, candidate)
+
+
+def get_question_results(project_id: str, evaluation_id: str, question_id: str, user: User) \
+        -> List[EvaluationResult]:
+    evaluation = get_project_evaluation(project_id, evaluation_id, user)
+    if not any(q.id == question_id for q in evaluation.questions or []):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=QUESTION_DO_NOT_EXIST)
+
+    return result_repo.find_results_by_question_id(question_id)
+
+
+def evaluate_answers(evaluate_answers_request: EvaluateAnswersRequest, user: User,
+                     charge_quota: bool = True) -> Dict:
+    evaluation = get_project_evaluation(evaluate_answers_request.project_id, evaluate_answers_request.evaluation_id,
+                                        user)
+    if charge_quota:
+        quota_serv.consume_llm_quota(user, evaluation.project_id, len(evaluate_answers_request.answers))
+
+    questions = {question.id: question for question in evaluation.questions or []}
+    answers = []
+    errors = []
+    for answer_request in evaluate_answers_request.answers:
+        if answer_request.question_id in questions:
+            answers.append(answer_request)
+        else:
+            errors.append({'question_id': answer_request.question_id, 'error': QUESTION_DO_NOT_EXIST})
+
+    pairs = [(questions[answer.question_id].text, answer.answer) for answer in answers]
+    results = []
+    for answer_request, result in zip(answers, model.evaluate_answers(pairs, evaluate_answers_request.fast)):
+        if isinstance(result, EvaluationResult):
+            result.question_id = answer_request.question_id
+            results.append(result)
+            if evaluate_answers_request.candidate:
+                store_evaluation_result(result, evaluation.id, evaluate_answers_request.candidate)
+        else:
+            errors.append({'question_id': answer_request.question_id, 'error': MODEL_RESPONSE_NOT_VALID})
+
+    return {'results': results, 'errors': errors}
+
+
+def pop_pooled_question(topic: str, language: Language) -> Optional[str]:
+    pool_repo.register_topic_request(topic, language)
+    question = pool_repo.pop_question(topic, language)
+    if question:
+        usage_tracker.record_usage('generate_question', cache_hit=True)
+
+    return question
+
+
 def generate_question(topic: str, language: Language) -> Dict:
-    return {'question': model.create_question(topic, language)}
+    question = pop_pooled_question(topic, language)
+    if not question:
+        question = model.create_question(topic, language)
+
+    return {'question': question}
+
+
+def stream_question(topic: str, language: Language) -> Iterator[str]:
+    question = pop_pooled_question(topic, language)
+    if question:
+        return iter([question])
+
+    return model.stream_question(topic, language)
+
+
+def generate_questions(generate_questions_request: GenerateQuestionsRequest, user: User) -> Dict:
+    evaluation = get_project_evaluation(generate_questions_request.project_id, generate_questions_request.evaluation_id,
+                                        user)
+    quota_serv.consume_llm_quota(user, evaluation.project_id, len(generate_questions_request.topics))
+
+    texts = []
+    topics_to_generate = []
+    for topic in generate_questions_request.topics:
+        question = pop_pooled_question(topic, evaluation.language)
+        texts.append(question)
+        if not question:
+            topics_to_generate.append((topic, evaluation.language))
+
+    generated = iter(model.create_questions(topics_to_generate))
+    questions = []
+    errors = []
+    for topic, text in zip(generate_questions_request.topics, texts):
+        text = text or next(generated)
+        if isinstance(text, str):
+            questions.append(Question(
+                id=str(uuid.uuid4()),
+                text=text,
+                mandatory=generate_questions_request.mandatory,
+                time_to_respond=generate_questions_request.time_to_respond
+            ))
+        else:
+            errors.append({'topic': topic, 'error': MODEL_RESPONSE_NOT_VALID})
+
+    if questions:
+        eval_repo.add_questions(evaluation.id, questions)
+
+    return {'question_ids': [question.id for question in questions], 'errors': errors}
+
+
+def refill_question_pools():
+    """Tops up the pools of the most popular topics in order, generating at most the questions of a run
+    one by one at the background rate of the model so the users keep most of it"""
+    logging.info('Refilling question pools')
+    usage_tracker.reset_usage_context(endpoint='question_pool')
+    decay_topic_popularity(datetime.datetime.utcnow())
+
+    budget = QUESTION_POOL_GENERATIONS_PER_RUN
+    for question_topic in pool_repo.find_popular_topics(QUESTION_POOL_TOPICS):
+        if budget <= 0:
+            logging.info('Question pools refill stopped, no generations left in this run')
+            return
+
+        available = pool_repo.count_questions(question_topic.topic, question_topic.language)
+        if available >= QUESTION_POOL_MIN_SIZE:
+            continue
+
+        missing = min(QUESTION_POOL_SIZE - available, budget)
+        budget -= missing
+        questions = set()
+        for _ in range(missing):
+            try:
+                question = model.create_question(question_topic.topic, question_topic.language, background=True)
+            except Exception as e:
+                logging.error(f'Error generating pooled question for topic={question_topic.topic}, error {e}')
+                break
+            if question:
+                questions.add(question)
+
+        if questions:
+            pool_repo.insert_questions(question_topic.topic, question_topic.language, list(questions))
+
+
+def decay_topic_popularity(now: datetime.datetime):
+    """Halves the requests of the topics every half life so the popular topics are the recent ones"""
+    checkpoint = checkpoint_repo.find_checkpoint(QUESTION_POOL_DECAY_CHECKPOINT)
+    decayed_until = checkpoint.get('decayed_until') if checkpoint else None
+    if decayed_until:
+        hours = (now - decayed_until).total_seconds() / 3600
+        pool_repo.decay_topic_requests(0.5 ** (hours / QUESTION_POOL_POPULARITY_HALF_LIFE_HOURS))
+
+    checkpoint_repo.save_checkpoint(QUESTION_POOL_DECAY_CHECKPOINT, {'decayed_until': now})
@@ -0,0 +1,47 @@
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+
+import pymongo
+
+import infra.email_manager as email
+import infra.language_model_manager as model
+import infra.repositories.general_repository as general_repo
+from constants import HEALTH_CHECK_TIMEOUT_SECONDS
+from domain import utils
+from infra import resilience
+
+ready = threading.Event()
+
+
+def warm_up():
+    """Opens the database connection, compiles the templates and loads the keys and clients used by the
+    requests, the application is reported as ready once done"""
+    start = time.monotonic()
+    general_repo.ping()
+    email.preload_templates()
+    utils.get_fernet()
+    model.get_openai()
+    ready.set()
+    logging.info(f'Warmed up in {(time.monotonic() - start) * 1000:.0f}ms')
+
+
+def check_mongo() -> Dict:
+    try:
+        with pymongo.timeout(HEALTH_CHECK_TIMEOUT_SECONDS):
+            return {'status': 'up', 'latency_ms': round(general_repo.ping(), 2)}
+    except Exception as e:
+        return {'status': 'down', 'error': str(e)}
+
+
+def get_readiness() -> Tuple[bool, Dict]:
+    """The open breakers of the other dependencies are reported but do not stop the traffic,
+    the requests using them already fail fast"""
+    dependencies = {'mongo': check_mongo()}
+    is_ready = ready.is_set() and all(dependency['status'] == 'up' for dependency in dependencies.values())
+    return is_ready, {
+        'status': 'ready' if is_ready else 'not-ready',
+        'dependencies': dependencies,
+        'breakers': resilience.get_breakers_state()
+    }
@@ -0,0 +1,165 @@
+import datetime
+import logging
+import os
+import socket
+import threading
+import uuid
+from typing import Dict, List
+
+from fastapi import HTTPException
+from starlette import status
+
+import infra.repositories.job_repository as job_repo
+import infra.repositories.user_repository as user_repo
+from constants import JOB_DO_NOT_EXIST, JOB_LEASE_SECONDS, JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, \
+    JOB_POLL_SECONDS, USER_NOT_FOUND
+from domain.enums import JobType, JobPriority, JobStatus, Language
+from domain.jobs import Job
+from domain.users import User
+from infra import resilience, usage_tracker
+from rest_api.dtos import EvaluateAnswersRequest, EvaluateAnswerRequest
+from services import evaluation_services as eval_serv, quota_services as quota_serv
+
+MAXIMUM_RETRY_SECONDS = 60 * 60
+# Set by the server from the type of the job, so the callers can not jump the queue
+PRIORITIES = {
+    JobType.EVALUATE_ANSWER: JobPriority.INTERACTIVE,
+    JobType.GENERATE_QUESTION: JobPriority.INTERACTIVE,
+    JobType.EVALUATE_ANSWERS: JobPriority.BULK
+}
+
+
+def submit_job(job_type: JobType, payload: Dict, user: User) -> str:
+    now = datetime.datetime.utcnow()
+    job = Job(
+        id=str(uuid.uuid4()),
+        type=job_type,
+        user=user.id,
+        payload=payload,
+        priority=PRIORITIES[job_type],
+        creation_date=now,
+        available_date=now
+    )
+    job_repo.insert_job(job)
+
+    return job.id
+
+
+def submit_evaluate_answer(evaluate_answer_request: EvaluateAnswerRequest, user: User) -> str:
+    if evaluate_answer_request.evaluation_id:
+        eval_serv.get_project_evaluation(evaluate_answer_request.project_id, evaluate_answer_request.evaluation_id,
+                                         user)
+    elif evaluate_answer_request.project_id:
+        eval_serv.get_member_project(evaluate_answer_request.project_id, user)
+    quota_serv.consume_llm_quota(user, evaluate_answer_request.project_id)
+
+    return submit_job(JobType.EVALUATE_ANSWER, evaluate_answer_request.dict(), user)
+
+
+def submit_evaluate_answers(evaluate_answers_request: EvaluateAnswersRequest, user: User) -> str:
+    evaluation = eval_serv.get_project_evaluation(evaluate_answers_request.project_id,
+                                                  evaluate_answers_request.evaluation_id, user)
+    quota_serv.consume_llm_quota(user, evaluation.project_id, len(evaluate_answers_request.answers))
+
+    return submit_job(JobType.EVALUATE_ANSWERS, evaluate_answers_request.dict(), user)
+
+
+def submit_generate_question(topic: str, language: Language, user: User) -> str:
+    return submit_job(JobType.GENERATE_QUESTION, {'topic': topic, 'language': language.name}, user)
+
+
+def get_job(job_id: str, user: User) -> Dict:
+    job = job_repo.find_job_by_id(job_id)
+    if not job or job.user != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=JOB_DO_NOT_EXIST)
+
+    return job.to_api_response()
+
+
+def run_evaluate_answer(payload: Dict, user: User) -> Dict:
+    request = EvaluateAnswerRequest(**payload)
+    result = eval_serv.evaluate_answer(request.question, request.answer, user, request.project_id,
+                                       request.evaluation_id, request.question_id, request.candidate, request.fast,
+                                       charge_quota=False)
+    return result.to_dict()
+
+
+def run_evaluate_answers(payload: Dict, user: User) -> Dict:
+    response = eval_serv.evaluate_answers(EvaluateAnswersRequest(**payload), user, charge_quota=False)
+    return {
+        'results': [result.to_dict() for result in response.get('results')],
+        'errors': response.get('errors')
+    }
+
+
+def run_generate_question(payload: Dict, user: User) -> Dict:
+    return eval_serv.generate_question(payload.get('topic'), Language[payload.get('language')])
+
+
+HANDLERS = {
+    JobType.EVALUATE_ANSWER: run_evaluate_answer,
+    JobType.EVALUATE_ANSWERS: run_evaluate_answers,
+    JobType.GENERATE_QUESTION: run_generate_question
+}
+
+
+def get_error_message(e: Exception) -> str:
+    return str(getattr(e, 'detail', None) or getattr(e, 'message', None) or e)
+
+
+def process_job(job: Job):
+    if job.attempts > JOB_MAX_ATTEMPTS:
+        job_repo.finish_job(job, JobStatus.FAILED, error=job.error)
+        return
+
+    try:
+        user = user_repo.find_user_by_id(job.user)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                                detail=USER_NOT_FOUND)
+
+        usage_tracker.reset_usage_context(user=user.id, endpoint=f'jobs/{job.type.name.lower()}')
+        with resilience.deadline(JOB_LEASE_SECONDS):
+            result = HANDLERS[job.type](job.payload, user)
+    except HTTPException as e:
+        # Business errors will not change with a new attempt
+        job_repo.finish_job(job, JobStatus.FAILED, error=get_error_message(e))
+    except Exception as e:
+        logging.error(f'Error processing job={job.id}, type={job.type.name}, attempt={job.attempts}\n{e}',
+                      exc_info=True)
+        if job.attempts >= JOB_MAX_ATTEMPTS:
+            job_repo.finish_job(job, JobStatus.FAILED, error=get_error_message(e))
+        else:
+            delay = min(JOB_RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), MAXIMUM_RETRY_SECONDS)
+            job_repo.retry_job(job, datetime.datetime.utcnow() + datetime.timedelta(seconds=delay),
+                               get_error_message(e))
+    else:
+        if not job_repo.finish_job(job, JobStatus.DONE, result=result):
+            logging.warning(f'Discarded result of job={job.id}, the worker lost its lease before finishing')
+
+
+def run_worker(worker: str, stop: threading.Event):
+    logging.info(f'Worker {worker} started processing jobs')
+    while not stop.is_set():
+        try:
+            job = job_repo.claim_job(worker, JOB_LEASE_SECONDS)
+        except Exception as e:
+            logging.error(f'Error claiming jobs in worker {worker}\n{e}')
+            job = None
+
+        if job:
+            process_job(job)
+        else:
+            stop.wait(JOB_POLL_SECONDS)
+
+
+def start_workers(number_of_workers: int, stop: threading.Event) -> List[threading.Thread]:
+    workers = []
+    for i in range(number_of_workers):
+        worker = f'{socket.gethostname()}-{os.getpid()}-{i}'
+        thread = threading.Thread(target=run_worker, args=(worker, stop), name=f'job-worker-{i}', daemon=True)
+        thread.start()
+        workers.append(thread)
+
+    return workers
@@ -0,0 +1,99 @@
+import concurrent.futures
+import datetime
+import logging
+import time
+from typing import Callable, Dict, List, Tuple
+
+import infra.repositories.checkpoint_repository as checkpoint_repo
+import infra.repositories.user_repository as user_repo
+from constants import MAINTENANCE_PARTITIONS, MAINTENANCE_WORKERS, MAINTENANCE_BATCH_SIZE
+from domain.tasks import Partition
+from domain.users import User
+
+# The ids are uuid4, the first two hex digits split them in ranges of similar size
+ID_PREFIXES = 256
+
+
+def get_partitions(number_of_partitions: int) -> List[Partition]:
+    """Ranges of ids covering every user, the first and the last ones are open"""
+    number_of_partitions = max(1, min(number_of_partitions, ID_PREFIXES))
+    bounds = [f'{ID_PREFIXES * i // number_of_partitions:02x}' for i in range(1, number_of_partitions)]
+    starts = [None] + bounds
+    ends = bounds + [None]
+    return [Partition(index=i, start_id=starts[i], end_id=ends[i]) for i in range(number_of_partitions)]
+
+
+def process_partition(name: str, generation: str, partition: Partition, process: Callable[[User], None],
+                      batch_size: int) -> Tuple[int, int]:
+    """Processes the users of the partition by pages, saving the last user processed after each page.
+    Returns the users processed and the ones that failed"""
+    checkpoint_name = f'{name}:{partition.index}'
+    checkpoint = checkpoint_repo.find_checkpoint(checkpoint_name)
+    last_user_id = None
+    if checkpoint and checkpoint.get('generation') == generation:
+        if checkpoint.get('done'):
+            return 0, 0
+        last_user_id = checkpoint.get('last_user_id')
+
+    processed = failed = 0
+    while True:
+        users = user_repo.find_users_in_range(partition.start_id, partition.end_id, last_user_id, batch_size)
+        for user in users:
+            try:
+                process(user)
+            except Exception as e:
+                failed += 1
+                logging.error(f'Error processing user={user.id} in job {name}\n{e}')
+
+        processed += len(users)
+        done = len(users) < batch_size
+        if users:
+            last_user_id = users[-1].id
+        checkpoint_repo.save_checkpoint(checkpoint_name,
+                                        {'generation': generation, 'last_user_id': last_user_id, 'done': done})
+        if done:
+            return processed, failed
+
+
+def run_partitioned_job(name: str, process: Callable[[User], None], partitions: int = MAINTENANCE_PARTITIONS,
+                        workers: int = MAINTENANCE_WORKERS, batch_size: int = MAINTENANCE_BATCH_SIZE) -> Dict:
+    """Processes every user with a bounded pool of workers, one partition of ids each, a run interrupted
+    is resumed from the checkpoints of its partitions by the next one"""
+    checkpoint = checkpoint_repo.find_checkpoint(name)
+    if checkpoint and not checkpoint.get('finished'):
+        generation = checkpoint.get('generation')
+        logging.info(f'Resuming job {name} started at {generation}')
+    else:
+        generation = datetime.datetime.utcnow().isoformat()
+        checkpoint_repo.save_checkpoint(name, {'generation': generation, 'finished': False})
+
+    start = time.monotonic()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name) as executor:
+        futures = [executor.submit(process_partition, name, generation, partition, process, batch_size)
+                   for partition in get_partitions(partitions)]
+
+    processed = failed = 0
+    finished = True
+    for future in futures:
+        try:
+            partition_processed, partition_failed = future.result()
+            processed += partition_processed
+            failed += partition_failed
+        except Exception as e:
+            # The partition is resumed from its checkpoint in the next run
+            finished = False
+            logging.error(f'Error processing a partition in job {name}\n{e}', exc_info=True)
+
+    duration = time.monotonic() - start
+    summary = {
+        'generation': generation,
+        'finished': finished,
+        'processed': processed,
+        'failed': failed,
+        'duration': duration,
+        'throughput': processed / duration if duration else 0.0
+    }
+    checkpoint_repo.save_checkpoint(name, summary)
+    logging.info(f'Job {name} processed {processed} users in {duration:.1f}s '
+                 f'({summary["throughput"]:.1f} users/s), failed={failed}, finished={finished}')
+    return summary
@@ -0,0 +1,73 @@
+import datetime
+import logging
+import os
+import socket
+import threading
+from typing import List
+
+import infra.email_manager as email
+import infra.repositories.email_outbox_repository as outbox_repo
+from constants import OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE_SECONDS, OUTBOX_POLL_SECONDS
+from domain.emails import OutboxEmail
+from domain.enums import EmailStatus
+from domain.exeptions import CircuitOpenException
+from infra import resilience
+
+MAXIMUM_RETRY_SECONDS = 6 * 60 * 60
+
+
+def dispatch_email(outbox_email: OutboxEmail):
+    try:
+        with resilience.deadline(OUTBOX_LEASE_SECONDS):
+            email.send_email(outbox_email.to, outbox_email.subject, outbox_email.content)
+    except CircuitOpenException as e:
+        # The SMTP server is known to be down, the email waits for it without spending an attempt
+        outbox_repo.retry_email(outbox_email, datetime.datetime.utcnow() + datetime.timedelta(seconds=e.retry_after),
+                                e.message, outbox_email.attempts - 1)
+    except Exception as e:
+        logging.error(f'Error sending email={outbox_email.id}, attempt={outbox_email.attempts}\n{e}', exc_info=True)
+        if outbox_email.attempts >= OUTBOX_MAX_ATTEMPTS:
+            logging.error(f'Email={outbox_email.id} moved to dead letters after {outbox_email.attempts} attempts')
+            outbox_repo.finish_email(outbox_email, EmailStatus.DEAD, error=str(e))
+        else:
+            delay = min(OUTBOX_RETRY_BASE_SECONDS * 2 ** (outbox_email.attempts - 1), MAXIMUM_RETRY_SECONDS)
+            outbox_repo.retry_email(outbox_email, datetime.datetime.utcnow() + datetime.timedelta(seconds=delay),
+                                    str(e), outbox_email.attempts)
+    else:
+        if not outbox_repo.finish_email(outbox_email, EmailStatus.SENT):
+            logging.warning(f'Email={outbox_email.id} sent after the dispatcher lost its lease')
+
+
+def dead_letter_expired_emails():
+    dead = outbox_repo.dead_letter_expired_emails(OUTBOX_MAX_ATTEMPTS)
+    if dead:
+        logging.error(f'{dead} emails moved to dead letters after losing the lease in the last attempt')
+
+
+def run_dispatcher(dispatcher: str, stop: threading.Event):
+    logging.info(f'Dispatcher {dispatcher} started sending emails')
+    while not stop.is_set():
+        try:
+            outbox_email = outbox_repo.claim_email(dispatcher, OUTBOX_LEASE_SECONDS, OUTBOX_MAX_ATTEMPTS)
+            if not outbox_email:
+                dead_letter_expired_emails()
+        except Exception as e:
+            logging.error(f'Error claiming emails in dispatcher {dispatcher}\n{e}')
+            outbox_email = None
+
+        if outbox_email:
+            dispatch_email(outbox_email)
+        else:
+            stop.wait(OUTBOX_POLL_SECONDS)
+
+
+def start_dispatchers(number_of_dispatchers: int, stop: threading.Event) -> List[threading.Thread]:
+    dispatchers = []
+    for i in range(number_of_dispatchers):
+        dispatcher = f'{socket.gethostname()}-{os.getpid()}-{i}'
+        thread = threading.Thread(target=run_dispatcher, args=(dispatcher, stop), name=f'email-dispatcher-{i}',
+                                  daemon=True)
+        thread.start()
+        dispatchers.append(thread)
+
+    return dispatchers
@@ -0,0 +1,109 @@
+import datetime
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from starlette import status
+
+import infra.repositories.quota_repository as quota_repo
+from constants import LLM_QUOTA_EXCEEDED, LLM_QUOTA_WINDOW_SECONDS, LLM_QUOTA_LEASE_SIZE, \
+    USER_LLM_REQUESTS_PER_WINDOW, PROJECT_LLM_REQUESTS_PER_WINDOW
+from domain.users import User
+
+
+@dataclass
+class QuotaLease:
+    """Tokens of a window already reserved in the database by this instance"""
+    window: int
+    remaining: int = 0
+    exhausted: bool = False
+    # Keeps a single reservation of the key in flight per instance, without blocking the other keys
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+leases: Dict[str, QuotaLease] = {}
+leases_lock = threading.Lock()
+evicted_window = 0
+
+
+def get_window(now: float) -> int:
+    return int(now // LLM_QUOTA_WINDOW_SECONDS)
+
+
+def get_retry_after(now: float) -> int:
+    return max(1, math.ceil((get_window(now) + 1) * LLM_QUOTA_WINDOW_SECONDS - now))
+
+
+def reserve(key: str, limit: int, window: int, tokens: int) -> int:
+    """Reserves up to tokens in the shared quota returning how many were granted"""
+    expiration_date = datetime.datetime.utcfromtimestamp((window + 2) * LLM_QUOTA_WINDOW_SECONDS)
+    used = quota_repo.reserve_tokens(key, window, expiration_date, tokens)
+    return max(0, min(tokens, limit - (used - tokens)))
+
+
+def get_lease(key: str, window: int) -> QuotaLease:
+    global evicted_window
+    with leases_lock:
+        if window != evicted_window:
+            # The leases of past windows are never used again
+            for past_key in [past_key for past_key, lease in leases.items() if lease.window < window]:
+                del leases[past_key]
+            evicted_window = window
+
+        lease = leases.get(key)
+        if not lease or lease.window != window:
+            lease = leases[key] = QuotaLease(window)
+
+        return lease
+
+
+def consume(key: str, limit: int, cost: int = 1):
+    """Takes cost tokens from the quota of the key raising 429 when it is over the limit of the window,
+    tokens are reserved in chunks so most of the checks are done without going to the database"""
+    now = time.time()
+    window = get_window(now)
+    lease = get_lease(key, window)
+    with lease.lock:
+        if not lease.exhausted and lease.remaining >= cost:
+            lease.remaining -= cost
+            return
+
+        if not lease.exhausted:
+            granted = reserve(key, limit, window, max(cost - lease.remaining, min(LLM_QUOTA_LEASE_SIZE, limit)))
+            lease.remaining += granted
+            if lease.remaining >= cost:
+                lease.remaining -= cost
+                return
+
+            lease.exhausted = True
+
+    logging.warning(f'LLM quota exceeded for {key}')
+    raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        detail=LLM_QUOTA_EXCEEDED,
+                        headers={'Retry-After': str(get_retry_after(now))})
+
+
+def refund(key: str, cost: int = 1):
+    """Gives back to the lease of the key tokens taken in the current window for a call that is not done"""
+    lease = get_lease(key, get_window(time.time()))
+    with lease.lock:
+        lease.remaining += cost
+
+
+def consume_llm_quota(user: User, project_id: Optional[str] = None, cost: int = 1):
+    """Charges the calls to the language model to the user and to the project they are done for,
+    the membership of the user to the project must be checked before"""
+    consume(f'user:{user.id}', USER_LLM_REQUESTS_PER_WINDOW, cost)
+    if not project_id:
+        return
+
+    try:
+        consume(f'project:{project_id}', PROJECT_LLM_REQUESTS_PER_WINDOW, cost)
+    except HTTPException:
+        # The call is rejected by the project, the user keeps their tokens
+        refund(f'user:{user.id}', cost)
+        raise
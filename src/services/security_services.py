@@ -14,6 +14,7 @@ from constants import ENCRYPT_KEY, SECURITY_ALGORITHM, MAXIMUM_WRONG_PASSWORD_AT
     INVALID_EXPIRED_PASSWORD_TOKEN, NOT_VALID_CREDENTIALS, REACTIVATED_USER_TOKEN_EXPIRE_DAYS
 from domain.enums import State
 from domain.users import User, ResetPasswordToken
+from infra import usage_tracker
 from services import notification_services
 from rest_api.dtos import ChangePasswordRequest, ReassignExpiredPasswordRequest, \
     ResetPasswordRequest
@@ -40,6 +41,7 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     if user is None or user.state == State.INACTIVE:
         raise credentials_exception
 
+    usage_tracker.set_usage_context(user=user.id)
     return user
 
 
@@ -0,0 +1,92 @@
+import datetime
+import logging
+import os
+import socket
+import time
+from typing import Callable, Dict, List, Optional
+
+from apscheduler.triggers.cron import CronTrigger
+
+import infra.repositories.task_repository as task_repo
+import services.evaluation_services as eval_serv
+import services.user_services as user_serv
+from constants import PROCESS_USERS_CRON, QUESTION_POOL_CRON, TASK_MISFIRE_GRACE_SECONDS, TASK_LOCK_LEASE_SECONDS, \
+    USER_MAINTENANCE_CRON
+from domain.enums import TaskRunStatus
+from domain.tasks import TaskRun
+
+OWNER = f'{socket.gethostname()}-{os.getpid()}'
+
+TASKS: Dict[str, Callable] = {
+    'check_expired_passwords': user_serv.check_expired_passwords,
+    'refill_question_pools': eval_serv.refill_question_pools,
+    'reconcile_users': user_serv.reconcile_users
+}
+
+CRONS: Dict[str, str] = {
+    'check_expired_passwords': PROCESS_USERS_CRON,
+    'refill_question_pools': QUESTION_POOL_CRON,
+    'reconcile_users': USER_MAINTENANCE_CRON
+}
+
+
+def get_trigger(name: str) -> CronTrigger:
+    return CronTrigger.from_crontab(CRONS[name], timezone=datetime.timezone.utc)
+
+
+def get_scheduled_date(name: str, now: datetime.datetime) -> datetime.datetime:
+    # The run started at most the misfire grace time after the date it was scheduled for
+    earliest = now - datetime.timedelta(seconds=TASK_MISFIRE_GRACE_SECONDS)
+    scheduled_date = get_trigger(name).get_next_fire_time(None, earliest.replace(tzinfo=datetime.timezone.utc))
+    scheduled_date = scheduled_date.replace(tzinfo=None)
+    if scheduled_date > now:
+        # Run out of its schedule, crons have minute resolution so replicas agree on the minute
+        return now.replace(second=0, microsecond=0)
+
+    return scheduled_date
+
+
+def run_scheduled_task(name: str, now: Optional[datetime.datetime] = None):
+    """Runs a task in only one of the tasks replicas, the first one that registers the run of the scheduled
+    date, and never while a previous run of the task is still holding its lock"""
+    now = now or datetime.datetime.utcnow()
+    scheduled_date = get_scheduled_date(name, now)
+    task_run = TaskRun(
+        id=f'{name}:{scheduled_date.isoformat()}',
+        name=name,
+        scheduled_date=scheduled_date,
+        owner=OWNER,
+        start_date=now
+    )
+    if not task_repo.insert_run(task_run):
+        logging.info(f'Task {name} scheduled at {scheduled_date} already run by another replica')
+        return
+
+    if not task_repo.acquire_lock(name, OWNER, TASK_LOCK_LEASE_SECONDS):
+        logging.warning(f'Task {name} skipped, the previous run is still holding the lock')
+        task_run.status = TaskRunStatus.SKIPPED
+        task_run.finish_date = datetime.datetime.utcnow()
+        task_repo.finish_run(task_run)
+        return
+
+    start = time.monotonic()
+    try:
+        TASKS[name]()
+        task_run.status = TaskRunStatus.DONE
+    except Exception as e:
+        logging.error(f'Error running task {name}\n{e}', exc_info=True)
+        task_run.status = TaskRunStatus.FAILED
+        task_run.error = str(e)
+    finally:
+        task_run.duration = time.monotonic() - start
+        task_run.finish_date = datetime.datetime.utcnow()
+        task_repo.finish_run(task_run)
+        task_repo.release_lock(name, OWNER)
+
+
+def get_task_runs(name: Optional[str], limit: int) -> List[Dict]:
+    return [task_run.to_api_response() for task_run in task_repo.find_runs(name, limit)]
+
+
+def get_task_metrics(days: int) -> List[Dict]:
+    return task_repo.aggregate_run_metrics(datetime.datetime.utcnow() - datetime.timedelta(days=days))
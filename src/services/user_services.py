@@ -1,18 +1,27 @@
 import datetime
 import logging
 import uuid
-from datetime import datetime
-from typing import List, Dict
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional
 
 from fastapi import HTTPException
 from starlette import status
 
+import infra.repositories.checkpoint_repository as checkpoint_repo
+import infra.repositories.password_notification_repository as notification_repo
 import infra.repositories.user_repository as user_repo
 from constants import *
+from domain import utils
 from domain.enums import Environment, State, UserRole
 from domain.users import User, UserInvitation, UserPassword, ResetPasswordToken
+from infra.cache import TTLCache
 from rest_api.dtos import CreateUserRequest, InviteUserRequest, UpdateUserContactInfoRequest
-from services import notification_services
+from services import notification_services, maintenance_services as maintenance_serv
+
+PASSWORD_SWEEP_CHECKPOINT = 'password_expiration_sweep'
+
+# Other replicas see the role changes once the entry expires
+admin_roster = TTLCache(1, ADMIN_ROSTER_TTL_SECONDS)
 
 
 def get_user_by_id(user_id: str) -> User:
@@ -50,6 +59,15 @@ def reactivate_user(user_id: str):
     user_repo.update_user(user)
 
 
+def get_admins() -> List[User]:
+    admins = admin_roster.get(UserRole.ADMIN)
+    if admins is None:
+        admins = user_repo.find_users_by_role(UserRole.ADMIN)
+        admin_roster.set(UserRole.ADMIN, admins)
+
+    return admins
+
+
 def get_users_info() -> List[Dict]:
     users: List[User] = user_repo.find_users()
 
@@ -150,10 +168,11 @@ def create_user(create_user_request: CreateUserRequest):
     )
 
     user_repo.insert_user(user)
+    if user.role == UserRole.ADMIN:
+        admin_roster.delete(UserRole.ADMIN)
 
-    for u in user_repo.find_users():
-        if u.role == UserRole.ADMIN:
-            notification_services.send_created_account(u, user)
+    for admin in get_admins():
+        notification_services.send_created_account(admin, user)
 
 
 def update_user_contact_info(update_user_contact_info_request: UpdateUserContactInfoRequest,
@@ -161,6 +180,8 @@ def update_user_contact_info(update_user_contact_info_request: UpdateUserContact
     user.nickname = update_user_contact_info_request.nickname
     user.anti_phishing_phrase = update_user_contact_info_request.anti_phishing_phrase
     user_repo.update_user(user)
+    if user.role == UserRole.ADMIN:
+        admin_roster.delete(UserRole.ADMIN)
 
 
 def get_secure_user_data(user: User) -> Dict:
@@ -173,23 +194,63 @@ def get_secure_user_data(user: User) -> Dict:
 
 
 def check_expired_passwords():
+    """Reads only the users whose password expired or reached a notification threshold since the last run"""
     logging.info('Checking expired passwords')
-    users = user_repo.find_users()
-    for user in users:
-        password = user.get_current_active_password()
-
-        if password:
-            days_to_expire = (password.expiration_date - datetime.utcnow()).days
-
-            if datetime.utcnow() >= password.expiration_date:
-                password.state = State.INACTIVE
-                user.expired_password_token = str(uuid.uuid4())
-
-                notification_services.send_password_expired(user)
-                user_repo.update_user(user)
-
-            elif days_to_expire <= REMAINING_PASSWORD_DAYS_TO_SEND_NOTIFICATION:
-                notification_services.send_password_near_to_expire(user, days_to_expire)
+    now = datetime.utcnow()
+    checkpoint = checkpoint_repo.find_checkpoint(PASSWORD_SWEEP_CHECKPOINT)
+    swept_until = checkpoint.get('swept_until') if checkpoint else None
+
+    processed = 0
+    for days in [0] + PASSWORD_NOTIFICATION_DAYS:
+        offset = timedelta(days=days)
+        start_date = swept_until + offset if swept_until else None
+        for user in user_repo.find_users_by_password_expiration(start_date, now + offset):
+            check_password_expiration(user, now)
+            processed += 1
+
+    checkpoint_repo.save_checkpoint(PASSWORD_SWEEP_CHECKPOINT, {'swept_until': now})
+    logging.info(f'Checked {processed} passwords near to expire')
+
+
+def check_password_expiration(user: User, now: datetime):
+    password = user.get_current_active_password()
+    if not password:
+        return
+
+    if now >= password.expiration_date:
+        # The sweep and the nightly reconciliation can reach the same user at once, only the one registering
+        # the expiration in the ledger expires the password
+        if not notification_repo.register_notification(user.id, password.expiration_date, EXPIRED_NOTIFICATION_DAYS):
+            return
+
+        password.state = State.INACTIVE
+        user.expired_password_token = str(uuid.uuid4())
+        try:
+            notification_services.send_password_expired(user)
+            user_repo.update_user(user)
+        except Exception:
+            notification_repo.unregister_notification(user.id, password.expiration_date, EXPIRED_NOTIFICATION_DAYS)
+            raise
+        return
+
+    days_to_expire = (password.expiration_date - now).days
+    thresholds = [days for days in PASSWORD_NOTIFICATION_DAYS if days >= days_to_expire]
+    # The ledger keeps each reminder from being sent again in the next runs
+    if thresholds and notification_repo.register_notification(user.id, password.expiration_date, min(thresholds)):
+        notification_services.send_password_near_to_expire(user, days_to_expire)
+
+
+def reconcile_users():
+    """Nightly pass over every user fixing the indexed expiration dates and the expirations or reminders
+    the incremental sweep missed"""
+    now = datetime.utcnow()
+    maintenance_serv.run_partitioned_job('reconcile_users', lambda user: reconcile_user(user, now))
+
+
+def reconcile_user(user: User, now: datetime):
+    if user_repo.fix_password_expiration_date(user):
+        logging.info(f'Fixed the password expiration date of user={user.id}')
+    check_password_expiration(user, now)
 
 
 def get_users(current_user: User) -> List:
@@ -200,3 +261,48 @@ def get_users(current_user: User) -> List:
             users_list.append(user.to_simple_data())
 
     return users_list
+
+
+def search_users(current_user: User, query: str, limit: int, after_user_id: Optional[str]) -> Dict:
+    """Active non admin users whose nickname or names have words starting with every word of the query,
+    ordered by id, next is the id to continue from when there may be more"""
+    words = utils.get_search_words(query)
+    tokens = utils.get_query_tokens(words)
+    if not tokens:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=SEARCH_QUERY_TOO_SHORT)
+
+    users_list = []
+    last_user_id = after_user_id
+    while True:
+        users = user_repo.search_users(tokens, UserRole.ADMIN, last_user_id, limit)
+        for user in users:
+            last_user_id = user.id
+            if user.state != State.INACTIVE and current_user.id != user.id and user.matches_search(words):
+                users_list.append(user.to_simple_data())
+                if len(users_list) == limit:
+                    return {'users': users_list, 'next': last_user_id}
+
+        if len(users) < limit:
+            return {'users': users_list, 'next': None}
+
+
+def backfill_password_expiration_dates():
+    updated = user_repo.backfill_password_expiration_dates()
+    if updated:
+        logging.info(f'Stored the password expiration date of {updated} users')
+
+
+def backfill_role_indexes():
+    utils.check_blind_index_key()
+    updated = user_repo.backfill_role_indexes()
+    if updated:
+        logging.info(f'Stored the role index of {updated} users')
+
+
+def backfill_search_tokens():
+    # The short tokens are the easiest to brute-force, they are never written without a key of their own
+    utils.check_blind_index_key()
+    updated = user_repo.backfill_search_tokens()
+    if updated:
+        logging.info(f'Stored the search tokens of {updated} users')
@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+import infra.language_model_manager as model
+from infra import usage_tracker
+from infra.model_router import ModelRouter, ModelBackend
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks'))
+
+from fake_llm_server import FakeLanguageModelServer, RECORD, REPLAY  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def usages(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(usage_tracker.usage_repo, 'insert_usage', recorded.append)
+    return recorded
+
+
+def use_server(monkeypatch, server: FakeLanguageModelServer):
+    monkeypatch.setattr(model, 'router', ModelRouter([ModelBackend('fake', 'gpt-3.5-turbo', server.url, 'fake')]))
+
+
+def test_execute_prompt_with_fake_server(monkeypatch):
+    server = FakeLanguageModelServer().start()
+    use_server(monkeypatch, server)
+    try:
+        assert model.evaluate_answer('question', 'answer').grade == 4
+    finally:
+        server.stop()
+
+
+def test_usage_recorded_with_context(monkeypatch, usages):
+    server = FakeLanguageModelServer().start()
+    use_server(monkeypatch, server)
+    try:
+        usage_tracker.reset_usage_context(user='user', endpoint='/evaluations/evaluate_answer')
+        model.evaluate_answer('question', 'answer')
+    finally:
+        usage_tracker.reset_usage_context()
+        server.stop()
+
+    assert len(usages) == 1
+    assert usages[0].operation == 'evaluate_answer'
+    assert usages[0].prompt_tokens > 0 and usages[0].completion_tokens > 0
+    assert usages[0].user == 'user' and usages[0].endpoint == '/evaluations/evaluate_answer'
+    assert not usages[0].cache_hit and not usages[0].error
+
+
+def test_record_and_replay(monkeypatch, tmp_path):
+    fixtures = str(tmp_path / 'llm.jsonl')
+    upstream = FakeLanguageModelServer().start()
+    recorder = FakeLanguageModelServer(mode=RECORD, fixtures=fixtures, upstream=upstream.url).start()
+    try:
+        use_server(monkeypatch, recorder)
+        recorded = model.execute_prompt('Recorded prompt')
+    finally:
+        recorder.stop()
+        upstream.stop()
+
+    player = FakeLanguageModelServer(mode=REPLAY, fixtures=fixtures).start()
+    try:
+        use_server(monkeypatch, player)
+        assert model.execute_prompt('Recorded prompt') == recorded
+        assert player.requests == 1
+    finally:
+        player.stop()
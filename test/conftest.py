@@ -0,0 +1,10 @@
+import pytest
+
+# The users module needs the utils one imported first
+from domain import utils
+
+
+@pytest.fixture(autouse=True)
+def blind_index_key(monkeypatch):
+    # The key has no default, the apps refuse to start without it
+    monkeypatch.setattr(utils, 'BLIND_INDEX_KEY', 'test-blind-index-key')
@@ -1,3 +1,5 @@
+import pytest
+
 from domain import utils
 
 
@@ -16,3 +18,30 @@ def test_decrypt_message():
 
     assert test_encrypted_message != decrypted
     assert isinstance(decrypted, str)
+
+
+def test_get_excerpt():
+    assert utils.get_excerpt('short', 10) == 'short'
+    assert utils.get_excerpt('a' * 30, 10) == f'{"a" * 10}... (30 chars)'
+    assert utils.get_excerpt(None) is None
+
+
+def test_search_tokens_match_prefixes_without_accents():
+    tokens = utils.get_search_tokens('Pepe', 'José Luis', 'Gómez')
+    assert set(utils.get_query_tokens(utils.get_search_words('jos gom'))) <= set(tokens)
+    assert set(utils.get_query_tokens(['luiz'])).isdisjoint(tokens)
+    assert utils.get_search_token('jose') in tokens and 'jose' not in tokens
+
+
+def test_query_tokens_ignore_short_words():
+    assert utils.get_query_tokens(['a']) == []
+    assert utils.get_query_tokens(['a', 'gomez']) == utils.get_query_tokens(['gomez'])
+
+
+@pytest.mark.parametrize('key', [None, '', utils.ENCRYPT_KEY])
+def test_blind_index_key_must_be_set_and_differ_from_encryption_key(monkeypatch, key):
+    utils.check_blind_index_key()
+
+    monkeypatch.setattr(utils, 'BLIND_INDEX_KEY', key)
+    with pytest.raises(ValueError):
+        utils.check_blind_index_key()
@@ -0,0 +1,33 @@
+import time
+
+from infra.cache import TTLCache
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache(10, 0.05)
+    cache.set('key', 'value')
+
+    assert cache.get('key') == 'value'
+    time.sleep(0.06)
+    assert cache.get('key') is None
+    assert 'key' not in cache.entries
+
+
+def test_least_recently_used_entry_discarded_when_full():
+    cache = TTLCache(2, 60)
+    cache.set('first', 1)
+    cache.set('second', 2)
+    cache.get('first')
+    cache.set('third', 3)
+
+    assert cache.get('second') is None
+    assert cache.get('first') == 1 and cache.get('third') == 3
+
+
+def test_delete():
+    cache = TTLCache(2, 60)
+    cache.set('key', 'value')
+    cache.delete('key')
+    cache.delete('missing')
+
+    assert cache.get('key') is None
@@ -0,0 +1,57 @@
+import os
+import smtplib
+
+import pytest
+
+from domain.enums import CircuitState, Language
+from infra import email_manager as email, email_subjects as subjects, resilience
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'src', 'data', 'email_templates')
+
+
+def test_personal_fields_filled_in_shared_render(monkeypatch):
+    monkeypatch.setattr(email.get_environment(), 'loader', email.EmailTemplatesLoader(TEMPLATES_PATH))
+    shared = email.render_shared(Language.ENGLISH, 'message_to_user', ['user_nickname', 'anti_phishing_phrase'],
+                                 message='Announcement')
+    content = email.fill_personal(shared, user_nickname='<Nick>', anti_phishing_phrase='phrase')
+
+    assert 'Hi &lt;Nick&gt;,' in content
+    assert 'phrase' in content and 'Announcement' in content
+    assert '[[personal:' not in content
+
+
+def test_preloaded_templates_do_not_read_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(email, 'EMAIL_TEMPLATES_PATH', TEMPLATES_PATH)
+    monkeypatch.setattr(email, 'EMAIL_TEMPLATES_CACHE_PATH', str(tmp_path))
+    monkeypatch.setattr(email, 'EMAIL_TEMPLATES_PRELOAD', True)
+    monkeypatch.setattr(email, 'env', email.create_environment(True))
+    email.preload_templates()
+
+    def fail(*args):
+        raise AssertionError('Template read from the file system')
+
+    monkeypatch.setattr(email.EmailTemplatesLoader, 'get_source', fail)
+    assert 'Announcement' in email.env.get_template('english/message_to_user.html').render(message='Announcement')
+
+
+def test_subject_rendered_as_text():
+    assert subjects.get_subject(Language.ENGLISH, 'activated_account', user_nickname='Tom & Jerry') == \
+           'Tom & Jerry, your account has been activated'
+
+
+@pytest.mark.parametrize('error, state', [
+    (smtplib.SMTPRecipientsRefused({'bad@test.com': (550, b'No such user')}), CircuitState.CLOSED),
+    (smtplib.SMTPDataError(554, b'Message rejected'), CircuitState.CLOSED),
+    (smtplib.SMTPServerDisconnected('Connection lost'), CircuitState.OPEN)
+])
+def test_only_server_failures_open_the_circuit(monkeypatch, error, state):
+    def send(sender, to, message):
+        raise error
+
+    monkeypatch.setattr(email, 'APP_ENVIRONMENT', 'PROD')
+    monkeypatch.setattr(email, 'smtp_breaker', resilience.CircuitBreaker('smtp', failure_threshold=1))
+    monkeypatch.setattr(email.smtp_pool, 'send', send)
+
+    with pytest.raises(type(error)):
+        email.send_email('bad@test.com', 'Subject', 'Content')
+    assert email.smtp_breaker.state == state
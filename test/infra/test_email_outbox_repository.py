@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import infra.repositories.email_outbox_repository as outbox_repo
+from domain.enums import EmailStatus
+
+
+class FakeCollection:
+    def __init__(self, modified_count=0):
+        self.modified_count = modified_count
+        self.calls = []
+
+    def find_one_and_update(self, query, update, **kwargs):
+        self.calls.append((query, update))
+
+    def update_many(self, query, update):
+        self.calls.append((query, update))
+        return SimpleNamespace(modified_count=self.modified_count)
+
+
+def test_expired_lease_reclaimed_only_before_the_last_attempt(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(outbox_repo, 'EMAIL_OUTBOX_COLLECTION', collection)
+
+    assert outbox_repo.claim_email('dispatcher', 60, 8) is None
+    (query, update), = collection.calls
+    pending, expired = query['$or']
+    assert 'attempts' not in pending
+    assert expired['status'] == EmailStatus.SENDING.name and expired['attempts'] == {'$lt': 8}
+    assert update['$inc'] == {'attempts': 1}
+
+
+def test_expired_emails_of_the_last_attempt_dead_lettered(monkeypatch):
+    collection = FakeCollection(modified_count=2)
+    monkeypatch.setattr(outbox_repo, 'EMAIL_OUTBOX_COLLECTION', collection)
+
+    assert outbox_repo.dead_letter_expired_emails(8) == 2
+    (query, update), = collection.calls
+    assert query['status'] == EmailStatus.SENDING.name and query['attempts'] == {'$gte': 8}
+    assert update['$set']['status'] == EmailStatus.DEAD.name
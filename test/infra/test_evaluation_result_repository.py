@@ -0,0 +1,40 @@
+import datetime
+
+import pytest
+
+import infra.repositories.evaluation_result_repository as result_repo
+from domain.evaluations import EvaluationResult
+
+
+@pytest.fixture
+def operations(monkeypatch):
+    operations = []
+    monkeypatch.setattr(result_repo.results_writer, 'write', operations.append)
+    return operations
+
+
+def create_result(grade: int) -> EvaluationResult:
+    return EvaluationResult(question='Question', answer='Answer', grade=grade, explanation='Explanation',
+                            question_id='question', evaluation_id='evaluation', candidate='candidate',
+                            date=datetime.datetime(2023, 5, 4, 10, 30))
+
+
+def test_result_upserted_by_evaluation_candidate_and_question(operations):
+    result_repo.save_evaluation_result(create_result(3))
+    result_repo.save_evaluation_result(create_result(5))
+
+    first, second = operations
+    assert first._filter == second._filter == {'evaluation_id': 'evaluation', 'candidate': 'candidate',
+                                               'question_id': 'question'}
+    assert first._upsert and second._upsert
+    assert second._doc['$set']['grade'] == 5
+    # The key fields are only in the filter, the id is set only when the result is inserted
+    assert not {'evaluation_id', 'candidate', 'question_id', '_id'} & set(second._doc['$set'])
+    assert '_id' in second._doc['$setOnInsert']
+
+
+def test_stored_result_deserialized():
+    result = create_result(4)
+    data = {'_id': 'id', **result.to_dict()}
+
+    assert result_repo.deserialize_evaluation_result(data) == result
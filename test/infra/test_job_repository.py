@@ -0,0 +1,77 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import infra.repositories.job_repository as job_repo
+from domain.enums import JobPriority, JobStatus, JobType
+from domain.jobs import Job
+
+
+class FakeCollection:
+    def __init__(self, job_data=None, modified_count=1):
+        self.job_data = job_data
+        self.modified_count = modified_count
+        self.calls = []
+
+    def find_one_and_update(self, query, update, **kwargs):
+        self.calls.append((query, update, kwargs))
+        return self.job_data
+
+    def update_one(self, query, update):
+        self.calls.append((query, update))
+        return SimpleNamespace(modified_count=self.modified_count)
+
+
+def create_job() -> Job:
+    now = datetime.datetime.utcnow()
+    return Job(id='job', type=JobType.EVALUATE_ANSWERS, user='user', payload={}, priority=JobPriority.BULK,
+               creation_date=now, available_date=now, status=JobStatus.RUNNING, attempts=1, worker='worker')
+
+
+def test_claim_takes_pending_or_expired_jobs_by_priority(monkeypatch):
+    collection = FakeCollection(create_job().to_dict())
+    monkeypatch.setattr(job_repo, 'JOBS_COLLECTION', collection)
+
+    job = job_repo.claim_job('worker', 300)
+
+    assert job.id == 'job' and job.type == JobType.EVALUATE_ANSWERS and job.priority == JobPriority.BULK
+    (query, update, kwargs), = collection.calls
+    statuses = [condition['status'] for condition in query['$or']]
+    assert statuses == [JobStatus.PENDING.name, JobStatus.RUNNING.name]
+    assert 'lease_expiration_date' in query['$or'][1]
+    assert update['$inc'] == {'attempts': 1}
+    assert update['$set']['worker'] == 'worker'
+    lease = update['$set']['lease_expiration_date'] - datetime.datetime.utcnow()
+    assert datetime.timedelta(seconds=299) < lease <= datetime.timedelta(seconds=300)
+    assert kwargs['sort'][0] == ('priority', job_repo.DESCENDING)
+
+
+def test_no_job_claimed(monkeypatch):
+    monkeypatch.setattr(job_repo, 'JOBS_COLLECTION', FakeCollection())
+
+    assert job_repo.claim_job('worker', 300) is None
+
+
+@pytest.mark.parametrize('modified_count, finished', [(1, True), (0, False)])
+def test_job_finished_only_by_the_worker_holding_it(monkeypatch, modified_count, finished):
+    collection = FakeCollection(modified_count=modified_count)
+    monkeypatch.setattr(job_repo, 'JOBS_COLLECTION', collection)
+
+    assert job_repo.finish_job(create_job(), JobStatus.DONE, result={'grade': 4}) == finished
+    (query, update), = collection.calls
+    assert query == {'_id': 'job', 'worker': 'worker', 'status': JobStatus.RUNNING.name}
+    assert update['$set']['status'] == JobStatus.DONE.name
+
+
+def test_retried_job_released(monkeypatch):
+    collection = FakeCollection()
+    monkeypatch.setattr(job_repo, 'JOBS_COLLECTION', collection)
+    available_date = datetime.datetime.utcnow() + datetime.timedelta(seconds=10)
+
+    job_repo.retry_job(create_job(), available_date, 'Model is down')
+
+    (query, update), = collection.calls
+    assert query['worker'] == 'worker'
+    assert update['$set'] == {'status': JobStatus.PENDING.name, 'available_date': available_date,
+                              'error': 'Model is down', 'worker': None, 'lease_expiration_date': None}
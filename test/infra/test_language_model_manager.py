@@ -0,0 +1,54 @@
+import time
+
+import pytest
+
+from domain.exeptions import AIModelException
+from infra import language_model_manager as model
+
+
+def test_pack_answers():
+    pairs = [('question', 'answer')] * (model.MAX_ANSWERS_PER_PROMPT + 1)
+    packs = model.pack_answers(pairs)
+
+    assert len(packs) == 2
+    assert [index for pack in packs for index in pack] == list(range(len(pairs)))
+
+
+def test_parse_batch_response():
+    pairs = [('first question', 'first answer'), ('second question', 'second answer')]
+    results = model.parse_batch_response('2|4|Good answer with 2 examples\n1|1|Not related', pairs)
+
+    assert results[0].grade == 1
+    assert results[1].grade == 4
+    assert results[1].question == 'second question'
+    assert results[1].explanation == 'Good answer with 2 examples'
+
+
+def test_parse_grade_response():
+    assert model.parse_grade_response('3|Mentions 2 of the 5 points') == (3, 'Mentions 2 of the 5 points')
+    assert model.parse_grade_response('5') == (5, '')
+
+
+def test_parse_grade_response_not_valid():
+    with pytest.raises(AIModelException):
+        model.parse_grade_response('The answer mentions 2 of the 5 points')
+
+
+def test_truncate_answer_keeps_beginning_and_end():
+    answer = 'a' * 100 + 'b' * 100
+
+    truncated = model.truncate_answer(answer, 20)
+
+    assert model.estimate_tokens(truncated) <= 20
+    assert truncated.startswith('a') and truncated.endswith('b')
+    assert model.TRUNCATION_MARK in truncated
+    assert model.truncate_answer('short', 20) == 'short'
+
+
+def test_rate_limiter_gives_up_at_timeout():
+    limiter = model.RateLimiter(1, 60)
+
+    assert limiter.acquire(0.1)
+    start = time.monotonic()
+    assert not limiter.acquire(0.1)
+    assert time.monotonic() - start < 0.1
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+import infra.model_router as model_router
+from domain.exeptions import DeadlineExceededException
+from infra import resilience
+from infra.model_router import ModelRouter, ModelBackend
+
+PRIMARY = ModelBackend('primary', 'model', 'http://primary', '')
+SECONDARY = ModelBackend('secondary', 'model', 'http://secondary', '')
+
+
+def test_hedged_call_returns_fastest_backend(monkeypatch):
+    monkeypatch.setattr(model_router, 'MODEL_HEDGE_MIN_SECONDS', 0.05)
+    router = ModelRouter([PRIMARY, SECONDARY])
+
+    def complete(backend):
+        if backend.name == 'primary':
+            time.sleep(1)
+        return backend.name
+
+    start = time.monotonic()
+    assert router.call(complete) == 'secondary'
+    assert time.monotonic() - start < 1
+
+
+def test_failed_call_fails_over_to_next_backend():
+    router = ModelRouter([PRIMARY, SECONDARY])
+
+    def complete(backend):
+        if backend.name == 'primary':
+            raise ConnectionError('Primary is down')
+        return backend.name
+
+    assert router.call(complete) == 'secondary'
+    assert router.get_stats()['primary']['failures'] == 1
+
+
+def test_admission_wait_not_counted_as_latency(monkeypatch):
+    monkeypatch.setattr(model_router, 'MODEL_HEDGE_MIN_SECONDS', 0.05)
+    router = ModelRouter([PRIMARY, SECONDARY])
+    called = []
+
+    def complete(backend):
+        called.append(backend.name)
+        return backend.name
+
+    assert router.call(complete, lambda abandoned: time.sleep(0.3)) == 'primary'
+    assert called == ['primary']
+    assert router.get_stats()['primary']['p50_ms'] < 100
+
+
+def test_abandoned_attempt_not_sent():
+    router = ModelRouter([PRIMARY, SECONDARY])
+    called = []
+
+    def complete(backend):
+        called.append(backend.name)
+        raise ConnectionError('Down')
+
+    def admit(abandoned):
+        if len(called) == 0:
+            return
+        # The second attempt waits until the router gives up on the call
+        abandoned.wait(1)
+
+    with pytest.raises(DeadlineExceededException):
+        with resilience.deadline(0.2):
+            router.call(complete, admit)
+
+    time.sleep(0.1)
+    assert called == ['primary']
@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+from domain.enums import CircuitState
+from domain.exeptions import CircuitOpenException, DeadlineExceededException
+from infra import resilience
+from infra.resilience import CircuitBreaker
+
+
+def fail():
+    raise ConnectionError('Dependency is down')
+
+
+def test_circuit_opens_and_recovers():
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_seconds=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+    with pytest.raises(CircuitOpenException):
+        breaker.call(lambda: True)
+    assert breaker.state == CircuitState.OPEN
+
+    time.sleep(0.05)
+    assert breaker.call(lambda: True)
+    assert breaker.state == CircuitState.CLOSED
+
+
+def test_timeout_bounded_by_deadline():
+    assert resilience.timeout_for(10) == 10
+
+    with resilience.deadline(1):
+        assert resilience.timeout_for(10) <= 1
+
+    with resilience.deadline(0):
+        with pytest.raises(DeadlineExceededException):
+            resilience.timeout_for(10)
@@ -0,0 +1,97 @@
+import os
+import smtplib
+import socket
+import sys
+import threading
+
+import pytest
+
+from infra.smtp_pool import SmtpPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'benchmarks'))
+
+from fake_smtp_server import FakeSmtpServer  # noqa: E402
+
+
+def create_pool(server: FakeSmtpServer, size: int = 2, max_messages: int = 100,
+                keepalive_seconds: float = 30) -> SmtpPool:
+    return SmtpPool('127.0.0.1', server.port, 'sender@test.com', 'password', size, max_messages, keepalive_seconds,
+                    timeout=5, use_tls=False)
+
+
+def test_connections_reused():
+    server = FakeSmtpServer().start()
+    pool = create_pool(server)
+    try:
+        for i in range(10):
+            pool.send('sender@test.com', f'user{i}@test.com', f'Subject: {i}\r\n\r\nMessage {i}')
+    finally:
+        pool.close()
+        server.stop()
+
+    assert len(server.messages) == 10
+    assert server.connections == 1
+    assert server.logins == 1
+
+
+def test_connections_renewed_after_max_messages():
+    server = FakeSmtpServer().start()
+    pool = create_pool(server, max_messages=3)
+    try:
+        for i in range(7):
+            pool.send('sender@test.com', 'user@test.com', 'Message')
+    finally:
+        pool.close()
+        server.stop()
+
+    assert len(server.messages) == 7
+    assert server.connections == 3
+
+
+def test_reconnects_when_connection_lost():
+    server = FakeSmtpServer().start()
+    pool = create_pool(server, keepalive_seconds=0)
+    try:
+        pool.send('sender@test.com', 'user@test.com', 'First')
+        # The idle connection is dropped, NOOP detects it
+        pool.idle[0].smtp.sock.shutdown(socket.SHUT_RDWR)
+        pool.send('sender@test.com', 'user@test.com', 'Second')
+    finally:
+        pool.close()
+        server.stop()
+
+    assert len(server.messages) == 2
+    assert server.connections == 2
+
+
+def test_concurrent_checkout_bounded_by_size():
+    server = FakeSmtpServer(latency=0.01).start()
+    pool = create_pool(server, size=2)
+    threads = [threading.Thread(target=pool.send, args=('sender@test.com', 'user@test.com', 'Message'))
+               for _ in range(8)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        pool.close()
+        server.stop()
+
+    assert len(server.messages) == 8
+    assert server.connections <= 2
+
+
+def test_connection_reused_after_rejected_recipient():
+    server = FakeSmtpServer(rejected_recipients={'unknown@test.com'}).start()
+    pool = create_pool(server)
+    try:
+        with pytest.raises(smtplib.SMTPRecipientsRefused):
+            pool.send('sender@test.com', 'unknown@test.com', 'Rejected')
+        pool.send('sender@test.com', 'user@test.com', 'Accepted')
+    finally:
+        pool.close()
+        server.stop()
+
+    assert len(server.messages) == 1
+    assert server.connections == 1
@@ -0,0 +1,17 @@
+import pytest
+from pydantic import ValidationError
+
+from constants import MAX_ANSWER_CHARS
+from rest_api.dtos import AnswerRequest, EvaluateAnswerRequest, ANSWER_TOO_LONG
+
+
+@pytest.mark.parametrize('create', [
+    lambda answer: AnswerRequest(question_id='question', answer=answer),
+    lambda answer: EvaluateAnswerRequest(question='Question', answer=answer)
+])
+def test_answers_longer_than_the_maximum_rejected(create):
+    assert create('a' * MAX_ANSWER_CHARS).answer
+
+    with pytest.raises(ValidationError) as e:
+        create('a' * (MAX_ANSWER_CHARS + 1))
+    assert ANSWER_TOO_LONG in str(e.value)
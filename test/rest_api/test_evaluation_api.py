@@ -0,0 +1,57 @@
+import asyncio
+
+from constants import MAX_ANSWER_CHARS, DEPENDENCY_UNAVAILABLE
+from domain.exeptions import CircuitOpenException
+from rest_api.evaluation_api import evaluation_api, to_server_sent_events
+
+
+def test_tokens_framed_as_server_sent_events():
+    events = list(to_server_sent_events(iter(['What is', ' a closure?'])))
+
+    assert events == ['data: What is\n\n', 'data:  a closure?\n\n', 'event: end\ndata: \n\n']
+
+
+def test_end_event_sent_without_tokens():
+    assert list(to_server_sent_events(iter([]))) == ['event: end\ndata: \n\n']
+
+
+
+def test_error_after_the_first_token_sent_as_event():
+    finished = []
+
+    def tokens():
+        yield 'What is'
+        raise CircuitOpenException('Circuit model:default is open', 30)
+
+    events = list(to_server_sent_events(tokens(), lambda: finished.append(True)))
+
+    assert events == ['data: What is\n\n', f'event: error\ndata: {DEPENDENCY_UNAVAILABLE}\n\n']
+    assert finished == [True]
+
+
+def test_finished_once_the_stream_ends():
+    finished = []
+    events = to_server_sent_events(iter(['Question']), lambda: finished.append(True))
+
+    assert next(events) == 'data: Question\n\n'
+    assert finished == []
+    assert list(events) == ['event: end\ndata: \n\n']
+    assert finished == [True]
+
+def test_answer_of_the_query_limited():
+    route = next(route for route in evaluation_api.routes
+                 if route.path == '/evaluate_answer' and 'GET' in route.methods)
+    answer = next(param for param in route.dependant.query_params if param.name == 'answer')
+
+    assert answer.field_info.max_length == MAX_ANSWER_CHARS
+
+
+def test_model_endpoints_run_in_the_threadpool():
+    # The model calls block while they wait for the rate limit or the backends, never in the event loop
+    model_endpoints = {('GET', '/generate_question'), ('POST', '/generate_questions'), ('GET', '/evaluate_answer'),
+                       ('POST', '/evaluate_answer'), ('POST', '/evaluate_answers')}
+    routes = [route for route in evaluation_api.routes
+              if any((method, route.path) in model_endpoints for method in route.methods)]
+
+    assert len(routes) == len(model_endpoints)
+    assert not any(asyncio.iscoroutinefunction(route.endpoint) for route in routes)
@@ -0,0 +1,75 @@
+import asyncio
+import datetime
+import json
+from dataclasses import dataclass
+from typing import Dict, List
+
+from fastapi import APIRouter, FastAPI, Response
+
+from domain.enums import Language
+from rest_api.serialization import FastJSONRoute, FastJSONResponse, dumps
+
+
+@dataclass
+class Item:
+    id: str
+    secret: str
+
+    def to_api_response(self):
+        return {'id': self.id}
+
+
+router = APIRouter(route_class=FastJSONRoute)
+
+
+@router.get('/items')
+async def get_items() -> List[Dict]:
+    return [Item('1', 'secret'), Item('2', 'secret')]
+
+
+@router.post('/items', status_code=201)
+def create_item() -> Dict:
+    return {'date': datetime.datetime(2023, 5, 10, 12, 0), 'language': Language.ENGLISH}
+
+
+@router.get('/status')
+async def get_status(response: Response) -> Dict:
+    response.status_code = 503
+    return {'status': 'down'}
+
+
+app = FastAPI(default_response_class=FastJSONResponse)
+app.include_router(router, prefix='/test')
+
+
+def request(method: str, path: str):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'headers': [], 'root_path': '', 'scheme': 'http', 'server': ('test', 80), 'client': ('test', 1),
+             'http_version': '1.1'}
+    asyncio.run(app(scope, receive, send))
+    body = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return messages[0]['status'], json.loads(body)
+
+
+def test_domain_objects_encoded_with_api_response():
+    assert request('GET', '/test/items') == (200, [{'id': '1'}, {'id': '2'}])
+
+
+def test_route_status_code_kept():
+    assert request('POST', '/test/items') == (201, {'date': '2023-05-10T12:00:00', 'language': 'english'})
+
+
+def test_endpoints_taking_response_keep_its_status():
+    assert request('GET', '/test/status') == (503, {'status': 'down'})
+
+
+def test_dumps_sets():
+    assert json.loads(dumps({'values': {1}})) == {'values': [1]}
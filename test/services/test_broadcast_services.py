@@ -0,0 +1,32 @@
+import datetime
+
+from domain.broadcasts import Broadcast, Recipient
+from domain.enums import BroadcastStatus, Language, UserRole
+from services import broadcast_services as broadcast_serv
+
+
+def test_broadcast_sent_by_pages_with_checkpoints(monkeypatch):
+    users = [Recipient(id=f'{i:03}', email=f'user{i}@test.com', nickname=f'user{i}', anti_phishing_phrase='phrase',
+                       language=Language.SPANISH if i % 5 == 0 else Language.ENGLISH,
+                       role=UserRole.ADMIN if i == 1 else UserRole.EXPERT)
+             for i in range(25)]
+    sent = []
+    checkpoints = []
+    monkeypatch.setattr(broadcast_serv, 'BROADCAST_BATCH_SIZE', 10)
+    monkeypatch.setattr(broadcast_serv.email, 'render_shared', lambda *args, **kwargs: 'Hi [[personal:user_nickname]]')
+    monkeypatch.setattr(broadcast_serv.email, 'send_email', lambda to, subject, content: sent.append(content))
+    monkeypatch.setattr(broadcast_serv.user_repo, 'find_recipients',
+                        lambda after, limit: [user for user in users if not after or user.id > after][:limit])
+    monkeypatch.setattr(broadcast_serv.broadcast_repo, 'save_progress',
+                        lambda broadcast, lease: checkpoints.append(broadcast.last_user_id) or True)
+    monkeypatch.setattr(broadcast_serv.broadcast_repo, 'finish_broadcast',
+                        lambda broadcast, status: checkpoints.append(status))
+
+    broadcast = Broadcast(id='broadcast', user='admin', subject='Subject', message='Message',
+                          language=Language.ENGLISH, creation_date=datetime.datetime.utcnow(), worker='worker')
+    broadcast_serv.run_broadcast(broadcast)
+
+    assert checkpoints == ['009', '019', '024', BroadcastStatus.DONE]
+    assert broadcast.processed == 25
+    assert broadcast.sent == len(sent) == 19
+    assert 'Hi user2' in sent
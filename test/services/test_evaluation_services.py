@@ -0,0 +1,211 @@
+import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from domain.enums import Language, UserRole
+from domain.evaluations import EvaluationResult, Evaluation, Project, Question, QuestionTopic
+from domain.users import User
+from domain.exeptions import AIModelException
+from rest_api.dtos import AnswerRequest, EvaluateAnswersRequest, GenerateQuestionsRequest
+from services import evaluation_services as eval_serv
+
+MEMBER = User(id='member', email='member@test.com', given_names='Given', family_names='Family', nickname='member',
+              language=Language.ENGLISH, role=UserRole.EXPERT, passwords=[], anti_phishing_phrase='phrase')
+OUTSIDER = User(id='outsider', email='outsider@test.com', given_names='Given', family_names='Family',
+                nickname='outsider', language=Language.ENGLISH, role=UserRole.EXPERT, passwords=[],
+                anti_phishing_phrase='phrase')
+
+
+@pytest.fixture
+def project(monkeypatch):
+    project = Project(id='project', name='Project', description='Description', users=[MEMBER.id])
+    monkeypatch.setattr(eval_serv.proj_repo, 'find_project_by_id', lambda project_id: project)
+    return project
+
+
+@pytest.fixture
+def charges(monkeypatch):
+    charges = []
+    monkeypatch.setattr(eval_serv.quota_serv, 'consume_llm_quota',
+                        lambda user, project_id=None, cost=1: charges.append((user.id, project_id, cost)))
+    return charges
+
+
+def test_project_not_charged_for_outsiders(project, charges):
+    with pytest.raises(HTTPException) as e:
+        eval_serv.evaluate_answer('Question', 'Answer', OUTSIDER, project_id=project.id)
+
+    assert e.value.status_code == 403
+    assert charges == []
+
+
+def test_quota_charged_after_membership_checked(project, charges, monkeypatch):
+    monkeypatch.setattr(eval_serv.model, 'evaluate_answer',
+                        lambda question, answer, fast: EvaluationResult(question, answer, 4, ''))
+    eval_serv.evaluate_answer('Question', 'Answer', MEMBER, project_id=project.id)
+
+    assert charges == [(MEMBER.id, project.id, 1)]
+
+
+
+@pytest.fixture
+def evaluation(project, monkeypatch):
+    question = Question(id='question', text='Question', mandatory=True, time_to_respond=datetime.time(0, 5))
+    evaluation = Evaluation(id='evaluation', project_id=project.id, name='Evaluation', description='Description',
+                            language=Language.ENGLISH, questions=[question])
+    monkeypatch.setattr(eval_serv.eval_repo, 'find_evaluation_by_id', lambda evaluation_id: evaluation)
+    return evaluation
+
+
+@pytest.fixture
+def stored(monkeypatch):
+    stored = []
+    monkeypatch.setattr(eval_serv.result_repo, 'save_evaluation_result', stored.append)
+    return stored
+
+
+def test_result_stored_with_its_evaluation_and_candidate(evaluation, charges, stored, monkeypatch):
+    monkeypatch.setattr(eval_serv.model, 'evaluate_answer',
+                        lambda question, answer, fast: EvaluationResult(question, answer, 4, 'Explanation'))
+    eval_serv.evaluate_answer('Question', 'Answer', MEMBER, 'project', evaluation.id, 'question', 'candidate')
+
+    result, = stored
+    assert (result.evaluation_id, result.question_id, result.candidate) == (evaluation.id, 'question', 'candidate')
+    assert result.date is not None
+
+
+def test_result_of_unknown_question_not_evaluated(evaluation, charges, stored):
+    with pytest.raises(HTTPException) as e:
+        eval_serv.evaluate_answer('Question', 'Answer', MEMBER, 'project', evaluation.id, 'unknown', 'candidate')
+
+    assert e.value.status_code == 404
+    assert stored == [] and charges == []
+
+
+def test_batch_results_stored_only_for_a_candidate(evaluation, charges, stored, monkeypatch):
+    monkeypatch.setattr(eval_serv.model, 'evaluate_answers',
+                        lambda pairs, fast: [EvaluationResult(question, answer, 4, '') for question, answer in pairs])
+    answers = [AnswerRequest(question_id='question', answer='Answer'),
+               AnswerRequest(question_id='unknown', answer='Answer')]
+
+    response = eval_serv.evaluate_answers(EvaluateAnswersRequest(project_id='project', evaluation_id=evaluation.id,
+                                                                 answers=answers), MEMBER)
+    assert [result.question_id for result in response['results']] == ['question']
+    assert response['errors'] == [{'question_id': 'unknown', 'error': eval_serv.QUESTION_DO_NOT_EXIST}]
+    assert stored == []
+
+    eval_serv.evaluate_answers(EvaluateAnswersRequest(project_id='project', evaluation_id=evaluation.id,
+                                                      answers=answers, candidate='candidate'), MEMBER)
+    assert [(result.question_id, result.candidate) for result in stored] == [('question', 'candidate')]
+
+
+@pytest.fixture
+def pools(monkeypatch):
+    pools = {}
+    monkeypatch.setattr(eval_serv.checkpoint_repo, 'find_checkpoint', lambda name: None)
+    monkeypatch.setattr(eval_serv.checkpoint_repo, 'save_checkpoint', lambda name, values: None)
+    monkeypatch.setattr(eval_serv.pool_repo, 'count_questions', lambda topic, language: len(pools.get(topic, [])))
+    monkeypatch.setattr(eval_serv.pool_repo, 'insert_questions',
+                        lambda topic, language, questions: pools.setdefault(topic, []).extend(questions))
+    return pools
+
+
+def test_refill_stops_at_the_generations_of_a_run(pools, monkeypatch):
+    topics = [QuestionTopic(f'topic {i}', Language.ENGLISH, 10 - i, None) for i in range(5)]
+    generations = []
+
+    def create_question(topic, language, background=False):
+        generations.append((topic, background))
+        return f'Question {len(generations)} about {topic}'
+
+    monkeypatch.setattr(eval_serv, 'QUESTION_POOL_SIZE', 4)
+    monkeypatch.setattr(eval_serv, 'QUESTION_POOL_GENERATIONS_PER_RUN', 10)
+    monkeypatch.setattr(eval_serv.pool_repo, 'find_popular_topics', lambda limit: topics)
+    monkeypatch.setattr(eval_serv.model, 'create_question', create_question)
+    eval_serv.refill_question_pools()
+
+    assert len(generations) == 10
+    assert all(background for _, background in generations)
+    assert [len(pools.get(topic.topic, [])) for topic in topics] == [4, 4, 2, 0, 0]
+
+
+def test_refill_error_moves_to_next_topic(pools, monkeypatch):
+    topics = [QuestionTopic('failing', Language.ENGLISH, 2, None), QuestionTopic('working', Language.ENGLISH, 1, None)]
+    generations = []
+
+    def create_question(topic, language, background=False):
+        generations.append(topic)
+        if topic == 'failing':
+            raise ConnectionError('Model is down')
+        return f'Question {len(generations)} about {topic}'
+
+    monkeypatch.setattr(eval_serv, 'QUESTION_POOL_SIZE', 4)
+    monkeypatch.setattr(eval_serv.pool_repo, 'find_popular_topics', lambda limit: topics)
+    monkeypatch.setattr(eval_serv.model, 'create_question', create_question)
+    eval_serv.refill_question_pools()
+
+    assert 'failing' not in pools
+    assert generations == ['failing'] + ['working'] * 4
+    assert len(pools['working']) == 4
+
+
+def test_topic_popularity_halved_every_half_life(monkeypatch):
+    now = datetime.datetime.utcnow()
+    checkpoints = {eval_serv.QUESTION_POOL_DECAY_CHECKPOINT: {'decayed_until': now}}
+    factors = []
+    monkeypatch.setattr(eval_serv, 'QUESTION_POOL_POPULARITY_HALF_LIFE_HOURS', 24)
+    monkeypatch.setattr(eval_serv.checkpoint_repo, 'find_checkpoint', checkpoints.get)
+    monkeypatch.setattr(eval_serv.checkpoint_repo, 'save_checkpoint', checkpoints.__setitem__)
+    monkeypatch.setattr(eval_serv.pool_repo, 'decay_topic_requests', factors.append)
+
+    later = now + datetime.timedelta(hours=48)
+    eval_serv.decay_topic_popularity(later)
+
+    assert factors == [pytest.approx(0.25)]
+    assert checkpoints[eval_serv.QUESTION_POOL_DECAY_CHECKPOINT] == {'decayed_until': later}
+
+
+def test_generated_questions_keep_the_order_of_the_topics(evaluation, charges, monkeypatch):
+    pooled = {'pooled 1': 'Pooled question 1', 'pooled 2': 'Pooled question 2'}
+    added = []
+    generated = []
+
+    def create_questions(topics):
+        generated.extend(topic for topic, _ in topics)
+        return [AIModelException('Not valid') if topic == 'failing' else f'Generated question about {topic}'
+                for topic, _ in topics]
+
+    monkeypatch.setattr(eval_serv.pool_repo, 'register_topic_request', lambda topic, language: None)
+    monkeypatch.setattr(eval_serv.pool_repo, 'pop_question', lambda topic, language: pooled.get(topic))
+    monkeypatch.setattr(eval_serv.model, 'create_questions', create_questions)
+    monkeypatch.setattr(eval_serv.eval_repo, 'add_questions',
+                        lambda evaluation_id, questions: added.extend(question.text for question in questions))
+
+    response = eval_serv.generate_questions(GenerateQuestionsRequest(
+        project_id='project', evaluation_id=evaluation.id, topics=['pooled 1', 'new', 'failing', 'pooled 2'],
+        time_to_respond=datetime.time(0, 5)), MEMBER)
+
+    # Only the topics without pooled questions are generated, one failing does not discard the others
+    assert generated == ['new', 'failing']
+    assert added == ['Pooled question 1', 'Generated question about new', 'Pooled question 2']
+    assert len(response['question_ids']) == 3
+    assert response['errors'] == [{'topic': 'failing', 'error': eval_serv.MODEL_RESPONSE_NOT_VALID}]
+    assert charges == [(MEMBER.id, 'project', 4)]
+
+
+def test_no_questions_added_when_every_topic_fails(evaluation, charges, monkeypatch):
+    added = []
+    monkeypatch.setattr(eval_serv.pool_repo, 'register_topic_request', lambda topic, language: None)
+    monkeypatch.setattr(eval_serv.pool_repo, 'pop_question', lambda topic, language: None)
+    monkeypatch.setattr(eval_serv.model, 'create_questions',
+                        lambda topics: [AIModelException('Not valid') for _ in topics])
+    monkeypatch.setattr(eval_serv.eval_repo, 'add_questions', lambda evaluation_id, questions: added.append(questions))
+
+    response = eval_serv.generate_questions(GenerateQuestionsRequest(
+        project_id='project', evaluation_id=evaluation.id, topics=['first', 'second'],
+        time_to_respond=datetime.time(0, 5)), MEMBER)
+
+    assert added == []
+    assert response['question_ids'] == []
+    assert [error['topic'] for error in response['errors']] == ['first', 'second']
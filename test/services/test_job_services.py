@@ -0,0 +1,117 @@
+import datetime
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from domain.enums import JobPriority, JobStatus, JobType, Language, UserRole
+from domain.jobs import Job
+from domain.users import User
+from services import job_services as job_serv
+
+USER = User(id='user', email='user@test.com', given_names='Given', family_names='Family', nickname='user',
+            language=Language.ENGLISH, role=UserRole.EXPERT, passwords=[], anti_phishing_phrase='phrase')
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    calls = []
+    monkeypatch.setattr(job_serv.user_repo, 'find_user_by_id', lambda user_id: USER)
+    monkeypatch.setattr(job_serv.job_repo, 'finish_job',
+                        lambda job, status, result=None, error=None: calls.append(('finish', status, result, error))
+                        or True)
+    monkeypatch.setattr(job_serv.job_repo, 'retry_job',
+                        lambda job, available_date, error: calls.append(('retry', available_date, error)))
+    return calls
+
+
+def create_job(attempts: int) -> Job:
+    now = datetime.datetime.utcnow()
+    return Job(id='job', type=JobType.GENERATE_QUESTION, user=USER.id,
+               payload={'topic': 'Topic', 'language': 'ENGLISH'}, priority=JobPriority.INTERACTIVE,
+               creation_date=now, available_date=now, status=JobStatus.RUNNING, attempts=attempts, worker='worker')
+
+
+def handle_with(function):
+    return {**job_serv.HANDLERS, JobType.GENERATE_QUESTION: function}
+
+
+def fail_with(error: Exception):
+    def handler(payload, user):
+        raise error
+
+    return handler
+
+
+def test_done_job_finished_with_result(jobs, monkeypatch):
+    monkeypatch.setattr(job_serv, 'HANDLERS', handle_with(lambda payload, user: {'question': 'Question'}))
+    job_serv.process_job(create_job(1))
+
+    assert jobs == [('finish', JobStatus.DONE, {'question': 'Question'}, None)]
+
+
+def test_failed_attempts_retried_with_backoff(jobs, monkeypatch):
+    monkeypatch.setattr(job_serv, 'HANDLERS', handle_with(fail_with(ConnectionError('Model is down'))))
+    job_serv.process_job(create_job(1))
+    job_serv.process_job(create_job(2))
+
+    (first, first_date, error), (second, second_date, _) = jobs
+    assert first == second == 'retry' and error == 'Model is down'
+    now = datetime.datetime.utcnow()
+    assert first_date - now < datetime.timedelta(seconds=job_serv.JOB_RETRY_BASE_SECONDS)
+    assert second_date - now > datetime.timedelta(seconds=job_serv.JOB_RETRY_BASE_SECONDS)
+
+
+def test_job_failed_after_the_last_attempt(jobs, monkeypatch):
+    monkeypatch.setattr(job_serv, 'HANDLERS', handle_with(fail_with(ConnectionError('Model is down'))))
+    job_serv.process_job(create_job(job_serv.JOB_MAX_ATTEMPTS))
+
+    assert jobs == [('finish', JobStatus.FAILED, None, 'Model is down')]
+
+
+def test_business_error_not_retried(jobs, monkeypatch):
+    monkeypatch.setattr(job_serv, 'HANDLERS', handle_with(fail_with(HTTPException(status_code=404,
+                                                                                  detail='evaluation-do-not-exist'))))
+    job_serv.process_job(create_job(1))
+
+    assert jobs == [('finish', JobStatus.FAILED, None, 'evaluation-do-not-exist')]
+
+
+def test_job_reclaimed_after_the_last_attempt_not_run(jobs, monkeypatch):
+    # The worker of the last attempt died holding the lease, the job was claimed once more
+    runs = []
+    monkeypatch.setattr(job_serv, 'HANDLERS', handle_with(lambda payload, user: runs.append(payload)))
+    job = create_job(job_serv.JOB_MAX_ATTEMPTS + 1)
+    job.error = 'Model is down'
+    job_serv.process_job(job)
+
+    assert runs == []
+    assert jobs == [('finish', JobStatus.FAILED, None, 'Model is down')]
+
+
+def test_worker_processes_claimed_jobs_until_stopped(monkeypatch):
+    stop = threading.Event()
+    queue = [create_job(1), create_job(1)]
+    processed = []
+
+    def claim_job(worker, lease_seconds):
+        if not queue:
+            stop.set()
+            return None
+        return queue.pop(0)
+
+    monkeypatch.setattr(job_serv.job_repo, 'claim_job', claim_job)
+    monkeypatch.setattr(job_serv, 'process_job', processed.append)
+    job_serv.run_worker('worker', stop)
+
+    assert len(processed) == 2
+
+
+@pytest.mark.parametrize('job_type, priority', [(JobType.GENERATE_QUESTION, JobPriority.INTERACTIVE),
+                                                (JobType.EVALUATE_ANSWERS, JobPriority.BULK)])
+def test_priority_set_from_the_job_type(job_type, priority, monkeypatch):
+    inserted = []
+    monkeypatch.setattr(job_serv.job_repo, 'insert_job', inserted.append)
+    job_serv.submit_job(job_type, {}, USER)
+
+    assert inserted[0].priority == priority
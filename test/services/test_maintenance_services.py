@@ -0,0 +1,67 @@
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from services import maintenance_services as maintenance_serv
+
+USER_IDS = sorted(str(uuid.uuid4()) for _ in range(500))
+
+
+@pytest.fixture
+def checkpoints(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(maintenance_serv.checkpoint_repo, 'find_checkpoint', lambda name: saved.get(name))
+    monkeypatch.setattr(maintenance_serv.checkpoint_repo, 'save_checkpoint',
+                        lambda name, values: saved.setdefault(name, {}).update(values))
+    return saved
+
+
+def find_users_in_range(start_id, end_id, after_user_id, limit):
+    return [SimpleNamespace(id=user_id) for user_id in USER_IDS
+            if (not start_id or user_id >= start_id) and (not end_id or user_id < end_id)
+            and (not after_user_id or user_id > after_user_id)][:limit]
+
+
+def test_partitions_cover_every_id():
+    partitions = maintenance_serv.get_partitions(16)
+    assert len(partitions) == 16
+    assert partitions[0].start_id is None and partitions[-1].end_id is None
+    assert all(previous.end_id == partition.start_id for previous, partition in zip(partitions, partitions[1:]))
+
+
+def test_every_user_processed_once(checkpoints, monkeypatch):
+    monkeypatch.setattr(maintenance_serv.user_repo, 'find_users_in_range', find_users_in_range)
+    processed = []
+    lock = threading.Lock()
+
+    def process(user):
+        with lock:
+            processed.append(user.id)
+
+    summary = maintenance_serv.run_partitioned_job('job', process, partitions=8, workers=3, batch_size=20)
+
+    assert sorted(processed) == USER_IDS
+    assert summary['finished'] and summary['processed'] == len(USER_IDS)
+
+
+def test_interrupted_run_resumed_from_checkpoints(checkpoints, monkeypatch):
+    pages = []
+
+    def failing_find(start_id, end_id, after_user_id, limit):
+        pages.append(start_id)
+        if start_id is None and len([page for page in pages if page is None]) == 3:
+            raise ConnectionError('Connection lost')
+        return find_users_in_range(start_id, end_id, after_user_id, limit)
+
+    monkeypatch.setattr(maintenance_serv.user_repo, 'find_users_in_range', failing_find)
+    processed = []
+    summary = maintenance_serv.run_partitioned_job('job', lambda user: processed.append(user.id), partitions=4,
+                                                   workers=1, batch_size=10)
+    assert not summary['finished']
+
+    summary = maintenance_serv.run_partitioned_job('job', lambda user: processed.append(user.id), partitions=4,
+                                                   workers=1, batch_size=10)
+    assert summary['finished']
+    assert sorted(processed) == USER_IDS
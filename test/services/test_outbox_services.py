@@ -0,0 +1,74 @@
+import datetime
+import threading
+
+import pytest
+
+from domain.emails import OutboxEmail
+from domain.enums import EmailStatus
+from domain.exeptions import CircuitOpenException
+from services import outbox_services as outbox_serv
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    calls = []
+    monkeypatch.setattr(outbox_serv.outbox_repo, 'finish_email',
+                        lambda email, status, error=None: calls.append(('finish', status, email.attempts)) or True)
+    monkeypatch.setattr(outbox_serv.outbox_repo, 'retry_email', lambda email, available_date, error, attempts:
+                        calls.append(('retry', available_date, attempts)))
+    return calls
+
+
+def create_email(attempts: int) -> OutboxEmail:
+    now = datetime.datetime.utcnow()
+    return OutboxEmail(id='email', to='user@test.com', subject='Subject', content='Content', creation_date=now,
+                       available_date=now, status=EmailStatus.SENDING, attempts=attempts, dispatcher='dispatcher')
+
+
+def fail_with(error: Exception):
+    def send_email(to, subject, content):
+        raise error
+
+    return send_email
+
+
+def test_sent_email_finished(outbox, monkeypatch):
+    monkeypatch.setattr(outbox_serv.email, 'send_email', lambda to, subject, content: None)
+    outbox_serv.dispatch_email(create_email(1))
+
+    assert outbox == [('finish', EmailStatus.SENT, 1)]
+
+
+def test_failed_email_retried_with_backoff_then_dead(outbox, monkeypatch):
+    monkeypatch.setattr(outbox_serv.email, 'send_email', fail_with(ConnectionError('SMTP is down')))
+    outbox_serv.dispatch_email(create_email(1))
+    outbox_serv.dispatch_email(create_email(3))
+    outbox_serv.dispatch_email(create_email(outbox_serv.OUTBOX_MAX_ATTEMPTS))
+
+    first, second, dead = outbox
+    assert first[0] == 'retry' and second[0] == 'retry'
+    assert second[1] - first[1] >= datetime.timedelta(seconds=outbox_serv.OUTBOX_RETRY_BASE_SECONDS * 3 - 1)
+    assert dead == ('finish', EmailStatus.DEAD, outbox_serv.OUTBOX_MAX_ATTEMPTS)
+
+
+def test_open_circuit_does_not_spend_attempts(outbox, monkeypatch):
+    monkeypatch.setattr(outbox_serv.email, 'send_email', fail_with(CircuitOpenException('Circuit smtp is open', 5)))
+    outbox_serv.dispatch_email(create_email(2))
+
+    assert outbox[0][0] == 'retry' and outbox[0][2] == 1
+
+
+def test_idle_dispatcher_dead_letters_the_expired_last_attempts(monkeypatch):
+    stop = threading.Event()
+    claims = []
+
+    def claim_email(dispatcher, lease_seconds, max_attempts):
+        claims.append(max_attempts)
+        return None
+
+    monkeypatch.setattr(outbox_serv.outbox_repo, 'claim_email', claim_email)
+    monkeypatch.setattr(outbox_serv.outbox_repo, 'dead_letter_expired_emails',
+                        lambda max_attempts: stop.set() or 1)
+    outbox_serv.run_dispatcher('dispatcher', stop)
+
+    assert claims == [outbox_serv.OUTBOX_MAX_ATTEMPTS]
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import Counter
+
+import pytest
+from fastapi import HTTPException
+
+from domain.enums import Language, UserRole
+from domain.users import User
+from services import quota_services as quota_serv
+
+USER = User(id='user', email='user@test.com', given_names='Given', family_names='Family', nickname='user',
+            language=Language.ENGLISH, role=UserRole.EXPERT, passwords=[], anti_phishing_phrase='phrase')
+
+
+@pytest.fixture
+def shared_quota(monkeypatch):
+    used = Counter()
+
+    def reserve_tokens(key, window, expiration_date, tokens):
+        used[(key, window)] += tokens
+        return used[(key, window)]
+
+    monkeypatch.setattr(quota_serv.quota_repo, 'reserve_tokens', reserve_tokens)
+    monkeypatch.setattr(quota_serv, 'leases', {})
+    monkeypatch.setattr(quota_serv, 'LLM_QUOTA_WINDOW_SECONDS', 24 * 60 * 60)
+    return used
+
+
+def test_quota_reserved_in_leases(shared_quota, monkeypatch):
+    monkeypatch.setattr(quota_serv, 'LLM_QUOTA_LEASE_SIZE', 5)
+    for _ in range(5):
+        quota_serv.consume('user:test', 10)
+
+    assert sum(shared_quota.values()) == 5
+
+
+def test_quota_exceeded_with_retry_after(shared_quota):
+    for _ in range(3):
+        quota_serv.consume('user:test', 3)
+
+    with pytest.raises(HTTPException) as e:
+        quota_serv.consume('user:test', 3)
+    assert e.value.status_code == 429
+    assert int(e.value.headers.get('Retry-After')) >= 1
+
+    # Once exhausted the database is not consulted again in the window
+    reserved = sum(shared_quota.values())
+    with pytest.raises(HTTPException):
+        quota_serv.consume('user:test', 3)
+    assert sum(shared_quota.values()) == reserved
+
+
+def test_reservation_of_a_key_does_not_block_other_keys(shared_quota, monkeypatch):
+    reserving = threading.Event()
+    release = threading.Event()
+    reserve_tokens = quota_serv.quota_repo.reserve_tokens
+
+    def slow_reserve_tokens(key, window, expiration_date, tokens):
+        if key == 'user:slow':
+            reserving.set()
+            release.wait(5)
+        return reserve_tokens(key, window, expiration_date, tokens)
+
+    monkeypatch.setattr(quota_serv.quota_repo, 'reserve_tokens', slow_reserve_tokens)
+    thread = threading.Thread(target=quota_serv.consume, args=('user:slow', 10))
+    thread.start()
+    try:
+        assert reserving.wait(5)
+        quota_serv.consume('user:fast', 10)
+        assert shared_quota.get(('user:slow', quota_serv.get_window(time.time()))) is None
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_leases_of_past_windows_evicted(shared_quota):
+    quota_serv.get_lease('user:old', 1)
+    quota_serv.get_lease('user:new', 2)
+
+    assert list(quota_serv.leases) == ['user:new']
+
+
+def test_user_tokens_refunded_when_the_project_quota_is_exceeded(shared_quota, monkeypatch):
+    monkeypatch.setattr(quota_serv, 'USER_LLM_REQUESTS_PER_WINDOW', 2)
+    monkeypatch.setattr(quota_serv, 'PROJECT_LLM_REQUESTS_PER_WINDOW', 0)
+    for _ in range(3):
+        with pytest.raises(HTTPException):
+            quota_serv.consume_llm_quota(USER, 'project')
+
+    # The rejected calls did not use the quota of the user
+    quota_serv.consume_llm_quota(USER)
+    quota_serv.consume_llm_quota(USER)
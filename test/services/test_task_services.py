@@ -0,0 +1,78 @@
+import datetime
+
+import pytest
+
+from domain.enums import TaskRunStatus
+from services import task_services as task_serv
+
+
+@pytest.fixture
+def task_runs(monkeypatch):
+    runs = {}
+    locks = {}
+
+    def insert_run(task_run):
+        if task_run.id in runs:
+            return False
+        runs[task_run.id] = task_run
+        return True
+
+    def acquire_lock(name, owner, lease_seconds):
+        if locks.get(name) not in (None, owner):
+            return False
+        locks[name] = owner
+        return True
+
+    monkeypatch.setattr(task_serv.task_repo, 'insert_run', insert_run)
+    monkeypatch.setattr(task_serv.task_repo, 'finish_run', lambda task_run: None)
+    monkeypatch.setattr(task_serv.task_repo, 'acquire_lock', acquire_lock)
+    monkeypatch.setattr(task_serv.task_repo, 'release_lock', lambda name, owner: locks.pop(name, None))
+    return runs, locks
+
+
+@pytest.fixture
+def executions(monkeypatch):
+    calls = []
+    monkeypatch.setitem(task_serv.TASKS, 'check_expired_passwords', lambda: calls.append(task_serv.OWNER))
+    return calls
+
+
+def test_scheduled_date_is_the_cron_slot():
+    now = datetime.datetime(2023, 5, 10, 12, 0, 10)
+    assert task_serv.get_scheduled_date('check_expired_passwords', now) == datetime.datetime(2023, 5, 10, 12, 0)
+
+
+def test_run_executed_once_across_replicas(task_runs, executions, monkeypatch):
+    runs, _ = task_runs
+    # Both replicas fire in the same minute, the second one some seconds later
+    now = datetime.datetime(2023, 5, 10, 12, 0, 0)
+    task_serv.run_scheduled_task('check_expired_passwords', now)
+    monkeypatch.setattr(task_serv, 'OWNER', 'other-replica')
+    task_serv.run_scheduled_task('check_expired_passwords', now + datetime.timedelta(seconds=59))
+
+    assert len(executions) == 1
+    assert [task_run.status for task_run in runs.values()] == [TaskRunStatus.DONE]
+
+
+def test_run_skipped_while_previous_run_holds_lock(task_runs, executions):
+    runs, locks = task_runs
+    locks['check_expired_passwords'] = 'other-replica'
+    task_serv.run_scheduled_task('check_expired_passwords')
+
+    assert executions == []
+    assert [task_run.status for task_run in runs.values()] == [TaskRunStatus.SKIPPED]
+
+
+def test_failed_run_releases_lock(task_runs, monkeypatch):
+    runs, locks = task_runs
+
+    def fail():
+        raise ValueError('error')
+
+    monkeypatch.setitem(task_serv.TASKS, 'check_expired_passwords', fail)
+    task_serv.run_scheduled_task('check_expired_passwords')
+
+    task_run = list(runs.values())[0]
+    assert task_run.status == TaskRunStatus.FAILED
+    assert task_run.error == 'error'
+    assert locks == {}
@@ -0,0 +1,140 @@
+import datetime
+
+import pytest
+
+from domain.enums import Language, UserRole, State
+from domain.users import User, UserPassword
+from rest_api.dtos import CreateUserRequest
+from services import user_services as user_serv
+
+
+def create_user(user_id: str, expiration_date: datetime.datetime) -> User:
+    return User(id=user_id, email=f'{user_id}@test.com', given_names='Given', family_names='Family',
+                nickname=user_id, language=Language.ENGLISH, role=UserRole.EXPERT, anti_phishing_phrase='phrase',
+                state=State.ACTIVE,
+                passwords=[UserPassword(password='', expiration_date=expiration_date, encrypted_password=b'')])
+
+
+def test_password_sweep_reads_only_new_ranges_and_notifies_once(monkeypatch):
+    now = datetime.datetime.utcnow()
+    users = [create_user('expired', now - datetime.timedelta(hours=1)),
+             create_user('tomorrow', now + datetime.timedelta(hours=12)),
+             create_user('next_week', now + datetime.timedelta(days=4, hours=12)),
+             create_user('next_month', now + datetime.timedelta(days=30))]
+    checkpoints = {}
+    ledger = set()
+    queries = []
+    notifications = []
+
+    def find_users_by_password_expiration(start_date, end_date):
+        queries.append((start_date, end_date))
+        return [user for user in users if user.get_password_expiration_date() and
+                (not start_date or user.get_password_expiration_date() > start_date) and
+                user.get_password_expiration_date() <= end_date]
+
+    def register_notification(user_id, expiration_date, days):
+        registered = (user_id, expiration_date, days) not in ledger
+        ledger.add((user_id, expiration_date, days))
+        return registered
+
+    monkeypatch.setattr(user_serv.user_repo, 'find_users_by_password_expiration', find_users_by_password_expiration)
+    monkeypatch.setattr(user_serv.user_repo, 'update_user', lambda user: None)
+    monkeypatch.setattr(user_serv.checkpoint_repo, 'find_checkpoint', checkpoints.get)
+    monkeypatch.setattr(user_serv.checkpoint_repo, 'save_checkpoint', checkpoints.__setitem__)
+    monkeypatch.setattr(user_serv.notification_repo, 'register_notification', register_notification)
+    monkeypatch.setattr(user_serv.notification_services, 'send_password_expired',
+                        lambda user: notifications.append((user.id, 'expired')))
+    monkeypatch.setattr(user_serv.notification_services, 'send_password_near_to_expire',
+                        lambda user, days: notifications.append((user.id, days)))
+
+    user_serv.check_expired_passwords()
+    user_serv.check_expired_passwords()
+
+    assert sorted(notifications) == [('expired', 'expired'), ('next_week', 4), ('tomorrow', 0)]
+    # The second run only reads the time passed since the first one
+    assert all(start_date for start_date, _ in queries[-3:])
+
+
+def test_password_expired_once_by_sweep_and_reconciliation(monkeypatch):
+    expiration_date = datetime.datetime.utcnow() - datetime.timedelta(minutes=1)
+    ledger = set()
+    updates = []
+    notifications = []
+
+    def register_notification(user_id, expiration_date, days):
+        registered = (user_id, expiration_date, days) not in ledger
+        ledger.add((user_id, expiration_date, days))
+        return registered
+
+    monkeypatch.setattr(user_serv.notification_repo, 'register_notification', register_notification)
+    monkeypatch.setattr(user_serv.user_repo, 'update_user', lambda user: updates.append(user.expired_password_token))
+    monkeypatch.setattr(user_serv.notification_services, 'send_password_expired',
+                        lambda user: notifications.append(user.id))
+    monkeypatch.setattr(user_serv.user_repo, 'fix_password_expiration_date', lambda user: False)
+
+    # Each job loaded the user before the other one expired the password
+    now = datetime.datetime.utcnow()
+    user_serv.check_password_expiration(create_user('expired', expiration_date), now)
+    user_serv.reconcile_user(create_user('expired', expiration_date), now)
+
+    assert notifications == ['expired']
+    assert len(updates) == 1
+
+
+def test_created_accounts_notified_to_cached_admins(monkeypatch):
+    admin = create_user('admin', None)
+    admin.role = UserRole.ADMIN
+    queries = []
+    notifications = []
+    monkeypatch.setattr(user_serv, 'admin_roster', user_serv.TTLCache(1, 60))
+    monkeypatch.setattr(user_serv.user_repo, 'find_user_by_email', lambda email: None)
+    monkeypatch.setattr(user_serv.user_repo, 'insert_user', lambda user: None)
+    monkeypatch.setattr(user_serv.user_repo, 'find_users_by_role', lambda role: queries.append(role) or [admin])
+    monkeypatch.setattr(user_serv.notification_services, 'send_created_account',
+                        lambda user, user_created: notifications.append((user.id, user_created.nickname)))
+
+    def create(nickname: str, role: UserRole):
+        user_serv.create_user(CreateUserRequest(
+            email=f'{nickname}@test.com', given_names='Given', family_names='Family', nickname=nickname,
+            language=Language.ENGLISH, password='Password1!', sponsor_user_id='sponsor', invitation_code='code',
+            anti_phishing_phrase='phrase', user_role=role))
+
+    create('first', UserRole.EXPERT)
+    create('second', UserRole.EXPERT)
+    assert queries == [UserRole.ADMIN]
+
+    create('new_admin', UserRole.ADMIN)
+    assert queries == [UserRole.ADMIN, UserRole.ADMIN]
+    assert notifications == [('admin', 'first'), ('admin', 'second'), ('admin', 'new_admin')]
+
+
+def test_search_users_filters_and_pages(monkeypatch):
+    users = [create_user(f'user{i}', None) for i in range(10)]
+    users[3].state = State.INACTIVE
+    users[5].nickname = 'other5'
+    queries = []
+
+    def search_users(tokens, excluded_role, after_user_id, limit):
+        queries.append(after_user_id)
+        return [user for user in users if not after_user_id or user.id > after_user_id][:limit]
+
+    monkeypatch.setattr(user_serv.user_repo, 'search_users', search_users)
+    current_user = users[0]
+
+    first_page = user_serv.search_users(current_user, 'Use', 4, None)
+    assert [user['nickname'] for user in first_page['users']] == ['user1', 'user2', 'user4', 'user6']
+    second_page = user_serv.search_users(current_user, 'Use', 4, first_page['next'])
+    assert [user['nickname'] for user in second_page['users']] == ['user7', 'user8', 'user9']
+    assert second_page['next'] is None
+
+
+@pytest.mark.parametrize('backfill', [user_serv.backfill_role_indexes, user_serv.backfill_search_tokens])
+def test_blind_indexes_not_backfilled_without_key(monkeypatch, backfill):
+    writes = []
+    monkeypatch.setattr(user_serv.utils, 'BLIND_INDEX_KEY', None)
+    monkeypatch.setattr(user_serv.user_repo, 'backfill_role_indexes', lambda: writes.append('role_index') or 0)
+    monkeypatch.setattr(user_serv.user_repo, 'backfill_search_tokens', lambda: writes.append('search_tokens') or 0)
+
+    with pytest.raises(ValueError):
+        backfill()
+    assert writes == []
@@ -0,0 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+IMPORT_TIME_BUDGET_SECONDS = 3
+
+IMPORT_MAIN = '''
+import json, sys, time
+start = time.perf_counter()
+import main
+duration = time.perf_counter() - start
+from infra.repositories.general_repository import MONGO_CLIENT
+print(json.dumps({'duration': duration, 'openai': 'openai' in sys.modules,
+                  'mongo_opened': MONGO_CLIENT._topology._opened}))
+'''
+
+
+def test_import_main_is_fast_and_lazy(tmp_path):
+    os.makedirs(tmp_path / 'data' / 'logs')
+    result = subprocess.run([sys.executable, '-c', IMPORT_MAIN], cwd=tmp_path, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': os.path.abspath(SRC_PATH)}, timeout=60)
+    assert result.returncode == 0, result.stderr
+    imported = json.loads(result.stdout.splitlines()[-1])
+
+    assert not imported['openai']
+    assert not imported['mongo_opened']
+    assert imported['duration'] < IMPORT_TIME_BUDGET_SECONDS